@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日志分析缓存模块
+功能：管理远程日志文件在本地的分析缓存
+支持：
+1. 按远程文件的大小和修改时间校验缓存，远程日志变化后重新下载
+2. 限制缓存总大小，超出时按最近最少使用（LRU）顺序淘汰
+3. 元数据索引保存在缓存目录的 index.json 中，程序重启后仍然有效
+4. 先下载到临时文件再原子替换，中断的下载不会留下损坏的缓存
+5. 多个工作线程可以同时使用，同一文件只会下载一次
+6. 边下载边查看完成的远程日志也放入缓存（同一文件系统上使用硬链接，不复制）
+7. 命中缓存只在内存中更新访问时间，随下一次写入索引、每隔一段时间或程序退出时一起保存
+"""
+
+import os
+import re
+import json
+import time
+import atexit     # 退出时保存访问时间
+import shutil     # 复制文件
+import hashlib    # 缓存文件名
+import tempfile   # 临时目录
+import threading  # 线程锁
+
+# 默认缓存目录
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "log_cache")
+# 默认缓存大小上限：2GB
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024
+# 元数据索引文件名
+INDEX_FILE = "index.json"
+# 只有访问时间变化时，至少间隔多少秒才写一次索引
+ACCESS_SAVE_INTERVAL = 60
+# 旧版本缓存文件名（md5(远程路径) + 扩展名），没有元数据，首次加载时清理
+_LEGACY_NAME = re.compile(r'^[0-9a-f]{32}\.(log|zip)$')
+
+
+def cache_key(host, remote_path):
+    """生成缓存键：不同主机上的同名路径是不同的文件"""
+    return f"{host}:{remote_path}"
+
+
+class LogCache:
+    """
+    日志分析缓存
+    同一缓存目录应只使用一个 LogCache 对象（见 shared_cache），由它负责加锁
+    """
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, on_evict=None):
+        """
+        初始化缓存
+        Args:
+            cache_dir: 缓存目录，默认为系统临时目录下的 log_cache
+            max_bytes: 缓存总大小上限（字节）
+            on_evict: 缓存文件被淘汰或失效时的回调函数，参数为本地文件路径
+        """
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._lock = threading.RLock()
+        # 正在下载的缓存键 -> 锁，同一文件只下载一次
+        self._key_locks = {}
+        self._entries = None
+        self._dirty = False      # 内存中有尚未保存的访问时间
+        self._saved_at = 0.0     # 上次写入索引的时间
+
+    # ------------------------------------------------------------------
+    # 元数据索引
+    # ------------------------------------------------------------------
+
+    def _index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _load(self):
+        """加载元数据索引（调用方持有锁）"""
+        if self._entries is not None and os.path.isdir(self.cache_dir):
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._entries = {}
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            # 没有索引说明是旧版本留下的缓存，这些文件无法校验，直接清理
+            for name in os.listdir(self.cache_dir):
+                if _LEGACY_NAME.match(name):
+                    self._remove_file(os.path.join(self.cache_dir, name))
+        except (OSError, ValueError):
+            self._entries = {}
+        # 丢弃文件已不存在的条目
+        for key in [key for key, entry in self._entries.items()
+                    if not os.path.exists(self._local_path(entry))]:
+            del self._entries[key]
+
+    def _save(self):
+        """原子地写入元数据索引（调用方持有锁）"""
+        tmp_path = self._index_path() + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self._index_path())
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def flush(self):
+        """保存尚未写入索引的访问时间"""
+        with self._lock:
+            if self._dirty and self._entries is not None:
+                try:
+                    self._save()
+                except OSError:
+                    pass
+
+    def _local_path(self, entry):
+        return os.path.join(self.cache_dir, entry['file'])
+
+    def _remove_file(self, path):
+        """删除缓存文件并通知回调；文件正在被使用（如Windows下被映射）时保留"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            return False
+        if self.on_evict:
+            try:
+                self.on_evict(path)
+            except Exception:
+                pass
+        return True
+
+    # ------------------------------------------------------------------
+    # 查询和写入
+    # ------------------------------------------------------------------
+
+    def lookup(self, host, remote_path, size, mtime):
+        """
+        查找有效的缓存文件
+        Args:
+            host: 远程主机
+            remote_path: 远程文件路径
+            size: 远程文件当前大小
+            mtime: 远程文件当前修改时间
+        Returns:
+            str: 缓存文件路径，没有缓存或缓存已过期时返回None
+        """
+        key = cache_key(host, remote_path)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['size'] != size or entry['mtime'] != mtime:
+                # 远程文件已变化，旧缓存作废
+                del self._entries[key]
+                self._remove_file(self._local_path(entry))
+                self._save()
+                return None
+            # 访问时间只影响淘汰顺序，不必每次命中都写索引
+            entry['last_access'] = time.time()
+            self._dirty = True
+            if time.monotonic() - self._saved_at >= ACCESS_SAVE_INTERVAL:
+                self._save()
+            return self._local_path(entry)
+
+    def get(self, collector, remote_path, log_callback=None):
+        """
+        获取远程文件的本地缓存，缓存不存在或已过期时下载
+        Args:
+            collector: 已连接的 LogCollector 对象
+            remote_path: 远程文件路径
+            log_callback: 日志回调函数
+        Returns:
+            str: 缓存文件路径
+        Raises:
+            Exception: 获取远程文件信息或下载失败
+        """
+        host = collector.config.get('ssh', {}).get('host', '')
+        # 同一文件的下载串行执行，其他文件的下载不受影响
+        with self._key_lock(host, remote_path):
+            size, mtime = collector.stat_file(remote_path)
+            cached_file = self.lookup(host, remote_path, size, mtime)
+            if cached_file:
+                return cached_file
+            if log_callback:
+                log_callback(f"下载文件到本地缓存: {os.path.basename(remote_path)}")
+            return self._add(host, remote_path, size, mtime,
+                             lambda tmp_path: collector.download_file(remote_path, tmp_path))
+
+    def store(self, host, remote_path, size, mtime, source_path):
+        """
+        把已经完整下载的远程文件放入缓存（例如边下载边查看的临时文件），源文件保持不变
+        同一文件系统上使用硬链接，不复制内容
+        Args:
+            host: 远程主机
+            remote_path: 远程文件路径
+            size: 下载时远程文件的大小
+            mtime: 下载时远程文件的修改时间
+            source_path: 已下载的本地文件
+        Returns:
+            str: 缓存文件路径
+        """
+        def link_or_copy(tmp_path):
+            os.remove(tmp_path)
+            try:
+                os.link(source_path, tmp_path)
+            except OSError:
+                shutil.copyfile(source_path, tmp_path)
+
+        with self._key_lock(host, remote_path):
+            return self._add(host, remote_path, size, mtime, link_or_copy)
+
+    def _key_lock(self, host, remote_path):
+        """获取同一远程文件的下载锁"""
+        with self._lock:
+            return self._key_locks.setdefault(cache_key(host, remote_path), threading.Lock())
+
+    def _add(self, host, remote_path, size, mtime, write):
+        """
+        写入缓存文件并登记（调用方持有该文件的下载锁）
+        先写入临时文件再原子替换，写入中断不会留下不完整的缓存
+        Args:
+            write: 写入函数，参数为临时文件路径
+        """
+        key = cache_key(host, remote_path)
+        file_name = hashlib.md5(key.encode('utf-8')).hexdigest() + os.path.splitext(remote_path)[1]
+        local_path = os.path.join(self.cache_dir, file_name)
+        with self._lock:
+            self._load()
+        fd, tmp_path = tempfile.mkstemp(prefix=file_name + '.', suffix='.part', dir=self.cache_dir)
+        os.close(fd)
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, local_path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            self._entries[key] = {
+                'file': file_name,
+                'host': host,
+                'remote_path': remote_path,
+                'size': size,
+                'mtime': mtime,
+                'bytes': os.path.getsize(local_path),
+                'last_access': time.time()
+            }
+            self._evict(keep=key)
+            self._save()
+        return local_path
+
+    def _evict(self, keep=None):
+        """按最近最少使用顺序淘汰缓存，直到总大小不超过上限（调用方持有锁）"""
+        total = sum(entry['bytes'] for entry in self._entries.values())
+        for key, entry in sorted(self._entries.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            if self._remove_file(self._local_path(entry)):
+                total -= entry['bytes']
+                del self._entries[key]
+
+    def usage(self):
+        """
+        获取缓存使用情况
+        Returns:
+            tuple: (缓存文件数量, 总字节数)
+        """
+        with self._lock:
+            self._load()
+            return len(self._entries), sum(entry['bytes'] for entry in self._entries.values())
+
+    def clear(self):
+        """
+        删除所有缓存文件
+        Returns:
+            tuple: (删除的文件数量, 释放的字节数)
+        """
+        with self._lock:
+            self._load()
+            count = 0
+            total = 0
+            for key, entry in list(self._entries.items()):
+                if self._remove_file(self._local_path(entry)):
+                    count += 1
+                    total += entry['bytes']
+                    del self._entries[key]
+            # 清理中断下载留下的临时文件
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.part'):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
+            self._save()
+            return count, total
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_cache(on_evict=None):
+    """
+    获取进程内共享的默认缓存对象
+    Args:
+        on_evict: 首次创建时设置的淘汰回调函数
+    Returns:
+        LogCache: 缓存对象
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = LogCache(on_evict=on_evict)
+            atexit.register(_shared_cache.flush)
+        return _shared_cache
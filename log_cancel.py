@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+取消操作模块
+功能：在界面和后台线程之间传递“取消”请求，让收集、下载、压缩和搜索循环及时停止
+支持：
+1. 循环在每个文件、每个数据块处检查取消标记
+2. 取消时执行已注册的回调，例如关闭SSH连接，使阻塞中的远程读取立即返回
+"""
+
+import threading
+
+
+class OperationCancelled(Exception):
+    """操作已被用户取消"""
+
+
+class CancelToken:
+    """
+    取消标记
+    由界面线程调用 cancel()，后台线程调用 check() 或读取 cancelled
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        """是否已请求取消"""
+        return self._event.is_set()
+
+    def cancel(self):
+        """请求取消，并执行已注册的回调（只执行一次）"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = self._callbacks
+            self._callbacks = []
+        for callback in callbacks:
+            # 回调只用于尽快中断阻塞的操作，失败时忽略
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def check(self):
+        """
+        检查是否已请求取消
+        Raises:
+            OperationCancelled: 已请求取消
+        """
+        if self._event.is_set():
+            raise OperationCancelled()
+
+    def add_callback(self, callback):
+        """
+        注册取消时执行的回调，已取消时立即执行
+        Args:
+            callback: 无参数的函数
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback):
+        """取消注册回调"""
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def wait(self, timeout=None):
+        """
+        等待取消请求
+        Args:
+            timeout: 最长等待时间（秒）
+        Returns:
+            bool: 是否已请求取消
+        """
+        return self._event.wait(timeout)
@@ -9,6 +9,7 @@
 2. 多种日期格式的日志文件名
 3. 多种文件获取方式（SFTP/SCP）
 4. 自动压缩打包
+5. 按时间段收集：只下载日志文件中时间段对应的字节范围（见 log_slice）
 """
 
 import os
@@ -18,20 +19,120 @@ import datetime # 日期时间处理
 import zipfile  # 文件压缩
 from tqdm import tqdm  # 进度条显示
 import logging  # 日志记录
+import logging.handlers  # 后台写日志和日志文件轮转
+import queue    # 日志消息队列
+import atexit   # 退出时写完剩余日志
 import re       # 正则表达式
 import shutil   # 文件操作
+import shlex    # Shell参数转义
+from log_search import decode_log_bytes  # 日志内容解码
+from log_cancel import OperationCancelled  # 取消操作
+from log_transport import get_profile, connect_kwargs, open_sftp  # SSH传输配置
+from log_slice import window_seconds, window_byte_range, copy_byte_range, SLICE_PADDING_SECONDS  # 按时间段截取
+
+# 远程两阶段搜索使用的awk公共函数和预处理
+# 去掉行尾的\r和行首空白，与本地搜索时对每行strip()的处理保持一致
+_AWK_PRELUDE = r'''
+function tsec(s) { return substr(s, 1, 2) * 3600 + substr(s, 4, 2) * 60 + substr(s, 7, 6) }
+{ line = $0; sub(/\r$/, "", line); sub(/^[ \t]+/, "", line) }
+'''
+
+# 第一阶段：统计每个文件中包含关键字的带时间戳行的最早和最晚时间
+# 关键字通过环境变量传入，KW1为UTF-8编码，KW2为GBK编码（可为空）
+# ICASE为1时忽略大小写（C语言环境下只对ASCII字母逐字节生效，关键字的字节已预先转为小写）
+REMOTE_KEYWORD_TIMES_AWK = _AWK_PRELUDE + r'''
+line ~ /^[0-9][0-9]:[0-9][0-9]:[0-9][0-9]/ {
+    hay = (ENVIRON["ICASE"] == "1") ? tolower(line) : line
+    if (index(hay, ENVIRON["KW1"]) || (ENVIRON["KW2"] != "" && index(hay, ENVIRON["KW2"]))) {
+        ts = substr(line, 1, 8)
+        if (substr(line, 9, 4) ~ /^\.[0-9][0-9][0-9]$/) ts = ts substr(line, 9, 4)
+        t = tsec(ts)
+        if (count == 0 || t < min_t) { min_t = t; min_s = ts }
+        if (count == 0 || t > max_t) { max_t = t; max_s = ts }
+        count++
+    }
+}
+END { print count + 0 "\t" min_s "\t" max_s }
+'''
+
+# 第二阶段：提取时间范围内的日志行及其后续的延续行（没有时间戳的行）
+REMOTE_WINDOW_AWK = _AWK_PRELUDE + r'''
+line ~ /^[0-9][0-9]:[0-9][0-9]:[0-9][0-9]/ {
+    t = tsec(line)
+    if (t >= ENVIRON["LO"] + 0 && t <= ENVIRON["HI"] + 0) { print line; cont = ENVIRON["MAXC"] + 0 }
+    else cont = 0
+    next
+}
+cont != 0 { print line; cont-- }
+'''
+
+
+# 日志文件及轮转设置
+LOG_FILE = 'log_collector.log'
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+# 后台写日志的监听线程，进程内只启动一次
+_log_listener = None
+
+
+def setup_async_logging():
+    """
+    配置根日志记录器：记录日志时只把消息放入队列，由后台线程写入控制台和轮转的日志文件，
+    下载和搜索循环中的日志调用不会因为磁盘写入而阻塞
+    根日志记录器已有处理器时（与 logging.basicConfig 相同）不做修改
+    """
+    global _log_listener
+    root = logging.getLogger()
+    if _log_listener is not None or root.handlers:
+        return
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    handlers = [logging.StreamHandler()]  # 输出到控制台
+    try:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8'))
+    except OSError:
+        pass  # 日志文件无法打开时只输出到控制台
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+    _log_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+
+def _shell_bytes(text, encoding, fold_case=False):
+    """
+    将文本按指定编码转换为printf可用的八进制转义串
+    这样任意字节（包括GBK编码的中文）都可以安全地通过命令行传给远程主机
+
+    Args:
+        text: 文本
+        encoding: 编码
+        fold_case: 是否把编码后的字节中的ASCII大写字母转为小写
+            （与C语言环境下awk的tolower一致，GBK双字节字符的第二个字节也会被转换）
+    """
+    try:
+        data = text.encode(encoding)
+    except UnicodeEncodeError:
+        return "''"
+    if fold_case:
+        data = data.lower()
+    return "\"$(printf '" + ''.join('\\%03o' % b for b in data) + "')\""
 
 class LogCollector:
     """
     日志收集器类
     负责连接远程服务器、查找和下载日志文件、打包压缩等核心功能
     """
-    def __init__(self, config_file='config.yaml', progress_callback=None):
+    def __init__(self, config_file='config.yaml', progress_callback=None, cancel_token=None):
         """
         初始化日志收集器
         Args:
             config_file: 配置文件路径，默认为'config.yaml'
             progress_callback: 进度回调函数，用于通知界面下载进度
+            cancel_token: 取消标记（CancelToken），取消时中止列目录、下载、压缩和远程命令
         """
         self.setup_logging()  # 设置日志记录
         self.load_config(config_file)  # 加载配置文件
@@ -43,20 +144,15 @@ class LogCollector:
         self._is_windows = None
         # 进度回调函数
         self.progress_callback = progress_callback
+        # 取消标记
+        self.cancel_token = cancel_token
 
     def setup_logging(self):
         """
         设置日志记录器
-        配置日志格式、输出位置等
-        """
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.StreamHandler(),  # 输出到控制台
-                logging.FileHandler('log_collector.log')  # 输出到文件
-            ]
-        )
+        日志经队列由后台线程输出到控制台和轮转的日志文件
+        """
+        setup_async_logging()
         self.logger = logging.getLogger(__name__)
 
     def load_config(self, config_file):
@@ -81,25 +177,45 @@ class LogCollector:
     def connect(self):
         """
         建立SSH连接
-        连接到远程服务器并创建SFTP会话
+        连接到远程服务器并创建SFTP会话，传输参数使用 ssh.transport 指定的配置（见 log_transport）
         Raises:
             Exception: 连接失败时抛出异常
         """
         try:
+            profile = get_profile(self.config['ssh'].get('transport'))
             self.ssh = paramiko.SSHClient()
             self.ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
             self.ssh.connect(
                 hostname=self.config['ssh']['host'],
                 port=self.config['ssh'].get('port', 22),
                 username=self.config['ssh']['username'],
-                password=self.config['ssh']['password']
+                password=self.config['ssh']['password'],
+                **connect_kwargs(profile)
             )
-            self.sftp = self.ssh.open_sftp()
+            self.sftp = open_sftp(self.ssh, profile)
+            if self.cancel_token is not None:
+                # 取消时关闭连接，正在阻塞的SFTP读取和远程命令立即返回
+                self.cancel_token.add_callback(self._abort_transport)
             self.logger.info(f"成功连接到服务器 {self.config['ssh']['host']}")
         except Exception as e:
             self.logger.error(f"SSH连接失败: {str(e)}")
             raise
 
+    def _abort_transport(self):
+        """关闭SSH传输层（可在其他线程中调用）"""
+        transport = self.ssh.get_transport() if self.ssh else None
+        if transport is not None:
+            transport.close()
+
+    def check_cancelled(self):
+        """
+        检查是否已请求取消
+        Raises:
+            OperationCancelled: 已请求取消
+        """
+        if self.cancel_token is not None:
+            self.cancel_token.check()
+
     def is_log_in_date_range(self, filename, start_date, end_date):
         """
         检查日志文件名是否在指定日期范围内
@@ -173,6 +289,8 @@ class LogCollector:
     def collect_logs(self):
         """
         收集日志文件的主要方法
+        配置中有 time_window（{'date': 'YYYY-MM-DD', 'start': 'HH:MM', 'end': 'HH:MM'}）时
+        只收集该日期的日志，普通日志文件只下载时间段前后的内容
         流程：
         1. 创建本地保存目录
         2. 获取日期范围（如果启用）
@@ -185,8 +303,11 @@ class LogCollector:
         Returns:
             str: 压缩文件路径，如果没有找到文件则返回None
         Raises:
+            OperationCancelled: 收集被取消（已下载的文件和未完成的压缩包会被删除）
             Exception: 收集过程中的错误
         """
+        local_dir = None
+        zip_path = None
         try:
             # 获取日期范围
             date_range = self.config.get('date_range', {})
@@ -203,9 +324,25 @@ class LogCollector:
                 # 如果没有指定日期范围，使用当前日期
                 log_date = datetime.date.today()
             
+            # 时间段：只收集这一天中这个时间段的日志，普通日志文件只下载时间段对应的字节范围
+            time_window = self.config.get('time_window')
+            window = None
+            if time_window:
+                start_date = end_date = log_date = datetime.datetime.strptime(
+                    time_window['date'], '%Y-%m-%d').date()
+                use_date_range = True
+                window = window_seconds(time_window['start'], time_window['end'],
+                                        time_window.get('padding', SLICE_PADDING_SECONDS))
+                self.logger.info(f"只收集时间段: {log_date} {time_window['start']} - {time_window['end']}")
+            
             # 生成标准命名格式
             date_str = log_date.strftime("%Y-%m-%d")
             standard_zip_name = f"wcLog_{date_str}.zip"
+            if time_window:
+                # 例如 wcLog_2025-03-31_1000-1010.zip
+                start_label = time_window['start'].strip().replace(':', '')[:4]
+                end_label = time_window['end'].strip().replace(':', '')[:4]
+                standard_zip_name = f"wcLog_{date_str}_{start_label}-{end_label}.zip"
             
             # 创建本地保存目录
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -218,6 +355,7 @@ class LogCollector:
 
             # 收集每个指定的日志文件
             for log_path in self.config['log_paths']:
+                self.check_cancelled()
                 try:
                     remote_path = log_path.strip()
                     self.logger.info(f"处理路径: {remote_path}")
@@ -268,6 +406,7 @@ class LogCollector:
 
                     # 处理每个文件
                     for filename in files:
+                        self.check_cancelled()
                         # 构建完整的远程路径
                         if is_dir:
                             # 根据系统类型使用正确的路径分隔符
@@ -290,6 +429,17 @@ class LogCollector:
                         
                         # 下载文件
                         try:
+                            # 指定了时间段时，普通日志文件只下载时间段对应的部分（zip包无法按范围截取）
+                            if window is not None and not filename.lower().endswith('.zip'):
+                                try:
+                                    self.download_time_window(full_remote_path, local_path, *window)
+                                    continue
+                                except OperationCancelled:
+                                    raise
+                                except Exception as e:
+                                    self.check_cancelled()
+                                    self.logger.warning(f"按时间段截取 {filename} 失败，改为下载整个文件: {str(e)}")
+                            
                             self.logger.info(f"尝试下载文件: {full_remote_path}")
                             
                             # 首先尝试使用SFTP下载
@@ -303,6 +453,8 @@ class LogCollector:
                                     
                                     # 添加自定义的更新函数以同时通知进度条和回调函数
                                     def update_progress(transferred, total):
+                                        # 每个数据块检查一次取消，中止正在进行的下载
+                                        self.check_cancelled()
                                         # 更新tqdm进度条
                                         pbar.update(transferred - pbar.n)
                                         # 如果有回调函数，通知界面更新进度
@@ -313,6 +465,8 @@ class LogCollector:
                                 
                                 self.logger.info(f"成功下载文件: {filename}")
                             except Exception as e:
+                                # 取消时不再尝试其他方式（未下载完的文件随临时目录删除）
+                                self.check_cancelled()
                                 # SFTP下载失败，尝试使用SCP方式
                                 self.logger.error(f"使用SFTP下载 {filename} 失败: {str(e)}")
                                 self.logger.info(f"尝试使用SCP方式下载 {filename}")
@@ -337,14 +491,19 @@ class LogCollector:
                                 except Exception as scp_e:
                                     self.logger.error(f"SCP下载 {filename} 失败: {str(scp_e)}")
                                     continue
+                        except OperationCancelled:
+                            raise
                         except Exception as e:
                             self.logger.error(f"下载文件 {filename} 失败: {str(e)}")
                             continue
 
+                except OperationCancelled:
+                    raise
                 except Exception as e:
                     self.logger.error(f"处理路径 {log_path} 失败: {str(e)}")
 
-            # 检查是否有文件被下载
+            # 检查是否有文件被下载（取消时最后一个文件可能不完整）
+            self.check_cancelled()
             downloaded_files = os.listdir(local_dir)
             if not downloaded_files:
                 self.logger.warning("没有找到符合条件的日志文件")
@@ -365,6 +524,7 @@ class LogCollector:
             with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
                 for root, _, files in os.walk(local_dir):
                     for file in files:
+                        self.check_cancelled()
                         file_path = os.path.join(root, file)
                         arcname = os.path.relpath(file_path, local_dir)
                         zipf.write(file_path, arcname)
@@ -377,6 +537,14 @@ class LogCollector:
             return zip_path
 
         except Exception as e:
+            if isinstance(e, OperationCancelled) or (self.cancel_token is not None and self.cancel_token.cancelled):
+                # 删除已下载的文件和未完成的压缩包
+                self.logger.info("收集日志已取消")
+                if local_dir:
+                    shutil.rmtree(local_dir, ignore_errors=True)
+                if zip_path and os.path.exists(zip_path):
+                    os.remove(zip_path)
+                raise OperationCancelled() from e
             self.logger.error(f"收集日志过程中发生错误: {str(e)}")
             raise
 
@@ -390,6 +558,165 @@ class LogCollector:
             self.ssh.close()
         self.logger.info("SSH连接已关闭")
 
+    def is_connected(self):
+        """
+        检查SSH连接是否仍然可用
+        Returns:
+            bool: 连接是否可用
+        """
+        if not self.ssh:
+            return False
+        transport = self.ssh.get_transport()
+        return transport is not None and transport.is_active()
+
+    def download_file(self, remote_path, local_path):
+        """
+        通过SFTP下载单个文件
+        Args:
+            remote_path: 远程文件路径
+            local_path: 本地保存路径
+        """
+        filename = os.path.basename(remote_path)
+
+        def update_progress(transferred, total):
+            # 每个数据块检查一次取消，中止正在进行的下载
+            self.check_cancelled()
+            if self.progress_callback:
+                self.progress_callback(filename, transferred, total)
+
+        self.sftp.get(remote_path, local_path, callback=update_progress)
+
+    def download_time_window(self, remote_path, local_path, start_seconds, end_seconds):
+        """
+        只下载远程日志中一个时间段的内容
+        先在远程文件的若干偏移处读取少量内容，二分查找时间段的字节范围，再只下载这个范围
+        Args:
+            remote_path: 远程文件路径
+            local_path: 本地保存路径
+            start_seconds: 时间段开始（当天秒数，已包含扩展）
+            end_seconds: 时间段结束（当天秒数，不包含，已包含扩展）
+        Returns:
+            tuple: (下载的字节数, 文件大小)
+        Raises:
+            OperationCancelled: 已取消
+            Exception: 打开或读取远程文件失败
+        """
+        filename = os.path.basename(remote_path.replace('\\', '/'))
+
+        def update_progress(transferred, total):
+            # 每个数据块检查一次取消
+            self.check_cancelled()
+            if self.progress_callback:
+                self.progress_callback(filename, transferred, total)
+
+        with self.sftp.open(remote_path, 'rb') as f:
+            size = f.stat().st_size or 0
+            start, end = window_byte_range(f, size, start_seconds, end_seconds)
+            self.check_cancelled()
+            with open(local_path, 'wb') as output:
+                copied = copy_byte_range(f, start, end, output, callback=update_progress)
+        self.logger.info(f"按时间段截取 {filename}: 下载 {copied} / {size} 字节（偏移 {start} - {end}）")
+        return copied, size
+
+    def stat_file(self, remote_path):
+        """
+        获取远程文件的大小和修改时间，用于校验本地缓存
+        Args:
+            remote_path: 远程文件路径
+        Returns:
+            tuple: (文件大小, 修改时间)
+        """
+        stats = self.sftp.stat(remote_path)
+        return stats.st_size, stats.st_mtime
+
+    def open_remote_file(self, remote_path):
+        """
+        以只读方式打开远程文件，用于按范围读取
+        Args:
+            remote_path: 远程文件路径
+        Returns:
+            SFTPFile: 远程文件对象，支持 seek/read
+        """
+        return self.sftp.open(remote_path, 'rb')
+
+    def execute_command_bytes(self, command):
+        """
+        执行远程命令并返回原始输出
+        Args:
+            command: 要执行的命令
+        Returns:
+            tuple: (退出码, 标准输出字节, 标准错误字节)
+        """
+        self.check_cancelled()
+        stdin, stdout, stderr = self.ssh.exec_command(command)
+        output = stdout.read()
+        err_output = stderr.read()
+        return stdout.channel.recv_exit_status(), output, err_output
+
+    def execute_command(self, command):
+        """
+        执行远程命令并返回解码后的标准输出
+        Args:
+            command: 要执行的命令
+        Returns:
+            str: 命令输出
+        """
+        status, output, err_output = self.execute_command_bytes(command)
+        return decode_log_bytes(output)
+
+    def remote_keyword_times(self, remote_path, keyword, case_sensitive=True):
+        """
+        远程两阶段搜索第一阶段：在车道主机上统计包含关键字的日志行时间范围
+        只返回统计结果，不传输文件内容
+
+        Args:
+            remote_path: 远程日志文件路径
+            keyword: 搜索关键字
+            case_sensitive: 是否区分大小写
+        Returns:
+            tuple: (匹配行数, 最早时间字符串, 最晚时间字符串)，没有匹配时时间为None
+        Raises:
+            Exception: 远程命令执行失败（例如主机没有awk）
+        """
+        # awk的tolower在C语言环境下逐字节转换ASCII字母，关键字编码后的字节也按同样方式转换
+        fold_case = not case_sensitive
+        cmd = (f"ICASE={0 if case_sensitive else 1} "
+               f"KW1={_shell_bytes(keyword, 'utf-8', fold_case)} "
+               f"KW2={_shell_bytes(keyword, 'gbk', fold_case)} "
+               f"LC_ALL=C awk {shlex.quote(REMOTE_KEYWORD_TIMES_AWK)} {shlex.quote(remote_path)}")
+        status, output, err_output = self.execute_command_bytes(cmd)
+        if status != 0:
+            raise Exception(decode_log_bytes(err_output).strip() or f"远程搜索命令退出码 {status}")
+        fields = output.decode('ascii', errors='ignore').strip().split('\t')
+        count = int(fields[0]) if fields and fields[0].isdigit() else 0
+        if count == 0 or len(fields) < 3:
+            return 0, None, None
+        return count, fields[1], fields[2]
+
+    def remote_extract_window(self, remote_path, start_seconds, end_seconds, max_block_lines=None):
+        """
+        远程两阶段搜索第二阶段：在车道主机上提取时间范围内的日志块
+        时间范围用当天的秒数表示，只传回范围内的行和它们的延续行
+
+        Args:
+            remote_path: 远程日志文件路径
+            start_seconds: 时间范围开始（当天秒数）
+            end_seconds: 时间范围结束（当天秒数）
+            max_block_lines: 单个日志块最多包含的行数，None表示不限制（延续行一直到下一个时间戳）
+        Returns:
+            list: 时间范围内的日志行
+        Raises:
+            Exception: 远程命令执行失败
+        """
+        # MAXC 为负数时延续行计数永远不会减到0，即不限制行数
+        max_continuation = -1 if max_block_lines is None else max_block_lines - 1
+        cmd = (f"LO={start_seconds!r} HI={end_seconds!r} MAXC={max_continuation} "
+               f"LC_ALL=C awk {shlex.quote(REMOTE_WINDOW_AWK)} {shlex.quote(remote_path)}")
+        status, output, err_output = self.execute_command_bytes(cmd)
+        if status != 0:
+            raise Exception(decode_log_bytes(err_output).strip() or f"远程提取命令退出码 {status}")
+        return decode_log_bytes(output).splitlines()
+
     def is_remote_windows(self):
         """
         检测远程系统是否为Windows
@@ -7,21 +7,75 @@ import yaml
 from datetime import datetime, timedelta
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                            QHBoxLayout, QLabel, QLineEdit, QPushButton,
-                           QTextEdit, QFileDialog, QProgressBar, QMessageBox,
+                           QFileDialog, QProgressBar, QMessageBox,
                            QSpinBox, QListWidget, QCalendarWidget, QGroupBox,
                            QCheckBox, QDateEdit, QDialog, QComboBox, QTableWidget,
                            QTableWidgetItem, QHeaderView, QDialogButtonBox, QTabWidget,
                            QSizePolicy, QListWidgetItem, QSplitter, QGridLayout,
-                           QProgressDialog)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QDate
+                           QProgressDialog, QAbstractScrollArea, QListView,
+                           QAbstractItemView, QStyledItemDelegate, QStyle, QTableView,
+                           QPlainTextEdit, QTimeEdit)
+from PyQt6.QtCore import (Qt, QThread, pyqtSignal, QDate, QTime, QTimer, QAbstractListModel,
+                          QAbstractTableModel, QSortFilterProxyModel, QModelIndex)
+from PyQt6.QtGui import QPainter, QFontDatabase, QKeySequence, QColor, QShortcut
 from log_collector import LogCollector
 import re
 import functools
-import io
 import zipfile
 import tempfile
 import shutil
 import hashlib
+import shlex
+import sqlite3
+from collections import Counter, deque
+from log_query import LogQuery, QueryError
+from log_index import LogIndex, forget_indexed_file, member_key
+from log_result_cache import SearchResultCache, source_version
+from log_view import (open_log_views, ProgressiveLog, VIEW_TEMP_DIR, REMOTE_PAGE_SIZE,
+                      PROGRESSIVE_MIN_SIZE)
+from log_cache import shared_cache, DEFAULT_CACHE_DIR
+from log_prefetch import (AccessHistory, PrefetchPaused, foreground,
+                          rank_prefetch_candidates, file_pattern)
+from log_results import ResultStore, ROW_HEADER
+from log_listing import FileListing, format_size, parse_size, typed_file_info
+from log_cancel import CancelToken, OperationCancelled
+from log_transport import TRANSPORT_PROFILES, DEFAULT_PROFILE, calibrate, store_calibration
+from log_fleet import scan_fleet, live_hosts, probe_host, HOST_UP, HOST_SLOW, HOST_DOWN
+from log_fleet_search import fleet_search, FleetTimeline
+from log_follow import LogFollower, FOLLOW_INTERVAL
+from log_histogram import LogHistogram, MINUTES_PER_DAY, minute_time_range
+from log_templates import mine_file
+from log_export import ExportWriter, export_hits, keyword_window, export_window_blocks
+from log_slice import window_seconds, window_byte_range, copy_byte_range
+import numpy as np
+from log_search import (iter_time_window_blocks, file_block_index, merge_timelines,
+                        tag_stream, parse_log_time, seconds_of_day, time_from_seconds,
+                        keyword_time_range, merge_time_range, log_prefix, iter_log_sources,
+                        log_source_members, search_file_bytes, search_zip_members, zip_log_members,
+                        hits_time_range)
+
+# 查看完整日志时一次最多复制的行数
+LOG_VIEW_COPY_LIMIT = 100000
+# 边下载边查看时每次从远程读取的字节数
+REMOTE_DOWNLOAD_CHUNK = 1024 * 1024
+# 边下载边查看时界面刷新的间隔（毫秒）
+LOG_VIEW_REFRESH_MS = 500
+# 时间范围结果每归并多少个日志块刷新一次结果列表
+RESULT_FLUSH_BLOCKS = 500
+# 搜索结果中命中词条的高亮颜色
+RESULT_HIGHLIGHT_COLOR = QColor(255, 235, 59, 160)
+# 操作日志区域保留的最大行数，更早的行被丢弃
+LOG_PANE_MAX_LINES = 5000
+# 操作日志区域合并刷新的间隔（毫秒）
+LOG_PANE_FLUSH_MS = 200
+# 获取日志列表时每批发送给界面的文件数
+LOG_LIST_BATCH_SIZE = 2000
+# 实时跟踪窗口保留的最大行数
+FOLLOW_VIEW_MAX_LINES = 10000
+# 后台预取的文件数量上限
+PREFETCH_MAX_FILES = 5
+# 用户打开日志文件的历史记录，用于预取排序
+access_history = AccessHistory()
 
 class LogCollectorWorker(QThread):
     progress = pyqtSignal(str, int, int)  # 文件名，当前进度，总大小
@@ -33,6 +87,11 @@ class LogCollectorWorker(QThread):
         super().__init__()
         self.config = config
         self.mode = mode
+        self.cancel_token = CancelToken()
+    
+    def cancel(self):
+        """取消收集或列出文件（正在进行的下载立即中止）"""
+        self.cancel_token.cancel()
         
     def run(self):
         try:
@@ -40,8 +99,17 @@ class LogCollectorWorker(QThread):
             if self.is_local_test_mode():
                 self.handle_local_test_mode()
                 return
+            
+            if self.mode == 'collect':
+                # 收集前先探测主机，关机或不可达时立即报错，不等待SSH连接超时
+                ssh = self.config['ssh']
+                status = probe_host(ssh['host'], ssh.get('port', 22))
+                if status['state'] == HOST_DOWN:
+                    self.error.emit(f"主机 {ssh['host']} 不可达: {status['error']}")
+                    return
                 
-            collector = LogCollector(config_file=None, progress_callback=self.update_progress)
+            collector = LogCollector(config_file=None, progress_callback=self.update_progress,
+                                     cancel_token=self.cancel_token)
             collector.config = self.config
             collector.connect()
             
@@ -52,6 +120,7 @@ class LogCollectorWorker(QThread):
                 elif self.mode == 'list':
                     # 获取文件列表
                     for path in self.config['log_paths']:
+                        self.cancel_token.check()
                         try:
                             # 根据系统类型选择命令
                             if collector.is_remote_windows():
@@ -90,6 +159,7 @@ class LogCollectorWorker(QThread):
                                             filename = ' '.join(parts[3:])
                                             file_info_list.append({
                                                 'name': filename,
+                                                'size': parts[2],
                                                 'date': f"{date_str} {time_str}",
                                                 'path': path
                                             })
@@ -119,17 +189,23 @@ class LogCollectorWorker(QThread):
                                         date_str = ' '.join(parts[5:8])
                                         file_info_list.append({
                                             'name': filename,
+                                            'size': parts[4],
                                             'date': date_str,
                                             'path': path
                                         })
                             
                             self.file_list.emit(file_info_list)
                         except Exception as e:
+                            self.cancel_token.check()
                             self.error.emit(f"列出目录 {path} 失败: {str(e)}")
             finally:
                 collector.close()
+        except OperationCancelled:
+            pass
         except Exception as e:
-            self.error.emit(str(e))
+            # 取消时连接被关闭引起的错误不再提示
+            if not self.cancel_token.cancelled:
+                self.error.emit(str(e))
 
     def is_local_test_mode(self):
         """检查是否为本地测试模式"""
@@ -161,14 +237,16 @@ class LogCollectorWorker(QThread):
                     for file in files:
                         file_path = os.path.join(path, file)
                         if os.path.isfile(file_path):
-                            # 获取文件修改时间
-                            mod_time = os.path.getmtime(file_path)
-                            date_str = datetime.fromtimestamp(mod_time).strftime('%Y-%m-%d %H:%M:%S')
+                            # 获取文件大小和修改时间
+                            file_stat = os.stat(file_path)
+                            date_str = datetime.fromtimestamp(file_stat.st_mtime).strftime('%Y-%m-%d %H:%M:%S')
                             
                             file_info_list.append({
                                 'name': file,
                                 'date': date_str,
-                                'path': path
+                                'path': path,
+                                'size_bytes': file_stat.st_size,
+                                'mtime': file_stat.st_mtime
                             })
             
             # 按修改时间排序
@@ -205,10 +283,14 @@ class LogCollectorWorker(QThread):
                         if os.path.isfile(file_path):
                             # 检查文件类型
                             if file.endswith('.log') or file.endswith('.zip'):
-                                # 检查日期范围（如果有设置）
-                                if self.config.get('use_date_range', False):
+                                # 检查日期范围（如果有设置，时间段的日期优先）
+                                time_window = self.config.get('time_window')
+                                if time_window:
+                                    start_date = end_date = datetime.strptime(time_window['date'], '%Y-%m-%d')
+                                elif self.config.get('use_date_range', False):
                                     start_date = datetime.strptime(self.config.get('start_date', ''), '%Y-%m-%d')
                                     end_date = datetime.strptime(self.config.get('end_date', ''), '%Y-%m-%d')
+                                if time_window or self.config.get('use_date_range', False):
                                     end_date = end_date.replace(hour=23, minute=59, second=59)  # 设置为当天结束时间
                                     
                                     # 尝试从文件名中提取日期
@@ -222,15 +304,22 @@ class LogCollectorWorker(QThread):
                                         except ValueError:
                                             pass  # 解析失败，保留文件
                                 
+                                self.cancel_token.check()
                                 # 将文件添加到收集列表
                                 collected_files.append(file_path)
                                 
-                                # 复制文件到临时目录
+                                # 复制文件到临时目录（指定时间段时普通日志只复制时间段对应的部分）
                                 dest_path = os.path.join(temp_dir, file)
-                                shutil.copy2(file_path, dest_path)
+                                if time_window and file.endswith('.log'):
+                                    window = window_seconds(time_window['start'], time_window['end'])
+                                    with open(file_path, 'rb') as f, open(dest_path, 'wb') as output:
+                                        start, end = window_byte_range(f, os.fstat(f.fileno()).st_size, *window)
+                                        copy_byte_range(f, start, end, output)
+                                else:
+                                    shutil.copy2(file_path, dest_path)
                                 
                                 # 更新进度
-                                file_size = os.path.getsize(file_path)
+                                file_size = os.path.getsize(dest_path)
                                 self.update_progress(file, file_size, file_size)
             
             if collected_files:
@@ -240,6 +329,7 @@ class LogCollectorWorker(QThread):
                 
                 with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
                     for file in os.listdir(temp_dir):
+                        self.cancel_token.check()
                         file_path = os.path.join(temp_dir, file)
                         zipf.write(file_path, arcname=file)
                 
@@ -248,6 +338,10 @@ class LogCollectorWorker(QThread):
             else:
                 self.error.emit("没有找到符合条件的日志文件")
                 
+        except OperationCancelled:
+            # 删除未完成的压缩包
+            if zip_path and os.path.exists(zip_path):
+                os.remove(zip_path)
         except Exception as e:
             self.error.emit(f"收集日志失败: {str(e)}")
         finally:
@@ -259,6 +353,18 @@ class LogCollectorWorker(QThread):
         """更新进度信号"""
         self.progress.emit(filename, current, total)
 
+def create_transport_combo():
+    """创建传输配置下拉框，项目数据为配置名称"""
+    combo = QComboBox()
+    for name in TRANSPORT_PROFILES:
+        combo.addItem(name, name)
+    return combo
+
+def set_transport_combo(combo, name):
+    """选中指定的传输配置，未知名称时选中默认配置"""
+    index = combo.findData(name if name in TRANSPORT_PROFILES else DEFAULT_PROFILE)
+    combo.setCurrentIndex(max(index, 0))
+
 class PathInputDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -353,8 +459,17 @@ class HostInputDialog(QDialog):
         credentials_layout.addWidget(password_label)
         credentials_layout.addWidget(self.password_input)
         
+        # 传输配置
+        transport_layout = QHBoxLayout()
+        transport_label = QLabel("传输配置:")
+        self.transport_combo = create_transport_combo()
+        transport_layout.addWidget(transport_label)
+        transport_layout.addWidget(self.transport_combo)
+        transport_layout.addStretch(1)
+        
         ssh_layout.addLayout(host_layout)
         ssh_layout.addLayout(credentials_layout)
+        ssh_layout.addLayout(transport_layout)
         
         layout.addWidget(ssh_group)
         
@@ -408,9 +523,12 @@ class HostInputDialog(QDialog):
             self.port_input.setValue(host_data.get("ssh", {}).get("port", 22))
             self.username_input.setText(host_data.get("ssh", {}).get("username", ""))
             self.password_input.setText(host_data.get("ssh", {}).get("password", ""))
+            set_transport_combo(self.transport_combo, host_data.get("ssh", {}).get("transport"))
             
             for path in host_data.get("log_paths", []):
                 self.path_list.addItem(path)
+        # 保留校准结果等其他字段
+        self.host_data = host_data or {}
     
     def add_path(self):
         """添加日志路径"""
@@ -428,17 +546,20 @@ class HostInputDialog(QDialog):
     
     def get_host_data(self):
         """获取主机数据"""
-        return {
+        host_data = dict(self.host_data)
+        host_data.update({
             "name": self.name_input.text(),
             "ssh": {
                 "host": self.host_input.text(),
                 "port": self.port_input.value(),
                 "username": self.username_input.text(),
-                "password": self.password_input.text()
+                "password": self.password_input.text(),
+                "transport": self.transport_combo.currentData()
             },
             "log_paths": [self.path_list.item(i).text() 
                           for i in range(self.path_list.count())]
-        }
+        })
+        return host_data
 
 class HostManagerDialog(QDialog):
     def __init__(self, parent=None, hosts_data=None):
@@ -542,19 +663,86 @@ class HostManagerDialog(QDialog):
         """获取主机数据"""
         return self.hosts_data
 
+class HostSelectDialog(QDialog):
+    """选择多主机搜索的主机，默认选中在线的主机（没有探测结果时选中全部）"""
+    def __init__(self, parent, hosts_data, host_states=None, checked_indexes=None):
+        super().__init__(parent)
+        self.setWindowTitle("选择要搜索的主机")
+        self.setMinimumWidth(360)
+        
+        layout = QVBoxLayout(self)
+        self.host_list = QListWidget()
+        checked = set(range(len(hosts_data)) if checked_indexes is None else checked_indexes)
+        for i, host in enumerate(hosts_data):
+            text = host.get("name", f"未命名主机{i+1}")
+            state = (host_states or {}).get(i)
+            if state is not None and state['state'] not in (HOST_UP, HOST_SLOW):
+                text += " [离线]"
+            item = QListWidgetItem(text)
+            item.setData(Qt.ItemDataRole.UserRole, i)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked if i in checked else Qt.CheckState.Unchecked)
+            self.host_list.addItem(item)
+        layout.addWidget(self.host_list)
+        
+        # 全选/全不选
+        select_layout = QHBoxLayout()
+        select_all_btn = QPushButton("全选")
+        select_none_btn = QPushButton("全不选")
+        select_all_btn.clicked.connect(lambda: self.set_all_checked(Qt.CheckState.Checked))
+        select_none_btn.clicked.connect(lambda: self.set_all_checked(Qt.CheckState.Unchecked))
+        select_layout.addWidget(select_all_btn)
+        select_layout.addWidget(select_none_btn)
+        select_layout.addStretch()
+        layout.addLayout(select_layout)
+        
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        button_box.accepted.connect(self.accept)
+        button_box.rejected.connect(self.reject)
+        layout.addWidget(button_box)
+    
+    def set_all_checked(self, state):
+        for row in range(self.host_list.count()):
+            self.host_list.item(row).setCheckState(state)
+    
+    def selected_indexes(self):
+        """获取选中主机的索引列表"""
+        return [self.host_list.item(row).data(Qt.ItemDataRole.UserRole)
+                for row in range(self.host_list.count())
+                if self.host_list.item(row).checkState() == Qt.CheckState.Checked]
+
+def _read_range(remote, offset, length):
+    """
+    按范围读取远程文件（SFTP请求并发发送，一次往返读取整个范围）
+    Args:
+        remote: open_remote_file 返回的远程文件对象
+        offset: 开始偏移
+        length: 读取的字节数
+    Returns:
+        bytes: 读取的内容
+    """
+    if length <= 0:
+        return b''
+    return b''.join(remote.readv([(offset, length)]))
+
 class LogAnalysisWorker(QThread):
-    log_list = pyqtSignal(list)  # 日志列表信号
-    search_result = pyqtSignal(str, list)  # 搜索结果信号，关键字和结果行列表
-    complete_log = pyqtSignal(str)  # 完整日志信号
+    log_list = pyqtSignal(list)  # 日志列表信号（全部文件，列表获取完成后发送）
+    log_batch = pyqtSignal(list)  # 日志列表批次信号，每批文件到达时发送，用于增量显示
+    log_view = pyqtSignal(list)  # 完整日志信号，已建立行索引的 MappedLog 列表
     error = pyqtSignal(str)  # 错误信号
     log_message_signal = pyqtSignal(str)  # 添加日志消息信号
     
-    def __init__(self, config, mode='list', log_path=None, keyword=None):
+    def __init__(self, config, mode='list', log_path=None):
         super().__init__()
         self.config = config
         self.mode = mode
         self.log_path = log_path
-        self.keyword = keyword
+        self.member_names = None  # 查看完整日志时只打开zip包中的这些成员，默认为全部
+        self.cancel_token = CancelToken()
+    
+    def cancel(self):
+        """取消当前任务（正在进行的下载和远程命令立即中止）"""
+        self.cancel_token.cancel()
     
     def log_message(self, message):
         """发送日志消息"""
@@ -566,8 +754,13 @@ class LogAnalysisWorker(QThread):
             if self.is_local_test_mode():
                 self.handle_local_test_mode()
                 return
+            
+            # 本地文件（例如已收集的日志）直接查看，不需要连接服务器
+            if self.mode == 'full' and self.log_path and os.path.exists(self.log_path):
+                self.get_local_full_log()
+                return
                 
-            collector = LogCollector(config_file=None)
+            collector = LogCollector(config_file=None, cancel_token=self.cancel_token)
             collector.config = self.config
             collector.connect()
             
@@ -576,20 +769,25 @@ class LogAnalysisWorker(QThread):
                     # 获取日志文件列表
                     files = self.get_log_files(collector)
                     self.log_list.emit(files)
-                elif self.mode == 'search':
-                    # 搜索关键字
-                    self.search_keyword(collector)
                 elif self.mode == 'full':
-                    # 获取完整日志
-                    self.get_full_log(collector)
+                    # 获取完整日志（期间暂停后台预取）
+                    access_history.record(self.log_path)
+                    with foreground:
+                        self.get_full_log(collector)
             finally:
                 collector.close()
+        except OperationCancelled:
+            self.log_message("任务已取消")
         except Exception as e:
-            self.error.emit(str(e))
+            if self.cancel_token.cancelled:
+                self.log_message("任务已取消")
+            else:
+                self.error.emit(str(e))
     
     def get_log_files(self, collector):
-        """获取日志文件列表"""
+        """获取日志文件列表，文件按批通过 log_batch 发送"""
         log_files = []
+        self._sent_count = 0  # 已通过 log_batch 发送的文件数
         
         # 获取日期范围
         start_date = datetime.strptime(self.config.get('start_date_analysis', ''), '%Y-%m-%d')
@@ -598,6 +796,7 @@ class LogAnalysisWorker(QThread):
         
         # 遍历所有日志路径
         for path in self.config['log_paths']:
+            self.cancel_token.check()
             self.log_message(f"获取目录中的日志文件: {path}")
             
             # 根据系统类型选择命令
@@ -658,342 +857,261 @@ class LogAnalysisWorker(QThread):
                             if len(parts) >= 4:
                                 try:
                                     # 尝试提取日期和大小
-                                    date_str = parts[0]
-                                    size = int(parts[3].replace(',', ''))
-                                    if size < 1024:
-                                        size_str = f"{size} B"
-                                    elif size < 1024 * 1024:
-                                        size_str = f"{size / 1024:.2f} KB"
-                                    else:
-                                        size_str = f"{size / (1024 * 1024):.2f} MB"
+                                    date_str = f"{parts[0]} {parts[1]}"
+                                    # 12小时制时大小前还有 AM/PM
+                                    size_text = next(p for p in parts[2:4] if parse_size(p) >= 0)
+                                    size_str = format_size(parse_size(size_text))
                                 except:
                                     pass
                     
-                    log_files.append({
+                    self._add_log_file(log_files, typed_file_info({
                         'path': file_path,
                         'name': file_name,
                         'size': size_str,
                         'date': date_str
-                    })
+                    }))
             else:
-                # Linux系统使用find命令查找日志文件
-                cmd = f'find {path} -type f \\( -name "*.log" -o -name "*.zip" \\) -print'
+                # Linux系统使用一条find命令同时获取每个文件的大小和修改时间
+                cmd = (f'find {shlex.quote(path)} -type f \\( -name "*.log" -o -name "*.zip" \\) '
+                       f"-printf '%p\\t%s\\t%T@\\n'")
                 stdin, stdout, stderr = collector.ssh.exec_command(cmd)
+                output = stdout.read().decode('utf-8', errors='ignore')
+                if stdout.channel.recv_exit_status() != 0 and not output.strip():
+                    # 不支持 -printf 的 find（例如 busybox），逐个文件执行 ls
+                    self._list_linux_files_by_ls(collector, path, start_date, end_date, log_files)
+                    output = ''
                 
-                try:
-                    files = stdout.read().decode('utf-8').splitlines()
-                except UnicodeDecodeError:
-                    stdin, stdout, stderr = collector.ssh.exec_command(cmd)
-                    files = stdout.read().decode('utf-8', errors='ignore').splitlines()
-                
-                # 遍历找到的文件
-                for file_path in files:
-                    if not file_path.strip():
+                for line in output.splitlines():
+                    fields = line.rsplit('\t', 2)
+                    if len(fields) != 3:
                         continue
-                    
-                    # 提取文件名
+                    file_path, size_text, mtime_text = fields
                     file_name = os.path.basename(file_path)
-                    
-                    # 尝试从文件名中提取日期
-                    date_match = re.search(r'(\d{4}-\d{2}-\d{2})', file_name)
-                    if date_match:
-                        file_date_str = date_match.group(1)
-                        try:
-                            file_date = datetime.strptime(file_date_str, '%Y-%m-%d')
-                            if not (start_date <= file_date <= end_date):
-                                continue  # 跳过不在日期范围内的文件
-                        except ValueError:
-                            pass  # 解析失败，保留文件
-                    
-                    # 获取文件信息
-                    cmd = f'ls -lh "{file_path}"'
-                    stdin, stdout, stderr = collector.ssh.exec_command(cmd)
-                    
+                    if not self._in_date_range(file_name, start_date, end_date):
+                        continue
                     try:
-                        file_info = stdout.read().decode('utf-8').strip()
-                    except UnicodeDecodeError:
-                        stdin, stdout, stderr = collector.ssh.exec_command(cmd)
-                        file_info = stdout.read().decode('utf-8', errors='ignore').strip()
-                    
-                    # 从ls命令输出中提取文件大小和日期
-                    parts = file_info.split()
-                    size_str = "未知"
-                    date_str = "未知"
-                    if len(parts) >= 8:
-                        try:
-                            size_str = parts[4]
-                            date_str = ' '.join(parts[5:8])
-                        except:
-                            pass
-                    
-                    log_files.append({
+                        size = int(size_text)
+                        mtime = float(mtime_text)
+                    except ValueError:
+                        size, mtime = -1, -1.0
+                    self._add_log_file(log_files, {
                         'path': file_path,
                         'name': file_name,
-                        'size': size_str,
-                        'date': date_str
+                        'size': format_size(size),
+                        'date': datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S') if mtime >= 0 else "未知",
+                        'size_bytes': size,
+                        'mtime': mtime
                     })
+            
+            # 发送本目录中剩余的文件
+            self._flush_log_batch(log_files)
         
         return log_files
     
-    def search_keyword(self, collector):
-        """在日志文件中搜索关键字"""
-        if not self.log_path or not self.keyword:
-            self.error.emit("缺少日志文件路径或关键字")
-            return
-        
+    def _in_date_range(self, file_name, start_date, end_date):
+        """文件名中带日期时，检查日期是否在选择的范围内（没有日期或解析失败时保留文件）"""
+        date_match = re.search(r'(\d{4}-\d{2}-\d{2})', file_name)
+        if not date_match:
+            return True
         try:
-            # 从日志文件路径中提取文件名
-            log_name = os.path.basename(self.log_path)
+            file_date = datetime.strptime(date_match.group(1), '%Y-%m-%d')
+        except ValueError:
+            return True
+        return start_date <= file_date <= end_date
+    
+    def _add_log_file(self, log_files, info):
+        """添加一个日志文件，攒够一批时发送给界面"""
+        self.cancel_token.check()
+        log_files.append(info)
+        if len(log_files) - self._sent_count >= LOG_LIST_BATCH_SIZE:
+            self._flush_log_batch(log_files)
+    
+    def _flush_log_batch(self, log_files):
+        """发送尚未发送的日志文件"""
+        if len(log_files) > self._sent_count:
+            self.log_batch.emit(log_files[self._sent_count:])
+            self._sent_count = len(log_files)
+    
+    def _list_linux_files_by_ls(self, collector, path, start_date, end_date, log_files):
+        """使用 find -print 列出文件，再逐个执行 ls 获取大小和日期"""
+        cmd = f'find {shlex.quote(path)} -type f \\( -name "*.log" -o -name "*.zip" \\) -print'
+        stdin, stdout, stderr = collector.ssh.exec_command(cmd)
+        files = stdout.read().decode('utf-8', errors='ignore').splitlines()
+        
+        for file_path in files:
+            if not file_path.strip():
+                continue
+            file_name = os.path.basename(file_path)
+            if not self._in_date_range(file_name, start_date, end_date):
+                continue
             
-            # 检查是否为zip文件
-            if self.log_path.lower().endswith('.zip'):
-                # 对压缩文件先获取到本地缓存，然后进行搜索
-                cached_file = self._get_cached_file(self.log_path, collector)
-                if not cached_file:
-                    self.error.emit(f"无法获取日志文件: {self.log_path}")
-                    return
-                
-                # 读取压缩文件内容
-                import zipfile
-                import tempfile
-                
-                # 创建临时目录存放解压的文件
-                temp_dir = tempfile.mkdtemp()
-                results = []
-                
-                try:
-                    # 解压文件
-                    with zipfile.ZipFile(cached_file, 'r') as zip_ref:
-                        # 获取zip文件中的所有文件
-                        file_list = zip_ref.namelist()
-                        
-                        # 遍历压缩包中的每个文件
-                        for file_name in file_list:
-                            # 只处理日志文件
-                            if not file_name.lower().endswith('.log'):
-                                continue
-                            
-                            # 解压到临时目录
-                            zip_ref.extract(file_name, temp_dir)
-                            extracted_file = os.path.join(temp_dir, file_name)
-                            
-                            # 读取文件内容
-                            content = self._read_file_content(extracted_file)
-                            
-                            # 搜索关键字
-                            found_lines = []
-                            for i, line in enumerate(content.splitlines()):
-                                if self.keyword.lower() in line.lower():
-                                    found_lines.append({
-                                        'line_num': i + 1,
-                                        'content': line.strip(),
-                                        'file': file_name
-                                    })
-                            
-                            # 如果找到结果，添加到结果列表
-                            if found_lines:
-                                results.extend(found_lines)
-                    
-                    # 发送搜索结果
-                    self.search_result.emit(self.keyword, results)
-                finally:
-                    # 清理临时目录
-                    import shutil
-                    if os.path.exists(temp_dir):
-                        shutil.rmtree(temp_dir)
-            else:
-                # 处理普通日志文件
-                # 根据系统类型选择命令
-                if collector.is_remote_windows():
-                    # Windows上使用findstr命令
-                    cmd = f'findstr /N /I "{self.keyword}" "{self.log_path}"'
-                    stdin, stdout, stderr = collector.ssh.exec_command(cmd)
-                    try:
-                        output = stdout.read().decode('gbk')
-                    except UnicodeDecodeError:
-                        stdin, stdout, stderr = collector.ssh.exec_command(cmd)
-                        output = stdout.read().decode('utf-8', errors='ignore')
-                else:
-                    # Linux上使用grep命令
-                    cmd = f'grep -n -i "{self.keyword}" "{self.log_path}"'
-                    stdin, stdout, stderr = collector.ssh.exec_command(cmd)
-                    output = stdout.read().decode('utf-8')
-                
-                # 解析搜索结果
-                results = []
-                for line in output.splitlines():
-                    if not line.strip():
-                        continue
-                    
-                    # 尝试解析行号和内容
-                    try:
-                        if ':' in line:
-                            parts = line.split(':', 1)
-                            line_num = int(parts[0])
-                            content = parts[1].strip()
-                            results.append({
-                                'line_num': line_num,
-                                'content': content,
-                                'file': log_name
-                            })
-                    except:
-                        # 如果解析失败，将整行作为内容
-                        results.append({
-                            'line_num': 0,
-                            'content': line.strip(),
-                            'file': log_name
-                        })
-                
-                # 发送搜索结果
-                self.search_result.emit(self.keyword, results)
-        except Exception as e:
-            self.error.emit(f"搜索关键字时出错: {str(e)}")
+            # 获取文件信息（不使用 -h，得到准确的字节数）
+            stdin, stdout, stderr = collector.ssh.exec_command(f'ls -l {shlex.quote(file_path)}')
+            parts = stdout.read().decode('utf-8', errors='ignore').strip().split()
+            size_str = "未知"
+            date_str = "未知"
+            if len(parts) >= 8:
+                size_str = parts[4]
+                date_str = ' '.join(parts[5:8])
+            
+            self._add_log_file(log_files, typed_file_info({
+                'path': file_path,
+                'name': file_name,
+                'size': size_str,
+                'date': date_str
+            }))
     
     def get_full_log(self, collector):
-        """获取完整的日志内容"""
+        """获取完整的日志内容：先获取到本地缓存，再映射文件并建立行索引，不截断大文件"""
         if not self.log_path:
             self.error.emit("缺少日志文件路径")
             return
         
         try:
-            # 检查是否为zip文件
-            if self.log_path.lower().endswith('.zip'):
-                # 对压缩文件先获取到本地缓存，然后进行处理
-                cached_file = self._get_cached_file(self.log_path, collector)
-                if not cached_file:
-                    self.error.emit(f"无法获取日志文件: {self.log_path}")
-                    return
-                
-                # 读取压缩文件内容
-                import zipfile
-                import tempfile
-                
-                # 创建临时目录存放解压的文件
-                temp_dir = tempfile.mkdtemp()
-                full_content = ""
-                
-                try:
-                    # 解压文件
-                    with zipfile.ZipFile(cached_file, 'r') as zip_ref:
-                        # 获取zip文件中的所有文件
-                        file_list = zip_ref.namelist()
-                        
-                        # 遍历压缩包中的每个文件
-                        for file_name in file_list:
-                            # 只处理日志文件
-                            if not file_name.lower().endswith('.log'):
-                                continue
-                            
-                            # 解压到临时目录
-                            zip_ref.extract(file_name, temp_dir)
-                            extracted_file = os.path.join(temp_dir, file_name)
-                            
-                            # 读取文件内容
-                            content = self._read_file_content(extracted_file)
-                            
-                            # 添加文件名标题
-                            full_content += f"\n\n===== {file_name} =====\n\n"
-                            full_content += content
-                    
-                    # 发送完整日志内容
-                    self.complete_log.emit(full_content)
-                finally:
-                    # 清理临时目录
-                    import shutil
-                    if os.path.exists(temp_dir):
-                        shutil.rmtree(temp_dir)
+            # 未缓存的大文件先显示首尾页，再在后台下载
+            if self._view_remote_progressively(collector):
+                return
+            
+            # 先获取到本地缓存
+            cached_file = self._get_cached_file(self.log_path, collector)
+            if cached_file:
+                self._emit_log_views(cached_file, os.path.basename(self.log_path))
+            elif self.log_path.lower().endswith('.zip'):
+                self.error.emit(f"无法获取日志文件: {self.log_path}")
             else:
-                # 处理普通日志文件
-                # 获取文件内容
-                cached_file = self._get_cached_file(self.log_path, collector)
-                if cached_file:
-                    # 读取本地缓存文件
-                    content = self._read_file_content(cached_file)
-                    self.complete_log.emit(content)
-                else:
-                    # 直接从远程读取文件内容
-                    if collector.is_remote_windows():
-                        cmd = f'type "{self.log_path}"'
-                    else:
-                        cmd = f'cat "{self.log_path}"'
-                    
-                    stdin, stdout, stderr = collector.ssh.exec_command(cmd)
-                    try:
-                        if collector.is_remote_windows():
-                            content = stdout.read().decode('gbk')
-                        else:
-                            content = stdout.read().decode('utf-8')
-                    except UnicodeDecodeError:
-                        content = stdout.read().decode('utf-8', errors='ignore')
-                    
-                    self.complete_log.emit(content)
+                # 直接从远程读取文件内容，保存为临时文件后查看
+                temp_file = self._download_via_command(collector)
+                self._emit_log_views(temp_file, os.path.basename(self.log_path), temporary=True)
+        except OperationCancelled:
+            raise
         except Exception as e:
+            self.cancel_token.check()
             self.error.emit(f"获取完整日志时出错: {str(e)}")
     
-    def _get_cached_file(self, remote_path, collector):
-        """获取远程文件的本地缓存"""
-        import tempfile
-        import os
-        import hashlib
-        
-        # 创建缓存目录
-        cache_dir = os.path.join(tempfile.gettempdir(), "log_cache")
-        os.makedirs(cache_dir, exist_ok=True)
-        
-        # 计算文件哈希作为缓存文件名
-        file_hash = hashlib.md5(remote_path.encode()).hexdigest()
-        file_ext = os.path.splitext(remote_path)[1]
-        cached_file = os.path.join(cache_dir, f"{file_hash}{file_ext}")
-        
-        # 如果缓存文件已存在，直接返回
-        if os.path.exists(cached_file):
-            return cached_file
-        
-        # 下载文件到缓存目录
+    def _view_remote_progressively(self, collector):
+        """
+        通过SFTP按范围读取远程日志：先读取开头和结尾的页立即显示，再在后台顺序下载中间部分；
+        查看窗口跳转或滚动到尚未下载的位置时，优先读取需要显示的页。下载完成的文件放入分析缓存。
+        已有有效缓存、zip文件和较小的文件不使用此方式
+        Returns:
+            bool: 是否已按此方式处理
+        """
+        if self.log_path.lower().endswith('.zip'):
+            return False
+        size, mtime = collector.stat_file(self.log_path)
+        host = collector.config.get('ssh', {}).get('host', '')
+        cache = shared_cache(on_evict=forget_indexed_file)
+        if size < PROGRESSIVE_MIN_SIZE or cache.lookup(host, self.log_path, size, mtime):
+            return False
+        
+        title = os.path.basename(self.log_path)
+        os.makedirs(VIEW_TEMP_DIR, exist_ok=True)
+        fd, temp_file = tempfile.mkstemp(suffix='.log', dir=VIEW_TEMP_DIR)
+        view = None
         try:
-            self.log_message(f"下载文件到本地缓存: {os.path.basename(remote_path)}")
-            collector.download_file(remote_path, cached_file)
-            return cached_file
-        except Exception as e:
-            self.log_message(f"下载文件失败: {str(e)}")
-            return None
-    
-    def _read_file_with_encoding(self, file_path):
-        """尝试不同编码读取文件内容"""
-        encodings = ['utf-8', 'gbk', 'gb2312', 'iso-8859-1']
+            with collector.open_remote_file(self.log_path) as remote, os.fdopen(fd, 'wb') as f:
+                fd = None  # 已由文件对象负责关闭
+                # 首尾两页各一次范围读取
+                head_data = _read_range(remote, 0, min(REMOTE_PAGE_SIZE, size))
+                tail_start = max(size - REMOTE_PAGE_SIZE, len(head_data))
+                tail_data = _read_range(remote, tail_start, size - tail_start)
+                f.write(head_data)
+                f.flush()
+                view = ProgressiveLog(temp_file, tail_data, size, title)
+                self.log_view.emit([view])
+                self.log_message(f"已显示 {title} 的开头和结尾，正在后台下载其余部分...")
+                
+                # 顺序下载中间部分，界面定时索引新写入的内容；
+                # 每个数据块之间先处理查看窗口的按需读取请求（下载位置附近的请求由顺序下载完成）
+                position = len(head_data)
+                while position < size and not view.closed and not self.cancel_token.cancelled:
+                    request = view.take_request()
+                    if request is not None and request[0] >= position + REMOTE_DOWNLOAD_CHUNK:
+                        view.add_page(request[0], _read_range(remote, *request))
+                        continue
+                    data = _read_range(remote, position, min(REMOTE_DOWNLOAD_CHUNK, size - position))
+                    if not data:
+                        break
+                    f.write(data)
+                    f.flush()
+                    position += len(data)
+        except Exception:
+            if fd is not None:
+                os.close(fd)
+            if view is None:
+                # 还没有交给查看窗口，删除临时文件
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+            raise
         
-        for encoding in encodings:
+        if view.closed:
+            # 查看窗口已关闭，删除未下载完的临时文件
             try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    return f.read()
-            except UnicodeDecodeError:
-                continue
+                os.remove(temp_file)
+            except OSError:
+                pass
+        elif position < size:
+            # 下载被取消，已下载的部分仍可查看，临时文件在关闭查看窗口时删除
+            self.log_message(f"{title} 的下载已取消")
+        else:
+            try:
+                cache.store(host, self.log_path, size, mtime, temp_file)
+            except OSError as e:
+                self.log_message(f"保存 {title} 到分析缓存失败: {str(e)}")
+            view.finish_download()
+            self.log_message(f"{title} 下载完成")
+        return True
+    
+    def _download_via_command(self, collector):
+        """通过远程命令输出读取文件内容，分块写入临时文件"""
+        if collector.is_remote_windows():
+            cmd = f'type "{self.log_path}"'
+        else:
+            cmd = f'cat {shlex.quote(self.log_path)}'
         
-        # 如果所有编码都失败，使用二进制模式读取
-        with open(file_path, 'rb') as f:
-            binary_content = f.read()
-            return binary_content.decode('utf-8', errors='ignore')
+        os.makedirs(VIEW_TEMP_DIR, exist_ok=True)
+        fd, temp_file = tempfile.mkstemp(suffix='.log', dir=VIEW_TEMP_DIR)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                stdin, stdout, stderr = collector.ssh.exec_command(cmd)
+                while True:
+                    self.cancel_token.check()
+                    data = stdout.read(REMOTE_DOWNLOAD_CHUNK)
+                    if not data:
+                        break
+                    f.write(data)
+            self.cancel_token.check()
+        except Exception:
+            # 删除未写完的临时文件
+            os.remove(temp_file)
+            raise
+        return temp_file
+    
+    def _emit_log_views(self, local_path, title, temporary=False):
+        """映射本地文件并建立行索引，然后发送给界面显示"""
+        reported = {}
+        
+        def report_progress(name, done, total):
+            # 大文件每完成10%报告一次
+            percent = done * 10 // total if total else 10
+            if total > 64 * 1024 * 1024 and reported.get(name) != percent:
+                reported[name] = percent
+                self.log_message(f"建立行索引 {name}: {percent * 10}%")
+        
+        views = open_log_views(local_path, member_names=self.member_names,
+                               progress_callback=report_progress, title=title, temporary=temporary)
+        self.log_view.emit(views)
     
-    def _read_file_content(self, file_path):
-        """读取文件内容，尝试自动检测换行符和编码"""
+    def _get_cached_file(self, remote_path, collector):
+        """获取远程文件的本地缓存，远程文件变化时重新下载"""
         try:
-            # 尝试使用不同的编码读取文件
-            content = self._read_file_with_encoding(file_path)
-            
-            # 检查文件大小，如果超过一定大小，可能会导致UI卡顿
-            if len(content) > 5 * 1024 * 1024:  # 5MB
-                self.log_message("文件较大，仅显示前后部分内容...")
-                lines = content.splitlines()
-                if len(lines) > 2000:
-                    # 只保留前1000行和后1000行
-                    first_part = '\n'.join(lines[:1000])
-                    last_part = '\n'.join(lines[-1000:])
-                    content = first_part + "\n\n...... [文件过大，中间内容已省略] ......\n\n" + last_part
-            
-            return content
+            return shared_cache(on_evict=forget_indexed_file).get(
+                collector, remote_path, log_callback=self.log_message)
         except Exception as e:
-            self.log_message(f"读取文件内容失败: {str(e)}")
-            return f"无法读取文件内容: {str(e)}"
+            self.log_message(f"下载文件失败: {str(e)}")
+            return None
     
     def is_local_test_mode(self):
         """检查是否为本地测试模式"""
@@ -1006,16 +1124,17 @@ class LogAnalysisWorker(QThread):
         try:
             if self.mode == 'list':
                 self.get_local_log_files()
-            elif self.mode == 'search':
-                self.search_local_keyword()
             elif self.mode == 'full':
                 self.get_local_full_log()
+        except OperationCancelled:
+            self.log_message("任务已取消")
         except Exception as e:
             self.error.emit(f"本地测试模式出错: {str(e)}")
     
     def get_local_log_files(self):
-        """获取本地日志文件列表"""
+        """获取本地日志文件列表，文件按批通过 log_batch 发送"""
         log_files = []
+        self._sent_count = 0
         
         # 获取日期范围
         start_date = datetime.strptime(self.config.get('start_date_analysis', ''), '%Y-%m-%d')
@@ -1033,130 +1152,37 @@ class LogAnalysisWorker(QThread):
                         if file.endswith('.log') or file.endswith('.zip'):
                             file_path = os.path.join(root, file)
                             
-                            # 尝试从文件名中提取日期
-                            date_match = re.search(r'(\d{4}-\d{2}-\d{2})', file)
-                            if date_match:
-                                file_date_str = date_match.group(1)
-                                try:
-                                    file_date = datetime.strptime(file_date_str, '%Y-%m-%d')
-                                    if not (start_date <= file_date <= end_date):
-                                        continue  # 跳过不在日期范围内的文件
-                                except ValueError:
-                                    pass  # 解析失败，保留文件
+                            # 跳过文件名中的日期不在范围内的文件
+                            if not self._in_date_range(file, start_date, end_date):
+                                continue
                             
                             # 获取文件信息
                             try:
                                 file_stat = os.stat(file_path)
-                                size = file_stat.st_size
-                                if size < 1024:
-                                    size_str = f"{size} B"
-                                elif size < 1024 * 1024:
-                                    size_str = f"{size / 1024:.2f} KB"
-                                else:
-                                    size_str = f"{size / (1024 * 1024):.2f} MB"
-                                
                                 mod_time = datetime.fromtimestamp(file_stat.st_mtime)
-                                date_str = mod_time.strftime('%Y-%m-%d %H:%M:%S')
                                 
-                                log_files.append({
+                                self._add_log_file(log_files, {
                                     'path': file_path,
                                     'name': file,
-                                    'size': size_str,
-                                    'date': date_str
+                                    'size': format_size(file_stat.st_size),
+                                    'date': mod_time.strftime('%Y-%m-%d %H:%M:%S'),
+                                    'size_bytes': file_stat.st_size,
+                                    'mtime': file_stat.st_mtime
                                 })
                             except:
                                 # 如果获取文件信息失败，使用默认值
-                                log_files.append({
+                                self._add_log_file(log_files, typed_file_info({
                                     'path': file_path,
                                     'name': file,
                                     'size': '未知',
                                     'date': '未知'
-                                })
+                                }))
             else:
                 self.log_message(f"目录不存在: {path}")
         
+        self._flush_log_batch(log_files)
         self.log_list.emit(log_files)
     
-    def search_local_keyword(self):
-        """在本地日志文件中搜索关键字"""
-        if not self.log_path or not self.keyword:
-            self.error.emit("缺少日志文件路径或关键字")
-            return
-        
-        try:
-            # 从日志文件路径中提取文件名
-            log_name = os.path.basename(self.log_path)
-            
-            # 检查是否为zip文件
-            if self.log_path.lower().endswith('.zip'):
-                # 读取压缩文件内容
-                import zipfile
-                import tempfile
-                
-                # 创建临时目录存放解压的文件
-                temp_dir = tempfile.mkdtemp()
-                results = []
-                
-                try:
-                    # 解压文件
-                    with zipfile.ZipFile(self.log_path, 'r') as zip_ref:
-                        # 获取zip文件中的所有文件
-                        file_list = zip_ref.namelist()
-                        
-                        # 遍历压缩包中的每个文件
-                        for file_name in file_list:
-                            # 只处理日志文件
-                            if not file_name.lower().endswith('.log'):
-                                continue
-                            
-                            # 解压到临时目录
-                            zip_ref.extract(file_name, temp_dir)
-                            extracted_file = os.path.join(temp_dir, file_name)
-                            
-                            # 读取文件内容
-                            content = self._read_file_content(extracted_file)
-                            
-                            # 搜索关键字
-                            found_lines = []
-                            for i, line in enumerate(content.splitlines()):
-                                if self.keyword.lower() in line.lower():
-                                    found_lines.append({
-                                        'line_num': i + 1,
-                                        'content': line.strip(),
-                                        'file': file_name
-                                    })
-                            
-                            # 如果找到结果，添加到结果列表
-                            if found_lines:
-                                results.extend(found_lines)
-                    
-                    # 发送搜索结果
-                    self.search_result.emit(self.keyword, results)
-                finally:
-                    # 清理临时目录
-                    import shutil
-                    if os.path.exists(temp_dir):
-                        shutil.rmtree(temp_dir)
-            else:
-                # 处理普通日志文件
-                # 读取文件内容
-                content = self._read_file_content(self.log_path)
-                
-                # 搜索关键字
-                results = []
-                for i, line in enumerate(content.splitlines()):
-                    if self.keyword.lower() in line.lower():
-                        results.append({
-                            'line_num': i + 1,
-                            'content': line.strip(),
-                            'file': log_name
-                        })
-                
-                # 发送搜索结果
-                self.search_result.emit(self.keyword, results)
-        except Exception as e:
-            self.error.emit(f"搜索关键字时出错: {str(e)}")
-    
     def get_local_full_log(self):
         """获取本地日志文件的完整内容"""
         if not self.log_path:
@@ -1164,53 +1190,8 @@ class LogAnalysisWorker(QThread):
             return
         
         try:
-            # 检查是否为zip文件
-            if self.log_path.lower().endswith('.zip'):
-                # 读取压缩文件内容
-                import zipfile
-                import tempfile
-                
-                # 创建临时目录存放解压的文件
-                temp_dir = tempfile.mkdtemp()
-                full_content = ""
-                
-                try:
-                    # 解压文件
-                    with zipfile.ZipFile(self.log_path, 'r') as zip_ref:
-                        # 获取zip文件中的所有文件
-                        file_list = zip_ref.namelist()
-                        
-                        # 遍历压缩包中的每个文件
-                        for file_name in file_list:
-                            # 只处理日志文件
-                            if not file_name.lower().endswith('.log'):
-                                continue
-                            
-                            # 解压到临时目录
-                            zip_ref.extract(file_name, temp_dir)
-                            extracted_file = os.path.join(temp_dir, file_name)
-                            
-                            # 读取文件内容
-                            content = self._read_file_content(extracted_file)
-                            
-                            # 添加文件名标题
-                            full_content += f"\n\n===== {file_name} =====\n\n"
-                            full_content += content
-                    
-                    # 发送完整日志内容
-                    self.complete_log.emit(full_content)
-                finally:
-                    # 清理临时目录
-                    import shutil
-                    if os.path.exists(temp_dir):
-                        shutil.rmtree(temp_dir)
-            else:
-                # 处理普通日志文件
-                # 读取文件内容
-                content = self._read_file_content(self.log_path)
-                
-                # 发送完整日志内容
-                self.complete_log.emit(content)
+            # 映射文件并建立行索引，zip包中的日志文件解压到临时文件
+            self._emit_log_views(self.log_path, os.path.basename(self.log_path))
         except Exception as e:
             self.error.emit(f"获取完整日志时出错: {str(e)}")
     
@@ -1242,85 +1223,1637 @@ class LogAnalysisWorker(QThread):
         
         return '\n'.join(result_lines)
 
-class MainWindow(QMainWindow):
-    def __init__(self):
+class LogIndexWorker(QThread):
+    """在后台更新日志缓存和已收集日志的全文索引"""
+    finished = pyqtSignal(int)  # 完成信号，新索引的行数
+    error = pyqtSignal(str)     # 错误信号
+    
+    def __init__(self, directories=(), files=()):
+        """
+        Args:
+            directories: 要索引的本地目录列表
+            files: 要索引的本地文件列表（例如搜索时发现索引不是最新的文件）
+        """
         super().__init__()
-        self.setWindowTitle("车道系统日志收集分析工具")
-        self.setMinimumSize(800, 600)
-        
-        # 主机配置数据
-        self.hosts_data = []
-        
-        # 创建菜单栏
-        self.create_menu_bar()
-        
-        # 创建主窗口部件
-        main_widget = QWidget()
-        self.setCentralWidget(main_widget)
-        main_layout = QVBoxLayout(main_widget)
-        
-        # 主机选择区域
-        host_select_group = QGroupBox("主机选择")
-        host_select_layout = QHBoxLayout(host_select_group)
-        
-        host_label = QLabel("选择主机:")
-        self.host_combo = QComboBox()
-        self.host_combo.setMinimumWidth(200)
-        manage_hosts_btn = QPushButton("管理主机")
-        
-        host_select_layout.addWidget(host_label)
-        host_select_layout.addWidget(self.host_combo)
-        host_select_layout.addWidget(manage_hosts_btn)
-        host_select_layout.addStretch(1)
-        
-        # 连接主机选择变化信号
-        self.host_combo.currentIndexChanged.connect(self.on_host_changed)
-        manage_hosts_btn.clicked.connect(self.manage_hosts)
-        
-        # SSH连接设置
-        ssh_group = QGroupBox("SSH连接设置")
-        ssh_layout = QVBoxLayout(ssh_group)
-        
-        # 主机设置
-        host_layout = QHBoxLayout()
-        host_label = QLabel("主机地址:")
-        self.host_input = QLineEdit()
-        self.host_input.setPlaceholderText("例如: 192.168.1.100")
-        port_label = QLabel("端口:")
-        self.port_input = QSpinBox()
-        self.port_input.setRange(1, 65535)
-        self.port_input.setValue(22)
-        host_layout.addWidget(host_label)
-        host_layout.addWidget(self.host_input)
-        host_layout.addWidget(port_label)
-        host_layout.addWidget(self.port_input)
-        
-        # 用户名密码设置
-        credentials_layout = QHBoxLayout()
-        username_label = QLabel("用户名:")
-        self.username_input = QLineEdit()
-        password_label = QLabel("密码:")
-        self.password_input = QLineEdit()
-        self.password_input.setEchoMode(QLineEdit.EchoMode.Password)
-        credentials_layout.addWidget(username_label)
-        credentials_layout.addWidget(self.username_input)
-        credentials_layout.addWidget(password_label)
-        credentials_layout.addWidget(self.password_input)
-        
-        ssh_layout.addLayout(host_layout)
-        ssh_layout.addLayout(credentials_layout)
-        
-        # 创建功能选项卡容器
-        function_tabs = QTabWidget()
-        function_tabs.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        
-        # 创建日志收集页
-        collect_tab = QWidget()
-        collect_layout = QVBoxLayout(collect_tab)
-        
-        # 日期选择
-        date_group = QGroupBox("日期设置")
-        date_layout = QVBoxLayout(date_group)
+        self.directories = directories
+        self.files = files
+    
+    def run(self):
+        try:
+            index = LogIndex()
+            try:
+                total = 0
+                for directory in self.directories:
+                    if os.path.isdir(directory):
+                        total += index.update_directory(directory)
+                for path in self.files:
+                    if os.path.isfile(path):
+                        total += index.update_file(path)
+            finally:
+                index.close()
+            self.finished.emit(total)
+        except Exception as e:
+            self.error.emit(f"更新搜索索引失败: {str(e)}")
+
+class LogPrefetchWorker(QThread):
+    """
+    后台预取线程
+    日志列表显示后，把最可能被查看的文件提前下载到分析缓存；
+    前台搜索或查看日志时立即中止当前下载，空闲后再继续
+    """
+    log_message_signal = pyqtSignal(str)  # 添加日志消息信号
+    
+    def __init__(self, config, logs, max_files=PREFETCH_MAX_FILES):
+        super().__init__()
+        self.config = config
+        self.logs = logs
+        self.max_files = max_files
+        self._stopped = False
+    
+    def stop(self):
+        """停止预取（当前下载在下一个数据块时中止）"""
+        self._stopped = True
+    
+    def cancel(self):
+        """取消预取，与 stop() 相同"""
+        self.stop()
+    
+    def _check_yield(self, filename, transferred, total):
+        """下载进度回调：有前台任务或已停止时中止下载"""
+        if self._stopped or foreground.is_busy():
+            raise PrefetchPaused()
+    
+    def _wait_idle(self):
+        """等待前台任务结束，返回是否可以继续预取"""
+        while not self._stopped:
+            if foreground.wait_idle(timeout=1):
+                return True
+        return False
+    
+    def run(self):
+        paths = rank_prefetch_candidates(self.logs, access_history.load())[:self.max_files]
+        if not paths:
+            return
+        cache = shared_cache(on_evict=forget_indexed_file)
+        collector = LogCollector(config_file=None, progress_callback=self._check_yield)
+        collector.config = self.config
+        try:
+            for path in paths:
+                while self._wait_idle():
+                    try:
+                        if not collector.is_connected():
+                            collector.connect()
+                        # 太大的文件会挤掉其他缓存，留给用户按需下载
+                        size, _ = collector.stat_file(path)
+                        if size > cache.max_bytes // 4:
+                            break
+                        cache.get(collector, path)
+                        self.log_message_signal.emit(f"已预取: {os.path.basename(path)}")
+                        break
+                    except PrefetchPaused:
+                        # 前台任务需要连接，等待空闲后重新下载该文件
+                        continue
+                    except Exception as e:
+                        self.log_message_signal.emit(f"预取 {os.path.basename(path)} 失败: {str(e)}")
+                        break
+                if self._stopped:
+                    break
+        finally:
+            collector.close()
+
+class TransportCalibrationWorker(QThread):
+    """测量每种SSH传输配置在当前主机上的速度"""
+    result = pyqtSignal(str, dict)  # 最快的配置名称，每种配置的吞吐量
+    error = pyqtSignal(str)         # 错误信号
+    log_message_signal = pyqtSignal(str)  # 添加日志消息信号
+    
+    def __init__(self, config):
+        super().__init__()
+        self.config = config
+    
+    def run(self):
+        try:
+            # 测速期间暂停后台预取，避免占用带宽影响结果
+            with foreground:
+                best, results = calibrate(self.config['ssh'], self.config['log_paths'],
+                                          log_callback=self.log_message_signal.emit)
+            self.result.emit(best, results)
+        except Exception as e:
+            self.error.emit(f"测量传输速度失败: {str(e)}")
+
+class FleetScanWorker(QThread):
+    """并发探测所有主机的SSH服务是否可达"""
+    host_status = pyqtSignal(int, dict)  # 主机索引，探测结果（每台主机完成时发送）
+    finished_scan = pyqtSignal(list)     # 在线主机的索引列表，按预计开销排序
+    
+    def __init__(self, hosts_data):
+        super().__init__()
+        self.hosts_data = hosts_data
+    
+    def run(self):
+        positions = {id(host_data): i for i, host_data in enumerate(self.hosts_data)}
+        results = scan_fleet(
+            self.hosts_data,
+            on_result=lambda host_data, status: self.host_status.emit(positions[id(host_data)], status))
+        self.finished_scan.emit([positions[id(host_data)] for host_data in live_hosts(results)])
+
+class LogFollowWorker(QThread):
+    """
+    实时跟踪远程日志新追加的行
+    所有文件共用一个SSH连接，每次轮询只读取新增的字节，按查询筛选后成批发送
+    """
+    lines = pyqtSignal(list)  # 新的日志行（已添加 [前缀]）
+    error = pyqtSignal(str)   # 错误信号
+    log_message_signal = pyqtSignal(str)  # 添加日志消息信号
+    
+    def __init__(self, config, remote_paths, query=None):
+        """
+        Args:
+            config: 连接配置（get_ssh_config 的返回值）
+            remote_paths: 要跟踪的远程文件路径列表
+            query: LogQuery 查询对象，None表示显示全部行
+        """
+        super().__init__()
+        self.config = config
+        self.remote_paths = remote_paths
+        self.query = query
+        self.cancel_token = CancelToken()
+    
+    def cancel(self):
+        """停止跟踪"""
+        self.cancel_token.cancel()
+    
+    def run(self):
+        collector = LogCollector(config_file=None, cancel_token=self.cancel_token)
+        collector.config = self.config
+        follower = None
+        try:
+            collector.connect()
+            follower = LogFollower(collector.sftp, self.remote_paths, self.query)
+            # 前缀按文件名计算，零点轮转后新文件的前缀不变
+            prefixes = {}
+            while not self.cancel_token.cancelled:
+                batch = []
+                for path, line in follower.poll(log_callback=self.log_message_signal.emit):
+                    prefix = prefixes.get(path)
+                    if prefix is None:
+                        prefix = prefixes[path] = log_prefix(os.path.basename(path.replace('\\', '/')))
+                    batch.append(f"[{prefix}] {line}")
+                if batch:
+                    self.lines.emit(batch)
+                if self.cancel_token.wait(FOLLOW_INTERVAL):
+                    break
+        except Exception as e:
+            if not self.cancel_token.cancelled:
+                self.error.emit(f"实时跟踪失败: {str(e)}")
+        finally:
+            if follower is not None:
+                follower.close()
+            collector.close()
+
+class FleetSearchWorker(QThread):
+    """
+    在多台主机上并发搜索，每台主机完成后发送它的时间线
+    搜索前先并发探测所有主机，跳过离线的主机，在线主机按预计开销排序后开始搜索
+    """
+    host_status = pyqtSignal(int, dict)           # 主机索引，探测结果
+    host_finished = pyqtSignal(int, object, str)  # 主机索引，搜索结果（失败时为None），错误信息
+    finished_search = pyqtSignal(int)             # 完成的主机数
+    log_message_signal = pyqtSignal(str)          # 添加日志消息信号
+    
+    def __init__(self, hosts, query, start_date, end_date, patterns=None):
+        """
+        Args:
+            hosts: [(主机索引, 主机配置), ...]
+            query: LogQuery 查询对象
+            start_date: 开始日期
+            end_date: 结束日期
+            patterns: 只搜索这些类别的文件，None表示全部
+        """
+        super().__init__()
+        self.hosts = hosts
+        self.query = query
+        self.start_date = start_date
+        self.end_date = end_date
+        self.patterns = patterns
+        self.cancel_token = CancelToken()
+    
+    def cancel(self):
+        """请求取消搜索，关闭所有主机的连接"""
+        self.cancel_token.cancel()
+    
+    def run(self):
+        positions = {id(host_data): i for i, host_data in self.hosts}
+        completed = []
+        try:
+            scan_results = scan_fleet(
+                [host_data for _, host_data in self.hosts],
+                on_result=lambda host_data, status: self.host_status.emit(positions[id(host_data)], status))
+            self.cancel_token.check()
+            hosts = live_hosts(scan_results)
+            if len(hosts) < len(self.hosts):
+                self.log_message_signal.emit(f"跳过 {len(self.hosts) - len(hosts)} 台不可达的主机")
+            # 搜索期间暂停后台预取，让出网络连接
+            with foreground:
+                completed = fleet_search(
+                    hosts, self.query,
+                    self.start_date, self.end_date, self.patterns,
+                    cancel_token=self.cancel_token,
+                    on_host_done=lambda host_data, result, error: self.host_finished.emit(
+                        positions[id(host_data)], result, error),
+                    log_callback=self.log_message_signal.emit)
+        except OperationCancelled:
+            self.log_message_signal.emit("多主机搜索已取消")
+        self.finished_search.emit(len(completed))
+
+class LocalCopyWorker(QThread):
+    """
+    需要日志本地副本的后台任务的基类（不直接使用）
+    子类实现 process()，在后台线程中用 local_copy() 获取文件并处理，出错时以 task_name 提示；
+    本地文件直接使用，远程文件通过共享的分析缓存获取（首次需要时才建立SSH连接）
+    """
+    error = pyqtSignal(str)      # 错误信号
+    log_message_signal = pyqtSignal(str)  # 添加日志消息信号
+    task_name = "处理日志"        # 出错提示中的任务名称
+    
+    def __init__(self, config):
+        super().__init__()
+        self.config = config
+        self.collector = None
+        self.cancel_token = CancelToken()
+    
+    def cancel(self):
+        self.cancel_token.cancel()
+    
+    def local_copy(self, file_path):
+        """
+        获取日志文件的本地路径
+        Args:
+            file_path: 本地或远程文件路径
+        Returns:
+            str: 本地文件路径
+        """
+        self.cancel_token.check()
+        if os.path.exists(file_path):
+            return file_path
+        return shared_cache(on_evict=forget_indexed_file).get(
+            self.connection(), file_path, log_callback=self.log_message_signal.emit)
+    
+    def connection(self):
+        """获取SSH连接，首次调用时才建立（取消时连接被关闭，阻塞的远程操作立即返回）"""
+        if self.collector is None:
+            self.collector = LogCollector(config_file=None, cancel_token=self.cancel_token)
+            self.collector.config = self.config
+            self.collector.connect()
+        return self.collector
+    
+    def run(self):
+        try:
+            # 处理期间暂停后台预取，让出网络连接
+            with foreground:
+                self.process()
+        except OperationCancelled:
+            self.log_message_signal.emit("任务已取消")
+        except Exception as e:
+            if self.cancel_token.cancelled:
+                self.log_message_signal.emit("任务已取消")
+            else:
+                self.error.emit(f"{self.task_name}失败: {str(e)}")
+        finally:
+            if self.collector is not None:
+                self.collector.close()
+                self.collector = None
+
+class HistogramWorker(LocalCopyWorker):
+    """单遍扫描选中的日志，按分钟统计级别、来源前缀和查询匹配"""
+    result = pyqtSignal(object)  # (LogHistogram, [(本地文件路径, 默认前缀), ...])
+    task_name = "统计日志"
+    
+    def __init__(self, config, files, query=None):
+        """
+        Args:
+            config: 连接配置（get_ssh_config 的返回值），用于获取远程文件
+            files: [(文件名, 文件路径), ...]，本地或远程
+            query: LogQuery 查询对象，None表示不统计查询匹配
+        """
+        super().__init__(config)
+        self.files = files
+        self.query = query
+    
+    def process(self):
+        histogram = LogHistogram(self.query)
+        sources = []
+        for file_name, file_path in self.files:
+            local_path = self.local_copy(file_path)
+            prefix = log_prefix(file_name)
+            count = 0
+            for member, lines in iter_log_sources(local_path):
+                self.cancel_token.check()
+                member_prefix = log_prefix(os.path.basename(member), prefix) if member else prefix
+                count += histogram.add_lines(lines, member_prefix)
+            sources.append((local_path, prefix))
+            self.log_message_signal.emit(f"统计 {file_name}: {count} 行")
+        self.result.emit((histogram, sources))
+
+class TemplateWorker(LocalCopyWorker):
+    """提取选中日志的模板统计（结果按文件缓存）"""
+    result = pyqtSignal(list)  # mine_file 的结果，所有文件合并
+    task_name = "提取日志模板"
+    
+    def __init__(self, config, files):
+        """
+        Args:
+            config: 连接配置，用于获取远程文件
+            files: [(文件名, 文件路径), ...]，本地或远程
+        """
+        super().__init__(config)
+        self.files = files
+    
+    def process(self):
+        results = []
+        for file_name, file_path in self.files:
+            local_path = self.local_copy(file_path)
+            for item in mine_file(local_path, file_name, cancel_token=self.cancel_token):
+                source = "缓存的统计" if item['cached'] else "新提取"
+                self.log_message_signal.emit(
+                    f"模板 {item['file_name']}: {item['lines']} 行，{len(item['templates'])} 个模板（{source}）")
+                item['source'] = (local_path, item['member'])
+                results.append(item)
+        self.result.emit(results)
+
+class ExportWorker(LocalCopyWorker):
+    """把搜索结果或时间范围日志以流的方式导出到文件"""
+    progress = pyqtSignal(int, int, str)   # (已完成的来源数, 来源总数, 进度说明)
+    exported = pyqtSignal(str, int)        # (导出文件路径, 写出的记录数)
+    
+    def __init__(self, config, files, query, output_path, mode='hits'):
+        """
+        Args:
+            config: 连接配置，用于获取远程文件
+            files: [(文件名, 文件路径), ...]，本地或远程
+            query: LogQuery 查询对象
+            output_path: 导出文件路径，扩展名决定格式（见 log_export.export_format）
+            mode: 'hits' 导出匹配行，'window' 导出关键字时间范围内的日志块
+        """
+        super().__init__(config)
+        self.files = files
+        self.query = query
+        self.output_path = output_path
+        self.mode = mode
+        self.task_name = "导出搜索结果" if mode == 'hits' else "导出时间范围日志"
+    
+    def process(self):
+        local_files = []
+        for i, (file_name, file_path) in enumerate(self.files):
+            self.progress.emit(i, len(self.files), f"正在获取 {file_name}...")
+            local_files.append((file_name, self.local_copy(file_path)))
+        
+        def report_written(done, total, records):
+            self.progress.emit(done, total, f"已读完 {done}/{total} 个文件，已写出 {records} 条")
+        
+        if self.mode == 'window':
+            earliest_time, latest_time = keyword_window(
+                local_files, self.query, cancel_token=self.cancel_token,
+                progress_callback=lambda done, total: self.progress.emit(
+                    done, total, f"正在确定时间范围 {done}/{total}..."))
+            if earliest_time is None:
+                self.log_message_signal.emit("没有找到带时间戳的匹配行，无法确定时间范围")
+                return
+            self.log_message_signal.emit(
+                f"时间范围: {earliest_time.strftime('%H:%M:%S.%f')[:-3]} - {latest_time.strftime('%H:%M:%S.%f')[:-3]}")
+            with ExportWriter(self.output_path) as writer:
+                export_window_blocks(writer, local_files, earliest_time, latest_time,
+                                     cancel_token=self.cancel_token, progress_callback=report_written)
+        else:
+            with ExportWriter(self.output_path) as writer:
+                export_hits(writer, local_files, self.query, cancel_token=self.cancel_token,
+                            progress_callback=report_written)
+        self.exported.emit(self.output_path, writer.records)
+
+class KeywordSearchWorker(LocalCopyWorker):
+    """
+    在后台搜索关键字
+    第一阶段确定所有满足查询的行的时间范围，第二阶段提取各文件在该时间范围内的日志块并按时间归并；
+    远程普通日志优先在车道主机上完成两个阶段，只传回统计结果和时间范围内的行
+    """
+    progress = pyqtSignal(int, int, str)  # (已完成的文件数, 文件总数, 进度说明)
+    blocks = pyqtSignal(list)             # 一批按时间排序的 [(时间对象, 日志块文本, (来源文件, zip成员名)), ...]
+    index_stale = pyqtSignal(list)        # 索引不是最新的本地文件路径列表，由 LogIndexWorker 在后台更新
+    task_name = "搜索关键字"
+    
+    def __init__(self, config, files, query):
+        """
+        Args:
+            config: 连接配置（get_ssh_config 的返回值），用于远程搜索和获取远程文件
+            files: [(文件名, 文件路径), ...]，本地或远程
+            query: LogQuery 查询对象
+        """
+        super().__init__(config)
+        self.files = files
+        self.query = query
+        self.stale_files = []  # 索引不是最新、本次直接搜索的文件
+    
+    def log_message(self, message):
+        self.log_message_signal.emit(message)
+    
+    def process(self):
+        query = self.query
+        self.log_message("开始搜索关键字: " + query.text)
+        term_counts = Counter()  # 每个词条的匹配行数
+        # 时间戳按行首格式匹配（见 log_search.TIME_PATTERN），不再匹配和使用RegTime
+        earliest_time = None
+        latest_time = None
+        # 第二阶段提取日志块的来源，按文件顺序：(本地文件路径, zip成员名, 前缀, 来源标识)
+        # 本地文件路径为None表示在远程主机上完成搜索的文件，来源标识为 (远程文件路径, None)
+        window_sources = []
+        contents = {}  # 远程提取的内容：来源标识 -> 日志行列表
+        
+        for i, (file_name, file_path) in enumerate(self.files):
+            self.cancel_token.check()
+            self.progress.emit(i, len(self.files), f"正在搜索 {file_name}...")
+            prefix = log_prefix(file_name)
+            local_path = file_path
+            
+            if not os.path.exists(file_path):
+                # 普通日志文件优先在车道主机上完成搜索，只传回统计结果
+                remote_times = self._remote_keyword_times(file_path)
+                if remote_times is not None:
+                    match_count, first_time_str, last_time_str = remote_times
+                    self.log_message(f"远程搜索 {file_name}: 找到 {match_count} 个匹配行")
+                    for time_str in (first_time_str, last_time_str):
+                        if not time_str:
+                            continue
+                        try:
+                            time_obj = parse_log_time(time_str)
+                        except ValueError as e:
+                            self.log_message(f"时间解析错误: {str(e)}")
+                            continue
+                        earliest_time, latest_time = merge_time_range(
+                            earliest_time, latest_time, time_obj, time_obj)
+                    # 第二阶段确定时间范围后再从远程提取日志块
+                    window_sources.append((None, None, prefix, (file_path, None)))
+                    continue
+                
+                # 获取文件的本地缓存（可能已被预取）
+                try:
+                    local_path = self.local_copy(file_path)
+                except OperationCancelled:
+                    raise
+                except Exception as e:
+                    if file_path.endswith('.zip'):
+                        raise
+                    self.cancel_token.check()
+                    self.log_message(f"下载远程文件失败: {str(e)}")
+                    # 直接在远程搜索，只支持单个关键字
+                    first_time, last_time, matched_terms = self._grep_remote(file_path)
+                    earliest_time, latest_time = merge_time_range(
+                        earliest_time, latest_time, first_time, last_time)
+                    term_counts.update(term for terms in matched_terms for term in terms)
+                    continue
+            
+            if local_path.lower().endswith('.zip'):
+                # zip包内的日志文件以解压流的方式搜索，不解压到磁盘，也不整体读入内存
+                for name, (first_time, last_time, matched_terms) in self._search_zip(local_path):
+                    earliest_time, latest_time = merge_time_range(
+                        earliest_time, latest_time, first_time, last_time)
+                    term_counts.update(term for terms in matched_terms for term in terms)
+                    inner_prefix = log_prefix(os.path.basename(name), prefix)
+                    window_sources.append((local_path, name, inner_prefix, (file_path, name)))
+            else:
+                # 普通日志文件直接在字节上搜索，不整体解码
+                try:
+                    first_time, last_time, matched_terms = self._search_file(local_path)
+                except OperationCancelled:
+                    raise
+                except Exception as e:
+                    self.log_message(f"读取文件时出错: {str(e)}")
+                    continue
+                earliest_time, latest_time = merge_time_range(
+                    earliest_time, latest_time, first_time, last_time)
+                term_counts.update(term for terms in matched_terms for term in terms)
+                window_sources.append((local_path, None, prefix, (file_path, None)))
+        self.progress.emit(len(self.files), len(self.files), "正在提取时间范围内的日志...")
+        if self.stale_files:
+            self.index_stale.emit(self.stale_files)
+        
+        # 统计每个词条的匹配行数
+        if len(query.terms) > 1:
+            summary = ', '.join(f"{term.label}={term_counts.get(term.label, 0)}" for term in query.terms)
+            self.log_message(f"词条匹配统计: {summary}")
+        
+        # 检查是否找到了时间范围
+        if not (earliest_time and latest_time):
+            self.log_message("没有找到带时间戳的匹配行")
+            return
+        self.log_message(f"找到时间范围: {earliest_time.strftime('%H:%M:%S.%f')[:-3]} - {latest_time.strftime('%H:%M:%S.%f')[:-3]}")
+        
+        # 如果最早和最晚时间相同，扩展时间范围（前后5分钟）
+        if earliest_time == latest_time:
+            earliest_time = earliest_time - timedelta(minutes=5)
+            latest_time = latest_time + timedelta(minutes=5)
+            self.log_message(f"扩展时间范围: {earliest_time.strftime('%H:%M:%S.%f')[:-3]} - {latest_time.strftime('%H:%M:%S.%f')[:-3]}")
+        
+        # 第二阶段：在确定的时间范围内，提取所有日志行并显示
+        self.log_message("提取时间范围内的所有日志行")
+        
+        # 每个文件生成一个按时间排序的日志块流，再做K路归并
+        # 本地文件使用按文件版本缓存的日志块索引，只读取和解码时间范围内的日志块
+        # 日志块附带来源文件，双击结果时可以在日志查看窗口中打开
+        streams = []
+        for local_path, member, prefix, tag in window_sources:
+            self.cancel_token.check()
+            if local_path is None:
+                # 远程搜索的文件只传回时间范围内的日志行
+                content_lines = self._remote_extract_window(tag[0], earliest_time, latest_time)
+                if content_lines is None:
+                    continue
+                contents[tag] = content_lines
+            if tag in contents:
+                blocks = iter_time_window_blocks(contents[tag], prefix, earliest_time, latest_time)
+            else:
+                blocks = file_block_index(local_path, member).iter_blocks(prefix, earliest_time, latest_time)
+            streams.append(tag_stream(blocks, tag))
+        
+        # 归并结果分批发送给界面，边生成边显示
+        block_count = 0
+        actual_earliest_time = None
+        actual_latest_time = None
+        batch = []
+        for block in merge_timelines(streams):
+            if actual_earliest_time is None:
+                actual_earliest_time = block[0]
+            actual_latest_time = block[0]
+            block_count += 1
+            batch.append(block)
+            if len(batch) >= RESULT_FLUSH_BLOCKS:
+                self.cancel_token.check()
+                self.blocks.emit(batch)
+                batch = []
+        if batch:
+            self.blocks.emit(batch)
+        
+        # 提取归并结果中的最早和最晚时间
+        if block_count:
+            self.log_message(f"实际日志块时间范围: {actual_earliest_time.strftime('%H:%M:%S.%f')[:-3]} - {actual_latest_time.strftime('%H:%M:%S.%f')[:-3]}")
+            
+            # 计算时间差异
+            if actual_earliest_time > earliest_time:
+                time_diff = actual_earliest_time - earliest_time
+                self.log_message(f"注意: 实际最早时间比设定晚 {time_diff.total_seconds():.3f} 秒")
+            elif actual_earliest_time < earliest_time:
+                time_diff = earliest_time - actual_earliest_time
+                self.log_message(f"注意: 实际最早时间比设定早 {time_diff.total_seconds():.3f} 秒")
+            
+            if actual_latest_time < latest_time:
+                time_diff = latest_time - actual_latest_time
+                self.log_message(f"注意: 实际最晚时间比设定早 {time_diff.total_seconds():.3f} 秒")
+            elif actual_latest_time > latest_time:
+                time_diff = actual_latest_time - latest_time
+                self.log_message(f"注意: 实际最晚时间比设定晚 {time_diff.total_seconds():.3f} 秒")
+        self.log_message(f"搜索完成，找到 {block_count} 个时间范围内的日志块")
+    
+    def _remote_keyword_times(self, file_path):
+        """
+        在车道主机上统计匹配行的时间范围（只支持普通日志文件和单个关键字）
+        Returns:
+            tuple: remote_keyword_times 的结果，不能或无法在远程搜索时返回None
+        """
+        literal = self.query.literal()
+        if literal is None or file_path.endswith('.zip'):
+            return None
+        collector = self.connection()
+        if collector.is_remote_windows():
+            return None
+        try:
+            return collector.remote_keyword_times(file_path, *literal)
+        except Exception as e:
+            self.cancel_token.check()
+            self.log_message(f"远程搜索失败，改为下载后搜索: {str(e)}")
+            return None
+    
+    def _remote_extract_window(self, file_path, earliest_time, latest_time):
+        """
+        从车道主机上提取时间范围内的日志行
+        Returns:
+            list: 日志行列表，提取失败时返回None
+        """
+        self.cancel_token.check()
+        file_name = os.path.basename(file_path.replace('\\', '/'))
+        try:
+            content_lines = self.connection().remote_extract_window(
+                file_path, seconds_of_day(earliest_time), seconds_of_day(latest_time))
+        except Exception as e:
+            self.cancel_token.check()
+            self.log_message(f"远程提取时间范围日志失败 {file_name}: {str(e)}")
+            return None
+        self.log_message(f"远程提取 {file_name}: {len(content_lines)} 行")
+        return content_lines
+    
+    def _grep_remote(self, file_path):
+        """
+        文件无法下载时直接用 grep 在远程搜索，只支持单个关键字
+        Returns:
+            tuple: (最早时间, 最晚时间, [命中的词条列表, ...])
+        """
+        literal = self.query.literal()
+        if literal is None:
+            return None, None, []
+        case_flag = '' if literal[1] else '-i '
+        command = f"grep -F {case_flag}-e {shlex.quote(literal[0])} {shlex.quote(file_path)}"
+        self.log_message(f"执行搜索命令: {command}")
+        output = self.connection().execute_command(command)
+        if not output:
+            return None, None, []
+        output_lines = [line.strip() for line in output.splitlines()]
+        first_time, last_time, matched_lines = keyword_time_range(output_lines, self.query)
+        self.log_message(f"处理搜索结果: {len(matched_lines)} 行")
+        return first_time, last_time, [terms for _, terms in matched_lines]
+    
+    def _search_file(self, local_path):
+        """
+        在本地普通日志文件中搜索
+        单个关键字的查询在索引是最新的时候使用全文索引，不读取文件；
+        其次使用搜索结果缓存（只读取文件开头的字节判断版本）；
+        最后直接在文件字节上搜索（内存映射，编码只检测一次，只解码匹配的行）
+        Returns:
+            tuple: (最早时间, 最晚时间, [命中的词条列表, ...])
+        """
+        if self.query.literal() is not None and local_path.lower().endswith('.log'):
+            try:
+                index_result = self._search_index(local_path, [local_path])
+                if index_result is not None:
+                    return index_result[0]
+            except Exception as e:
+                self.log_message(f"全文索引不可用，直接搜索: {str(e)}")
+        result_cache = self._open_result_cache()
+        if result_cache is None:
+            return hits_time_range(search_file_bytes(local_path, self.query), self.cancel_token)
+        try:
+            return result_cache.search_file(local_path, self.query, self.cancel_token)
+        finally:
+            result_cache.close()
+    
+    def _search_zip(self, local_zip):
+        """
+        在本地压缩包的日志文件中搜索
+        单个关键字的查询在索引是最新的时候使用全文索引，其次使用搜索结果缓存；其余成员以解压流的方式搜索，成员较多时并行搜索
+        Returns:
+            list: [(成员名称, (最早时间, 最晚时间, [命中的词条列表, ...])), ...]，顺序与压缩包中一致
+        """
+        with zipfile.ZipFile(local_zip, 'r') as zip_ref:
+            members = zip_log_members(zip_ref)
+        results = {}
+        if self.query.literal() is not None:
+            try:
+                index_result = self._search_index(local_zip, [member_key(local_zip, name) for name in members])
+                if index_result is not None:
+                    results = dict(zip(members, index_result))
+            except Exception as e:
+                self.log_message(f"全文索引不可用，直接搜索: {str(e)}")
+        rest = [name for name in members if name not in results]
+        result_cache = self._open_result_cache() if rest else None
+        if result_cache is None:
+            for name, hits in search_zip_members(local_zip, self.query, members=rest,
+                                                 cancel_token=self.cancel_token):
+                results[name] = hits_time_range(hits, self.cancel_token)
+        else:
+            try:
+                # 成员版本使用压缩包的大小和修改时间以及成员开头的字节
+                versions = {}
+                for name in rest:
+                    version = source_version(local_zip, name)
+                    cached = result_cache.lookup(member_key(local_zip, name), version, self.query)
+                    if cached is not None:
+                        results[name] = cached
+                    else:
+                        versions[name] = version
+                for name, hits in search_zip_members(local_zip, self.query, members=list(versions),
+                                                     cancel_token=self.cancel_token):
+                    results[name] = result_cache.store(member_key(local_zip, name), versions[name],
+                                                       self.query, hits, self.cancel_token)
+            finally:
+                result_cache.close()
+        return [(name, results[name]) for name in members]
+    
+    def _open_result_cache(self):
+        """打开搜索结果缓存，缓存数据库不可用时返回None（直接搜索）"""
+        try:
+            return SearchResultCache()
+        except sqlite3.Error as e:
+            self.log_message(f"搜索结果缓存不可用，直接搜索: {str(e)}")
+            return None
+    
+    def _search_index(self, version_path, file_keys):
+        """
+        通过全文索引搜索一个文件（或zip包的各个成员）
+        索引不是最新的时候不使用索引，也不在搜索中更新索引（记录下来，搜索后由 LogIndexWorker 在后台更新）
+        Args:
+            version_path: 本地文件路径（zip成员使用压缩包路径判断索引是否最新）
+            file_keys: 索引中的文件路径列表（zip成员见 member_key）
+        Returns:
+            list: 与 file_keys 对应的 [(最早时间, 最晚时间, [命中的词条列表, ...]), ...]；索引不是最新时返回None
+        """
+        index = LogIndex()
+        try:
+            if not index.is_current(version_path):
+                self.stale_files.append(version_path)
+                return None
+            return [hits_time_range(((result['line_num'], result['content'], result['terms'])
+                                     for result in index.search(self.query, [file_key])), self.cancel_token)
+                    for file_key in file_keys]
+        finally:
+            index.close()
+
+class WindowExtractWorker(QThread):
+    """从本地日志（含zip成员）中提取一个时间范围内的日志块，按时间归并"""
+    result = pyqtSignal(object)  # 按时间排序的 [(时间对象, 日志块文本, (来源文件, zip成员名)), ...]
+    error = pyqtSignal(str)      # 错误信号
+    
+    def __init__(self, sources, earliest_time, latest_time):
+        """
+        Args:
+            sources: [(本地文件路径, 默认前缀), ...]
+            earliest_time: 时间范围开始
+            latest_time: 时间范围结束
+        """
+        super().__init__()
+        self.sources = sources
+        self.earliest_time = earliest_time
+        self.latest_time = latest_time
+        self.cancel_token = CancelToken()
+    
+    def cancel(self):
+        self.cancel_token.cancel()
+    
+    def run(self):
+        try:
+            blocks = []
+            for local_path, prefix in self.sources:
+                for member in log_source_members(local_path):
+                    self.cancel_token.check()
+                    member_prefix = log_prefix(os.path.basename(member), prefix) if member else prefix
+                    # 每个文件的日志块已按时间排序，逐个文件归并，只保留范围内的块
+                    stream = tag_stream(file_block_index(local_path, member).iter_blocks(
+                        member_prefix, self.earliest_time, self.latest_time),
+                        (local_path, member))
+                    blocks = list(merge_timelines([blocks, stream]))
+            self.result.emit(blocks)
+        except OperationCancelled:
+            pass
+        except Exception as e:
+            self.error.emit(f"提取时间范围日志失败: {str(e)}")
+
+class LogView(QAbstractScrollArea):
+    """
+    虚拟化的日志显示控件
+    只读取和绘制当前可见的行，滚动和跳转与文件大小无关
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.log = None
+        self.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.viewport().setCursor(Qt.CursorShape.IBeamCursor)
+        self.selection_start = None  # 选中范围的起始行
+        self.selection_end = None    # 选中范围的结束行
+        self.max_width = 0           # 已显示过的最长行的宽度，用于水平滚动
+        self._scroll_state = None    # 上次设置滚动范围时的 (行数, 可见行数, 可见宽度, 最长行宽度)
+    
+    def set_log(self, log):
+        """设置要显示的 MappedLog"""
+        self.log = log
+        self.selection_start = None
+        self.selection_end = None
+        self.max_width = 0
+        self.verticalScrollBar().setValue(0)
+        self.horizontalScrollBar().setValue(0)
+        self.update_scroll_range()
+        self.viewport().update()
+    
+    def line_height(self):
+        return self.fontMetrics().height()
+    
+    def visible_rows(self):
+        return max(1, self.viewport().height() // self.line_height())
+    
+    def gutter_width(self):
+        """行号区域的宽度"""
+        digits = len(str(self.log.line_count if self.log else 0))
+        return self.fontMetrics().horizontalAdvance('9' * max(digits, 4)) + 12
+    
+    def update_scroll_range(self):
+        """根据行数和可见行数更新滚动范围，它们和最长行宽度都没有变化时直接返回"""
+        rows = self.visible_rows()
+        line_count = self.log.line_count if self.log else 0
+        state = (line_count, rows, self.viewport().width(), self.max_width)
+        if state == self._scroll_state:
+            return
+        self._scroll_state = state
+        self.verticalScrollBar().setRange(0, max(0, line_count - rows))
+        self.verticalScrollBar().setPageStep(rows)
+        self.horizontalScrollBar().setRange(0, max(0, self.max_width - self.viewport().width() // 2))
+        self.horizontalScrollBar().setPageStep(self.viewport().width())
+    
+    def go_to_line(self, line_num):
+        """跳转到指定行（从0开始）并选中该行"""
+        if not self.log:
+            return
+        line_num = max(0, min(line_num, self.log.line_count - 1))
+        self.selection_start = self.selection_end = line_num
+        # 目标行显示在可见区域的三分之一处
+        self.verticalScrollBar().setValue(line_num - self.visible_rows() // 3)
+        self.viewport().update()
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scroll_range()
+    
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+    
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        palette = self.palette()
+        painter.fillRect(self.viewport().rect(), palette.base())
+        if not self.log:
+            return
+        
+        height = self.line_height()
+        ascent = self.fontMetrics().ascent()
+        gutter = self.gutter_width()
+        first = self.verticalScrollBar().value()
+        x_offset = self.horizontalScrollBar().value()
+        lines = self.log.lines(first, self.visible_rows() + 1)
+        
+        low, high = self.selected_range()
+        width = self.viewport().width()
+        max_width = self.max_width
+        for row, line in enumerate(lines):
+            line_num = first + row
+            top = row * height
+            if low is not None and low <= line_num <= high:
+                painter.fillRect(0, top, width, height, palette.highlight())
+                painter.setPen(palette.highlightedText().color())
+            else:
+                painter.setPen(palette.text().color())
+            painter.drawText(gutter - x_offset, top + ascent, line)
+            self.max_width = max(self.max_width, self.fontMetrics().horizontalAdvance(line) + gutter)
+        
+        # 行号区域
+        painter.fillRect(0, 0, gutter - 4, self.viewport().height(), palette.window())
+        painter.setPen(palette.placeholderText().color())
+        for row in range(len(lines)):
+            painter.drawText(4, row * height + ascent, str(first + row + 1))
+        painter.end()
+        if self.max_width != max_width:
+            # 出现了更长的行，扩大水平滚动范围
+            self.update_scroll_range()
+    
+    def selected_range(self):
+        """获取选中的行范围 (起始行, 结束行)，没有选中时返回 (None, None)"""
+        if self.selection_start is None:
+            return None, None
+        return min(self.selection_start, self.selection_end), max(self.selection_start, self.selection_end)
+    
+    def line_at(self, y):
+        """获取指定纵坐标处的行号"""
+        return self.verticalScrollBar().value() + max(0, y) // self.line_height()
+    
+    def mousePressEvent(self, event):
+        if not self.log or self.log.line_count == 0:
+            return
+        line_num = min(self.line_at(int(event.position().y())), self.log.line_count - 1)
+        if event.modifiers() & Qt.KeyboardModifier.ShiftModifier and self.selection_start is not None:
+            self.selection_end = line_num
+        else:
+            self.selection_start = self.selection_end = line_num
+        self.viewport().update()
+    
+    def mouseMoveEvent(self, event):
+        if self.selection_start is None or not event.buttons() & Qt.MouseButton.LeftButton:
+            return
+        self.selection_end = min(self.line_at(int(event.position().y())), self.log.line_count - 1)
+        self.viewport().update()
+    
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.StandardKey.Copy):
+            self.copy_selection()
+        else:
+            super().keyPressEvent(event)
+    
+    def copy_selection(self):
+        """复制选中的行（最多复制 LOG_VIEW_COPY_LIMIT 行）"""
+        low, high = self.selected_range()
+        if low is None:
+            return
+        count = min(high - low + 1, LOG_VIEW_COPY_LIMIT)
+        QApplication.clipboard().setText('\n'.join(self.log.lines(low, count)))
+
+class SearchResultModel(QAbstractListModel):
+    """
+    搜索结果列表模型
+    结果保存在 ResultStore 中，只有被显示的行才会格式化；
+    新结果先写入存储，调用 flush() 后一次性通知视图
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = ResultStore()
+        self._row_count = 0  # 已通知视图的行数
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+    
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= self._row_count:
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.store.text(index.row())
+        if role == Qt.ItemDataRole.ForegroundRole and self.store.kind(index.row()) == ROW_HEADER:
+            return QColor(0, 0, 160)
+        return None
+    
+    def flush(self):
+        """通知视图存储中新增的行"""
+        total = len(self.store)
+        if total > self._row_count:
+            self.beginInsertRows(QModelIndex(), self._row_count, total - 1)
+            self._row_count = total
+            self.endInsertRows()
+    
+    def clear(self):
+        """清空所有结果"""
+        self.beginResetModel()
+        self.store.clear()
+        self._row_count = 0
+        self.endResetModel()
+
+class FileTableModel(QAbstractTableModel):
+    """
+    文件列表表格模型
+    文件保存在 FileListing 中，表格只读取可见行；
+    排序角色返回数值形式的大小和修改时间，按数值而不是文本排序
+    """
+    SORT_ROLE = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, headers, parent=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.listing = FileListing()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.listing)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return self.listing.name(row)
+            if column == 1:
+                return self.listing.size_text(row)
+            return self.listing.date_text(row)
+        if role == self.SORT_ROLE:
+            if column == 0:
+                return self.listing.name(row).lower()
+            if column == 1:
+                return self.listing.size(row)
+            return self.listing.mtime(row)
+        if role == Qt.ItemDataRole.UserRole:
+            return self.listing.path(row)
+        if role == Qt.ItemDataRole.TextAlignmentRole and column == 1:
+            return Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        return None
+
+    def append_rows(self, infos):
+        """
+        追加一批文件
+        Args:
+            infos: 文件信息字典列表
+        """
+        if not infos:
+            return
+        start = len(self.listing)
+        self.beginInsertRows(QModelIndex(), start, start + len(infos) - 1)
+        for info in infos:
+            self.listing.append(info)
+        self.endInsertRows()
+
+    def clear(self):
+        """清空所有文件"""
+        self.beginResetModel()
+        self.listing.clear()
+        self.endResetModel()
+
+def create_file_table(headers, filter_input):
+    """
+    创建按名称筛选、可按列排序的文件表格
+    Args:
+        headers: 列标题
+        filter_input: 输入筛选文本的 QLineEdit
+    Returns:
+        tuple: (QTableView, FileTableModel, QSortFilterProxyModel)
+    """
+    model = FileTableModel(headers)
+    proxy = QSortFilterProxyModel()
+    proxy.setSourceModel(model)
+    proxy.setSortRole(FileTableModel.SORT_ROLE)
+    proxy.setFilterKeyColumn(0)
+    proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+    filter_input.textChanged.connect(proxy.setFilterFixedString)
+
+    view = QTableView()
+    view.setModel(proxy)
+    view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+    view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+    view.setSortingEnabled(True)
+    view.sortByColumn(-1, Qt.SortOrder.AscendingOrder)  # 初始保持列出的顺序
+    view.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+    # 固定行高，避免按内容计算每一行的高度
+    view.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+    return view, model, proxy
+
+class ResultHighlightDelegate(QStyledItemDelegate):
+    """高亮结果行中命中的词条，只对正在绘制的可见行计算"""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.query = None  # 当前的 LogQuery
+    
+    def paint(self, painter, option, index):
+        text = index.data()
+        spans = self.query.highlight_spans(text) if self.query is not None and text else []
+        if spans:
+            # 先在命中位置绘制背景色，再按默认方式绘制文本
+            style = option.widget.style() if option.widget else QApplication.style()
+            margin = style.pixelMetric(QStyle.PixelMetric.PM_FocusFrameHMargin, None, option.widget) + 1
+            metrics = option.fontMetrics
+            left = option.rect.left() + margin
+            painter.save()
+            painter.setClipRect(option.rect)
+            for start, end in spans:
+                x = left + metrics.horizontalAdvance(text[:start])
+                width = metrics.horizontalAdvance(text[start:end])
+                painter.fillRect(x, option.rect.top(), width, option.rect.height(), RESULT_HIGHLIGHT_COLOR)
+            painter.restore()
+        super().paint(painter, option, index)
+
+class LogViewerDialog(QDialog):
+    """完整日志查看窗口，支持跳转到行号和时间"""
+    def __init__(self, views, title, parent=None):
+        super().__init__(parent)
+        self.views = views
+        self.setWindowTitle(f"完整日志 - {title}")
+        self.resize(1000, 700)
+        
+        layout = QVBoxLayout(self)
+        toolbar = QHBoxLayout()
+        
+        # zip包中有多个日志文件时选择要查看的文件
+        self.member_combo = QComboBox()
+        for view in views:
+            self.member_combo.addItem(view.title)
+        self.member_combo.setVisible(len(views) > 1)
+        self.member_combo.currentIndexChanged.connect(self.show_view)
+        toolbar.addWidget(self.member_combo)
+        
+        # 跳转到行号
+        toolbar.addWidget(QLabel("行号:"))
+        self.line_input = QSpinBox()
+        self.line_input.setRange(1, 2 ** 31 - 1)
+        toolbar.addWidget(self.line_input)
+        line_btn = QPushButton("跳转")
+        line_btn.clicked.connect(self.jump_to_line)
+        toolbar.addWidget(line_btn)
+        
+        # 跳转到时间
+        toolbar.addWidget(QLabel("时间:"))
+        self.time_input = QLineEdit()
+        self.time_input.setPlaceholderText("HH:MM:SS")
+        self.time_input.returnPressed.connect(self.jump_to_time)
+        toolbar.addWidget(self.time_input)
+        time_btn = QPushButton("跳转到时间")
+        time_btn.clicked.connect(self.jump_to_time)
+        toolbar.addWidget(time_btn)
+        
+        toolbar.addStretch()
+        self.status_label = QLabel()
+        toolbar.addWidget(self.status_label)
+        layout.addLayout(toolbar)
+        
+        self.log_view = LogView()
+        layout.addWidget(self.log_view)
+        self.show_view(0)
+        
+        # 边下载边查看的日志定时索引新下载的内容
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_views)
+        if any(isinstance(view, ProgressiveLog) for view in views):
+            self.refresh_timer.start(LOG_VIEW_REFRESH_MS)
+    
+    def current_view(self):
+        return self.views[self.member_combo.currentIndex()] if self.views else None
+    
+    def show_view(self, index):
+        """显示指定的日志文件"""
+        if not self.views:
+            return
+        self.log_view.set_log(self.views[index])
+        self.show_status()
+    
+    def refresh_views(self):
+        """索引后台新下载的内容和按需读取的页，全部下载完成后停止刷新"""
+        pending = False
+        current = self.current_view()
+        scroll_bar = self.log_view.verticalScrollBar()
+        # 新内容会改变后面各行的行号，刷新后保持显示同一位置
+        key = current.row_key(scroll_bar.value()) if isinstance(current, ProgressiveLog) else None
+        for view in self.views:
+            if isinstance(view, ProgressiveLog):
+                view.update()
+                pending = pending or not view.complete
+        self.show_status()
+        self.log_view.update_scroll_range()
+        if key is not None:
+            jump_line = current.take_jump()
+            if jump_line is not None:
+                # 跳转的时间在按需读取的页中找到了
+                self.log_view.go_to_line(jump_line)
+            else:
+                scroll_bar.setValue(current.row_from_key(key))
+        self.log_view.viewport().update()
+        if not pending:
+            self.refresh_timer.stop()
+    
+    def show_status(self):
+        """显示当前日志的行数、编码和下载进度"""
+        view = self.current_view()
+        if view is None:
+            return
+        status = f"共 {view.line_count} 行  编码 {view.encoding}"
+        if isinstance(view, ProgressiveLog) and not view.complete:
+            status += f"  已下载 {view.progress() * 100:.0f}%"
+        self.status_label.setText(status)
+    
+    def jump_to_line(self):
+        self.log_view.go_to_line(self.line_input.value() - 1)
+        self.log_view.setFocus()
+    
+    def jump_to(self, line_num=None, seconds=None):
+        """
+        跳转到指定行号（从1开始）或时间
+        Args:
+            line_num: 行号
+            seconds: 时间（相对当天零点的秒数）
+        """
+        view = self.current_view()
+        if view is None:
+            return
+        if line_num:
+            self.log_view.go_to_line(line_num - 1)
+        elif seconds is not None:
+            self.log_view.go_to_line(view.find_time(time_from_seconds(seconds)))
+        self.log_view.setFocus()
+    
+    def jump_to_time(self):
+        view = self.current_view()
+        if view is None:
+            return
+        try:
+            time_obj = parse_log_time(self.time_input.text().strip())
+        except ValueError:
+            QMessageBox.warning(self, "警告", "时间格式应为 HH:MM:SS 或 HH:MM:SS.fff")
+            return
+        self.log_view.go_to_line(view.find_time(time_obj))
+        self.log_view.setFocus()
+    
+    def done(self, result):
+        # 关闭窗口时释放文件映射（临时文件同时删除，未完成的后台下载随之停止）
+        self.refresh_timer.stop()
+        for view in self.views:
+            view.close()
+        self.views = []
+        self.log_view.set_log(None)
+        super().done(result)
+
+class LogFollowDialog(QDialog):
+    """
+    实时跟踪窗口
+    显示跟踪线程送来的新日志行，只保留最近 FOLLOW_VIEW_MAX_LINES 行
+    """
+    def __init__(self, worker, title, parent=None):
+        super().__init__(parent)
+        self.worker = worker
+        self.setWindowTitle(f"实时跟踪 - {title}")
+        self.resize(1000, 600)
+        
+        layout = QVBoxLayout(self)
+        toolbar = QHBoxLayout()
+        self.auto_scroll_check = QCheckBox("自动滚动")
+        self.auto_scroll_check.setChecked(True)
+        toolbar.addWidget(self.auto_scroll_check)
+        clear_btn = QPushButton("清空")
+        toolbar.addWidget(clear_btn)
+        stop_btn = QPushButton("停止跟踪")
+        toolbar.addWidget(stop_btn)
+        toolbar.addStretch()
+        self.status_label = QLabel("正在连接...")
+        toolbar.addWidget(self.status_label)
+        layout.addLayout(toolbar)
+        
+        self.text_view = QPlainTextEdit()
+        self.text_view.setReadOnly(True)
+        self.text_view.setMaximumBlockCount(FOLLOW_VIEW_MAX_LINES)
+        self.text_view.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
+        self.text_view.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        layout.addWidget(self.text_view)
+        
+        self.line_count = 0
+        clear_btn.clicked.connect(self.text_view.clear)
+        stop_btn.clicked.connect(self.stop_follow)
+        worker.lines.connect(self.append_lines)
+        worker.error.connect(self.show_error)
+    
+    def append_lines(self, lines):
+        """追加一批新日志行"""
+        scroll_bar = self.text_view.verticalScrollBar()
+        position = scroll_bar.value()
+        self.text_view.appendPlainText('\n'.join(lines))
+        if self.auto_scroll_check.isChecked():
+            scroll_bar.setValue(scroll_bar.maximum())
+        else:
+            scroll_bar.setValue(position)
+        self.line_count += len(lines)
+        self.status_label.setText(f"已收到 {self.line_count} 行（{datetime.now().strftime('%H:%M:%S')}）")
+    
+    def show_error(self, message):
+        self.status_label.setText(message)
+    
+    def stop_follow(self):
+        """停止跟踪线程，窗口中的内容保留"""
+        if self.worker.isRunning():
+            self.worker.cancel()
+            self.status_label.setText("已停止跟踪")
+    
+    def done(self, result):
+        # 关闭窗口时停止跟踪
+        self.stop_follow()
+        super().done(result)
+
+class HistogramChart(QWidget):
+    """
+    按分钟统计的堆叠柱状图
+    只显示有日志的时间段；控件较窄时几分钟合并为一根柱子，点击柱子发送它覆盖的分钟范围
+    """
+    bucket_clicked = pyqtSignal(int, int)  # 第一分钟，最后一分钟（包含）
+    
+    # 柱子的最小宽度（像素）
+    MIN_BAR_WIDTH = 3
+    # 各类别的颜色：级别按 LEVELS 顺序，其他显示方式循环使用
+    LEVEL_COLORS = [QColor(220, 50, 47), QColor(240, 160, 40), QColor(70, 130, 200),
+                    QColor(150, 150, 150), QColor(200, 200, 200)]
+    SERIES_COLORS = [QColor(70, 130, 200), QColor(220, 50, 47), QColor(90, 170, 90),
+                     QColor(240, 160, 40), QColor(150, 100, 180), QColor(60, 170, 170)]
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(200)
+        self.setMouseTracking(True)
+        self.names = []
+        self.counts = None    # (类别数, 1440)
+        self.first_minute = 0
+        self.last_minute = MINUTES_PER_DAY - 1
+        self.colors = self.SERIES_COLORS
+    
+    def set_series(self, names, counts, minute_range, colors=None):
+        """
+        设置显示的数据
+        Args:
+            names: 类别名称列表
+            counts: (类别数, 1440) 的计数矩阵
+            minute_range: 显示的分钟范围 (第一分钟, 最后一分钟)
+            colors: 各类别的颜色
+        """
+        self.names = names
+        self.counts = counts
+        self.first_minute, self.last_minute = minute_range
+        self.colors = colors or self.SERIES_COLORS
+        self.update()
+    
+    def minutes_per_bar(self):
+        span = self.last_minute - self.first_minute + 1
+        bars = max(1, self.width() // self.MIN_BAR_WIDTH)
+        return max(1, -(-span // bars))
+    
+    def bars(self):
+        """
+        按柱子合并后的计数
+        Returns:
+            ndarray: (类别数, 柱子数)
+        """
+        step = self.minutes_per_bar()
+        data = self.counts[:, self.first_minute:self.last_minute + 1]
+        pad = -data.shape[1] % step
+        if pad:
+            data = np.pad(data, ((0, 0), (0, pad)))
+        return data.reshape(data.shape[0], -1, step).sum(axis=2)
+    
+    def bucket_at(self, x):
+        """鼠标位置对应的分钟范围，超出范围时返回None"""
+        if self.counts is None:
+            return None
+        step = self.minutes_per_bar()
+        bar_count = -(-(self.last_minute - self.first_minute + 1) // step)
+        index = int(x * bar_count / max(1, self.width()))
+        if not 0 <= index < bar_count:
+            return None
+        first = self.first_minute + index * step
+        return first, min(first + step - 1, self.last_minute)
+    
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        palette = self.palette()
+        painter.fillRect(self.rect(), palette.base())
+        if self.counts is None or not len(self.names):
+            painter.end()
+            return
+        bars = self.bars()
+        totals = bars.sum(axis=0)
+        peak = int(totals.max()) if totals.size else 0
+        axis_height = self.fontMetrics().height() + 4
+        chart_height = self.height() - axis_height
+        bar_width = self.width() / max(1, bars.shape[1])
+        if peak:
+            for index in range(bars.shape[1]):
+                x = int(index * bar_width)
+                width = max(1, int((index + 1) * bar_width) - x - 1)
+                bottom = chart_height
+                for series in range(bars.shape[0]):
+                    value = int(bars[series, index])
+                    if not value:
+                        continue
+                    height = max(1, int(value * (chart_height - 4) / peak))
+                    painter.fillRect(x, bottom - height, width, height,
+                                     self.colors[series % len(self.colors)])
+                    bottom -= height
+        
+        # 时间轴：开始、中间、结束
+        painter.setPen(palette.text().color())
+        baseline = self.height() - 4
+        for minute, align in ((self.first_minute, 0), ((self.first_minute + self.last_minute) // 2, 1),
+                              (self.last_minute, 2)):
+            text = f"{minute // 60:02d}:{minute % 60:02d}"
+            text_width = self.fontMetrics().horizontalAdvance(text)
+            x = (0, (self.width() - text_width) // 2, self.width() - text_width)[align]
+            painter.drawText(x, baseline, text)
+        painter.drawText(4, self.fontMetrics().ascent() + 2, f"最大 {peak} 行/柱")
+        painter.end()
+    
+    def mouseMoveEvent(self, event):
+        bucket = self.bucket_at(event.position().x())
+        if bucket is None:
+            self.setToolTip("")
+            return
+        first, last = bucket
+        counts = self.counts[:, first:last + 1].sum(axis=1)
+        lines = [f"{first // 60:02d}:{first % 60:02d} - {last // 60:02d}:{last % 60:02d}"]
+        lines.extend(f"{name}: {int(count)}" for name, count in zip(self.names, counts) if count)
+        self.setToolTip('\n'.join(lines))
+    
+    def mousePressEvent(self, event):
+        if event.button() != Qt.MouseButton.LeftButton:
+            return
+        bucket = self.bucket_at(event.position().x())
+        if bucket is not None:
+            self.bucket_clicked.emit(*bucket)
+
+class HistogramDialog(QDialog):
+    """分钟统计窗口：选择显示方式，点击柱子提取该时间段的日志"""
+    window_requested = pyqtSignal(int, int)  # 第一分钟，最后一分钟（包含）
+    
+    MODES = [("按级别", 'level'), ("按来源", 'prefix'), ("按查询匹配", 'query')]
+    
+    def __init__(self, histogram, title, parent=None):
+        super().__init__(parent)
+        self.histogram = histogram
+        self.setWindowTitle(f"分钟统计 - {title}")
+        self.resize(1000, 400)
+        
+        layout = QVBoxLayout(self)
+        toolbar = QHBoxLayout()
+        toolbar.addWidget(QLabel("显示:"))
+        self.mode_combo = QComboBox()
+        for text, mode in self.MODES:
+            if mode == 'query' and histogram.query is None:
+                continue
+            self.mode_combo.addItem(text, mode)
+        self.mode_combo.currentIndexChanged.connect(self.show_mode)
+        toolbar.addWidget(self.mode_combo)
+        toolbar.addStretch()
+        self.legend_label = QLabel()
+        toolbar.addWidget(self.legend_label)
+        layout.addLayout(toolbar)
+        
+        self.chart = HistogramChart()
+        self.chart.bucket_clicked.connect(self.window_requested)
+        layout.addWidget(self.chart, 1)
+        
+        hint = QLabel("点击柱子提取该时间段的日志，鼠标停留显示各类别的行数")
+        hint.setStyleSheet("color: gray;")
+        layout.addWidget(hint)
+        self.show_mode()
+    
+    def show_mode(self):
+        """按当前选择的方式显示统计结果"""
+        mode = self.mode_combo.currentData()
+        names, counts = self.histogram.series(mode)
+        minute_range = self.histogram.active_range() or (0, MINUTES_PER_DAY - 1)
+        colors = HistogramChart.LEVEL_COLORS if mode == 'level' else HistogramChart.SERIES_COLORS
+        self.chart.set_series(names, counts, minute_range, colors)
+        totals = counts.sum(axis=1)
+        self.legend_label.setText('  '.join(
+            f"<span style='color:{colors[i % len(colors)].name()}'>■</span> {name} {int(totals[i])}"
+            for i, name in enumerate(names)))
+
+class TemplateDialog(QDialog):
+    """
+    日志模板统计窗口
+    新出现的模板排在最前面，其余按行数从少到多排列；鼠标停留在模板上显示示例行
+    """
+    HEADERS = ["新增", "行数", "首次", "末次", "模板"]
+    
+    def __init__(self, results, title, parent=None):
+        super().__init__(parent)
+        self.results = results
+        self.setWindowTitle(f"日志模板 - {title}")
+        self.resize(1100, 600)
+        
+        layout = QVBoxLayout(self)
+        toolbar = QHBoxLayout()
+        self.file_combo = QComboBox()
+        for item in results:
+            self.file_combo.addItem(item['file_name'])
+        self.file_combo.setVisible(len(results) > 1)
+        self.file_combo.currentIndexChanged.connect(self.show_file)
+        toolbar.addWidget(self.file_combo)
+        self.summary_label = QLabel()
+        toolbar.addWidget(self.summary_label)
+        toolbar.addStretch()
+        layout.addLayout(toolbar)
+        
+        self.table = QTableWidget(0, len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        header = self.table.horizontalHeader()
+        for column in range(len(self.HEADERS) - 1):
+            header.setSectionResizeMode(column, QHeaderView.ResizeMode.ResizeToContents)
+        header.setSectionResizeMode(len(self.HEADERS) - 1, QHeaderView.ResizeMode.Stretch)
+        layout.addWidget(self.table)
+        self.show_file()
+    
+    def show_file(self):
+        """显示当前选择的文件的模板"""
+        if not self.results:
+            return
+        item = self.results[max(0, self.file_combo.currentIndex())]
+        templates = sorted(item['templates'], key=lambda t: (not t.get('new'), t['count']))
+        new_count = sum(1 for t in templates if t.get('new'))
+        baseline = f"，{new_count} 个新模板" if item['baseline'] else "（没有同类文件的统计，无法判断新模板）"
+        self.summary_label.setText(f"{item['lines']} 行，{len(templates)} 个模板{baseline}")
+        
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(templates))
+        for row, template in enumerate(templates):
+            new_item = QTableWidgetItem("新" if template.get('new') else "")
+            if template.get('new'):
+                new_item.setForeground(QColor(220, 50, 47))
+            count_item = QTableWidgetItem()
+            count_item.setData(Qt.ItemDataRole.DisplayRole, template['count'])
+            text_item = QTableWidgetItem(template['template'])
+            text_item.setToolTip(template['example'])
+            self.table.setItem(row, 0, new_item)
+            self.table.setItem(row, 1, count_item)
+            self.table.setItem(row, 2, QTableWidgetItem(template['first_time'] or ""))
+            self.table.setItem(row, 3, QTableWidgetItem(template['last_time'] or ""))
+            self.table.setItem(row, 4, text_item)
+        self.table.setSortingEnabled(True)
+
+class MainWindow(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("车道系统日志收集分析工具")
+        self.setMinimumSize(800, 600)
+        
+        # 主机配置数据
+        self.hosts_data = []
+        # 主机探测结果：主机索引 -> 探测结果；在线主机索引（按预计开销排序，未探测时为None）
+        self.host_states = {}
+        self.live_host_indexes = None
+        # 正在运行的关键字搜索任务
+        self.search_worker = None
+        self.index_worker = None
+        # 多主机搜索：正在运行的任务和已完成主机的时间线
+        self.fleet_search_worker = None
+        self.fleet_timeline = FleetTimeline()
+        # 正在运行的后台任务（收集、列表、搜索、查看、导出、预取），用于统一取消
+        self.active_jobs = []
+        
+        # 创建菜单栏
+        self.create_menu_bar()
+        
+        # 创建主窗口部件
+        main_widget = QWidget()
+        self.setCentralWidget(main_widget)
+        main_layout = QVBoxLayout(main_widget)
+        
+        # 主机选择区域
+        host_select_group = QGroupBox("主机选择")
+        host_select_layout = QHBoxLayout(host_select_group)
+        
+        host_label = QLabel("选择主机:")
+        self.host_combo = QComboBox()
+        self.host_combo.setMinimumWidth(200)
+        manage_hosts_btn = QPushButton("管理主机")
+        scan_hosts_btn = QPushButton("检测主机")
+        scan_hosts_btn.setToolTip("同时探测所有主机的SSH服务，标记在线、较慢和离线的主机")
+        
+        host_select_layout.addWidget(host_label)
+        host_select_layout.addWidget(self.host_combo)
+        host_select_layout.addWidget(manage_hosts_btn)
+        host_select_layout.addWidget(scan_hosts_btn)
+        host_select_layout.addStretch(1)
+        
+        # 连接主机选择变化信号
+        self.host_combo.currentIndexChanged.connect(self.on_host_changed)
+        manage_hosts_btn.clicked.connect(self.manage_hosts)
+        scan_hosts_btn.clicked.connect(self.scan_hosts)
+        
+        # SSH连接设置
+        ssh_group = QGroupBox("SSH连接设置")
+        ssh_layout = QVBoxLayout(ssh_group)
+        
+        # 主机设置
+        host_layout = QHBoxLayout()
+        host_label = QLabel("主机地址:")
+        self.host_input = QLineEdit()
+        self.host_input.setPlaceholderText("例如: 192.168.1.100")
+        port_label = QLabel("端口:")
+        self.port_input = QSpinBox()
+        self.port_input.setRange(1, 65535)
+        self.port_input.setValue(22)
+        host_layout.addWidget(host_label)
+        host_layout.addWidget(self.host_input)
+        host_layout.addWidget(port_label)
+        host_layout.addWidget(self.port_input)
+        
+        # 用户名密码设置
+        credentials_layout = QHBoxLayout()
+        username_label = QLabel("用户名:")
+        self.username_input = QLineEdit()
+        password_label = QLabel("密码:")
+        self.password_input = QLineEdit()
+        self.password_input.setEchoMode(QLineEdit.EchoMode.Password)
+        credentials_layout.addWidget(username_label)
+        credentials_layout.addWidget(self.username_input)
+        credentials_layout.addWidget(password_label)
+        credentials_layout.addWidget(self.password_input)
+        
+        # 传输配置（加密算法、压缩、窗口大小），可通过校准选出最快的配置
+        transport_layout = QHBoxLayout()
+        transport_label = QLabel("传输配置:")
+        self.transport_combo = create_transport_combo()
+        calibrate_btn = QPushButton("测速校准")
+        calibrate_btn.setToolTip("依次用每种传输配置下载一段日志，选出最快的配置并保存到主机列表")
+        transport_layout.addWidget(transport_label)
+        transport_layout.addWidget(self.transport_combo)
+        transport_layout.addWidget(calibrate_btn)
+        transport_layout.addStretch(1)
+        calibrate_btn.clicked.connect(self.calibrate_transport)
+        
+        ssh_layout.addLayout(host_layout)
+        ssh_layout.addLayout(credentials_layout)
+        ssh_layout.addLayout(transport_layout)
+        
+        # 创建功能选项卡容器
+        function_tabs = QTabWidget()
+        function_tabs.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        
+        # 创建日志收集页
+        collect_tab = QWidget()
+        collect_layout = QVBoxLayout(collect_tab)
+        
+        # 日期选择
+        date_group = QGroupBox("日期设置")
+        date_layout = QVBoxLayout(date_group)
         
         # 日期范围选择
         date_range_layout = QHBoxLayout()
@@ -1350,6 +2883,29 @@ class MainWindow(QMainWindow):
         date_range_layout.addLayout(end_date_layout)
         date_layout.addLayout(date_range_layout)
         
+        # 时间段：只收集一天中的一个时间段，普通日志文件只下载这个时间段对应的部分
+        time_window_layout = QHBoxLayout()
+        self.use_time_window = QCheckBox("只收集时间段")
+        self.use_time_window.setChecked(False)
+        self.window_date = QDateEdit()
+        self.window_date.setDate(QDate.currentDate())
+        self.window_date.setCalendarPopup(True)
+        self.window_start_time = QTimeEdit()
+        self.window_start_time.setDisplayFormat("HH:mm")
+        self.window_start_time.setTime(QTime.currentTime().addSecs(-30 * 60))
+        self.window_end_time = QTimeEdit()
+        self.window_end_time.setDisplayFormat("HH:mm")
+        self.window_end_time.setTime(QTime.currentTime())
+        time_window_layout.addWidget(self.use_time_window)
+        time_window_layout.addWidget(QLabel("日期:"))
+        time_window_layout.addWidget(self.window_date)
+        time_window_layout.addWidget(QLabel("从:"))
+        time_window_layout.addWidget(self.window_start_time)
+        time_window_layout.addWidget(QLabel("到:"))
+        time_window_layout.addWidget(self.window_end_time)
+        time_window_layout.addStretch(1)
+        date_layout.addLayout(time_window_layout)
+        
         # 添加日期说明
         date_info = QLabel("注意：将自动匹配文件名中包含选定日期范围的日志文件支持的文件名格式：xxxx_YYYY-MM-DD.log 或 xxxx_YYYY-MM-DD.zip")
         date_info.setStyleSheet("color: gray;")
@@ -1408,25 +2964,27 @@ class MainWindow(QMainWindow):
         # 创建操作按钮
         list_btn = QPushButton("列出文件")
         collect_btn = QPushButton("收集日志")
+        stop_btn = QPushButton("停止")
         operations_layout.addWidget(list_btn)
         operations_layout.addWidget(collect_btn)
+        operations_layout.addWidget(stop_btn)
         operations_layout.addStretch(1)
         
         # 添加操作按钮区域到文件列表布局
         file_list_layout.addLayout(operations_layout)
         
-        # 文件列表视图
-        self.file_list = QTableWidget()
-        self.file_list.setColumnCount(3)
-        self.file_list.setHorizontalHeaderLabels(["文件名", "大小", "日期"])
-        self.file_list.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.file_list.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.file_list.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        # 文件列表视图（可按列排序、按文件名筛选）
+        self.file_filter_input = QLineEdit()
+        self.file_filter_input.setPlaceholderText("筛选文件名")
+        self.file_list, self.file_model, self.file_proxy = create_file_table(
+            ["文件名", "大小", "日期"], self.file_filter_input)
+        file_list_layout.addWidget(self.file_filter_input)
         file_list_layout.addWidget(self.file_list)
         
         # 连接按钮事件
         list_btn.clicked.connect(self.list_files)
         collect_btn.clicked.connect(self.start_collection)
+        stop_btn.clicked.connect(self.cancel_collection)
         
         # 进度显示
         progress_group = QGroupBox("进度")
@@ -1477,14 +3035,13 @@ class MainWindow(QMainWindow):
         log_list_group = QGroupBox("日志文件列表")
         log_list_layout = QVBoxLayout(log_list_group)
         
-        self.log_list = QTableWidget()
-        self.log_list.setColumnCount(3)
-        self.log_list.setHorizontalHeaderLabels(["日志名称", "大小", "日期"])
-        self.log_list.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.log_list.setSelectionMode(QTableWidget.SelectionMode.ExtendedSelection)
-        self.log_list.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.log_list.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.log_filter_input = QLineEdit()
+        self.log_filter_input.setPlaceholderText("筛选日志名称")
+        self.log_list, self.log_model, self.log_proxy = create_file_table(
+            ["日志名称", "大小", "日期"], self.log_filter_input)
+        self.log_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         
+        log_list_layout.addWidget(self.log_filter_input)
         log_list_layout.addWidget(self.log_list)
         
         # 搜索区域
@@ -1494,26 +3051,52 @@ class MainWindow(QMainWindow):
         search_input_layout = QHBoxLayout()
         keyword_label = QLabel("关键字:")
         self.keyword_input = QLineEdit()
-        self.keyword_input.setPlaceholderText("输入要搜索的关键字")
+        self.keyword_input.setPlaceholderText("输入关键字（可含空格），支持 AND/OR/NOT、括号、re:正则、cs:区分大小写，使用运算符时含空格的词条加双引号，例如：京A12345 OR \"connect timeout\"")
         search_btn = QPushButton("搜索")
+        fleet_search_btn = QPushButton("多主机搜索")
+        stop_search_btn = QPushButton("停止搜索")
         view_full_btn = QPushButton("查看完整日志")
+        follow_btn = QPushButton("实时跟踪")
+        histogram_btn = QPushButton("分钟统计")
+        template_btn = QPushButton("模板统计")
         
         search_input_layout.addWidget(keyword_label)
         search_input_layout.addWidget(self.keyword_input)
         search_input_layout.addWidget(search_btn)
+        search_input_layout.addWidget(fleet_search_btn)
+        search_input_layout.addWidget(stop_search_btn)
         search_input_layout.addWidget(view_full_btn)
+        search_input_layout.addWidget(follow_btn)
+        search_input_layout.addWidget(histogram_btn)
+        search_input_layout.addWidget(template_btn)
         
         # 连接按钮事件
         search_btn.clicked.connect(self.search_keyword)
+        fleet_search_btn.clicked.connect(self.search_fleet)
+        stop_search_btn.clicked.connect(self.stop_search)
         view_full_btn.clicked.connect(self.view_full_log)
+        follow_btn.clicked.connect(self.follow_logs)
+        histogram_btn.clicked.connect(self.show_histogram)
+        template_btn.clicked.connect(self.show_templates)
         
         search_layout.addLayout(search_input_layout)
         
-        # 搜索结果区域
-        self.result_text = QTextEdit()
-        self.result_text.setReadOnly(True)
-        
-        search_layout.addWidget(self.result_text)
+        # 搜索结果区域：结果保存在紧凑的存储中，列表只格式化和绘制可见的行
+        self.result_model = SearchResultModel(self)
+        self.result_delegate = ResultHighlightDelegate(self)
+        self.result_view = QListView()
+        self.result_view.setModel(self.result_model)
+        self.result_view.setItemDelegate(self.result_delegate)
+        self.result_view.setUniformItemSizes(True)
+        self.result_view.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.result_view.setTextElideMode(Qt.TextElideMode.ElideNone)
+        self.result_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
+        self.result_view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.result_view.doubleClicked.connect(self.open_result)
+        copy_shortcut = QShortcut(QKeySequence.StandardKey.Copy, self.result_view)
+        copy_shortcut.activated.connect(self.copy_results)
+        
+        search_layout.addWidget(self.result_view)
         
         # 添加导出结果和导出时间范围日志的按钮
         export_btns_layout = QHBoxLayout()
@@ -1543,9 +3126,17 @@ class MainWindow(QMainWindow):
         log_group = QGroupBox("操作日志")
         log_layout = QVBoxLayout(log_group)
         
-        self.log_text = QTextEdit()
+        # 只保留最近的 LOG_PANE_MAX_LINES 行，新消息先进入缓冲区，由定时器合并写入
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
+        self.log_text.setMaximumBlockCount(LOG_PANE_MAX_LINES)
         log_layout.addWidget(self.log_text)
+        self.pending_log_lines = deque(maxlen=LOG_PANE_MAX_LINES)
+        self.dropped_log_lines = 0
+        self.log_flush_timer = QTimer(self)
+        self.log_flush_timer.setInterval(LOG_PANE_FLUSH_MS)
+        self.log_flush_timer.timeout.connect(self.flush_log_messages)
+        self.log_flush_timer.start()
         
         # 将选项卡和其他组件添加到主布局
         main_layout.addWidget(host_select_group)
@@ -1570,6 +3161,10 @@ class MainWindow(QMainWindow):
         clear_cache_action = file_menu.addAction("清除日志缓存")
         clear_cache_action.triggered.connect(self.clear_log_cache)
         
+        # 更新搜索索引动作
+        update_index_action = file_menu.addAction("更新搜索索引")
+        update_index_action.triggered.connect(self.update_search_index)
+        
         # 退出动作
         exit_action = file_menu.addAction("退出")
         exit_action.triggered.connect(self.close)
@@ -1577,25 +3172,10 @@ class MainWindow(QMainWindow):
     def clear_log_cache(self):
         """清除日志缓存文件"""
         try:
-            import tempfile
-            import os
-            import shutil
-            
-            # 获取缓存目录
-            cache_dir = os.path.join(tempfile.gettempdir(), "log_cache")
-            
-            if os.path.exists(cache_dir):
-                # 计算缓存文件数量和总大小
-                file_count = 0
-                total_size = 0
-                for file_name in os.listdir(cache_dir):
-                    file_path = os.path.join(cache_dir, file_name)
-                    if os.path.isfile(file_path):
-                        file_count += 1
-                        total_size += os.path.getsize(file_path)
-                
-                # 删除缓存目录
-                shutil.rmtree(cache_dir)
+            cache = shared_cache(on_evict=forget_indexed_file)
+            if os.path.exists(cache.cache_dir):
+                # 通过缓存管理器删除，同时删除这些文件的搜索索引
+                file_count, total_size = cache.clear()
                 
                 # 显示成功消息
                 size_mb = total_size / (1024 * 1024)
@@ -1608,6 +3188,34 @@ class MainWindow(QMainWindow):
             self.log_message(f"清除缓存失败: {str(e)}")
             QMessageBox.critical(self, "错误", f"清除缓存失败：\n{str(e)}")
     
+    def update_search_index(self):
+        """更新日志缓存和已收集日志的全文索引"""
+        directories = [
+            DEFAULT_CACHE_DIR,
+            os.path.abspath("collected_logs")
+        ]
+        self.log_message("开始更新搜索索引...")
+        self.index_worker = LogIndexWorker(directories)
+        self.index_worker.finished.connect(
+            lambda total: self.log_message(f"搜索索引更新完成，新增 {total} 行"))
+        self.index_worker.error.connect(self.analysis_error)
+        self.start_job(self.index_worker)
+    
+    def update_stale_index(self, paths):
+        """
+        在后台更新搜索时发现索引不是最新的文件，下次搜索时使用索引
+        已有索引任务在运行时跳过（下次搜索会再次发现）
+        Args:
+            paths: 本地文件路径列表
+        """
+        if self.index_worker is not None and self.index_worker.isRunning():
+            return
+        self.index_worker = LogIndexWorker(files=paths)
+        self.index_worker.finished.connect(
+            lambda total: self.log_message(f"搜索索引已在后台更新，新增 {total} 行") if total else None)
+        self.index_worker.error.connect(self.log_message)
+        self.start_job(self.index_worker, QThread.Priority.LowPriority)
+    
     def load_hosts_data(self):
         """加载主机数据到下拉框"""
         try:
@@ -1627,10 +3235,55 @@ class MainWindow(QMainWindow):
         """更新主机下拉框"""
         self.host_combo.clear()
         self.host_combo.addItem("-- 请选择主机 --", None)
+        # 主机列表变化后，之前的探测结果不再对应
+        self.host_states = {}
+        self.live_host_indexes = None
         
         for i, host in enumerate(self.hosts_data):
             self.host_combo.addItem(host.get("name", f"未命名主机{i+1}"), i)
     
+    def scan_hosts(self):
+        """并发探测所有主机，在主机下拉框中标记状态"""
+        if not self.hosts_data:
+            QMessageBox.warning(self, "警告", "主机列表为空，请先添加主机")
+            return
+        # 清除上次的探测结果（不重建下拉框，保留当前选择）
+        self.host_states = {}
+        self.live_host_indexes = None
+        for i, host in enumerate(self.hosts_data):
+            combo_index = self.host_combo.findData(i)
+            if combo_index >= 0:
+                self.host_combo.setItemText(combo_index, host.get("name", f"未命名主机{i+1}"))
+        self.log_message(f"正在探测 {len(self.hosts_data)} 台主机...")
+        worker = FleetScanWorker(list(self.hosts_data))
+        worker.host_status.connect(self.show_host_status)
+        worker.finished_scan.connect(self.fleet_scan_finished)
+        self.start_job(worker)
+    
+    def show_host_status(self, host_index, status):
+        """显示一台主机的探测结果"""
+        self.host_states[host_index] = status
+        name = self.hosts_data[host_index].get("name", f"未命名主机{host_index+1}")
+        if status['state'] in (HOST_UP, HOST_SLOW):
+            label = "在线" if status['state'] == HOST_UP else "较慢"
+            text = f"{name} [{label} {status['banner_time'] * 1000:.0f}ms]"
+        else:
+            text = f"{name} [离线]"
+            self.log_message(f"主机 {name} 不可达: {status['error']}")
+        combo_index = self.host_combo.findData(host_index)
+        if combo_index >= 0:
+            self.host_combo.setItemText(combo_index, text)
+    
+    def fleet_scan_finished(self, live_indexes):
+        """
+        保存在线主机列表（按预计开销排序），供多主机操作只处理在线的主机
+        Args:
+            live_indexes: 在线主机的索引列表
+        """
+        self.live_host_indexes = live_indexes
+        down = len(self.hosts_data) - len(live_indexes)
+        self.log_message(f"主机探测完成: {len(live_indexes)} 台在线，{down} 台离线")
+    
     def on_host_changed(self, index):
         """主机选择变化时更新界面"""
         if index <= 0:  # 没有选择有效主机
@@ -1645,6 +3298,7 @@ class MainWindow(QMainWindow):
             self.port_input.setValue(host_data.get("ssh", {}).get("port", 22))
             self.username_input.setText(host_data.get("ssh", {}).get("username", ""))
             self.password_input.setText(host_data.get("ssh", {}).get("password", ""))
+            set_transport_combo(self.transport_combo, host_data.get("ssh", {}).get("transport"))
             
             # 更新路径列表
             self.path_list.clear()
@@ -1697,6 +3351,7 @@ class MainWindow(QMainWindow):
                 self.port_input.setValue(config['ssh'].get('port', 22))
                 self.username_input.setText(config['ssh'].get('username', ''))
                 self.password_input.setText(config['ssh'].get('password', ''))
+                set_transport_combo(self.transport_combo, config['ssh'].get('transport'))
                 
                 for path in config.get('log_paths', []):
                     if path and path.strip() != "/path/to/logs":
@@ -1714,12 +3369,7 @@ class MainWindow(QMainWindow):
         host_index = self.host_combo.currentData()
         if host_index is not None and host_index < len(self.hosts_data):
             # 更新主机数据
-            self.hosts_data[host_index]["ssh"] = {
-                'host': self.host_input.text(),
-                'port': self.port_input.value(),
-                'username': self.username_input.text(),
-                'password': self.password_input.text()
-            }
+            self.hosts_data[host_index]["ssh"] = self.ssh_settings()
             self.hosts_data[host_index]["log_paths"] = [
                 self.path_list.item(i).text() 
                 for i in range(self.path_list.count())
@@ -1730,12 +3380,7 @@ class MainWindow(QMainWindow):
         
         # 保存常规配置
         config = {
-            'ssh': {
-                'host': self.host_input.text(),
-                'port': self.port_input.value(),
-                'username': self.username_input.text(),
-                'password': self.password_input.text()
-            },
+            'ssh': self.ssh_settings(),
             'log_paths': [self.path_list.item(i).text() 
                          for i in range(self.path_list.count())]
         }
@@ -1770,12 +3415,73 @@ class MainWindow(QMainWindow):
         for item in selected_items:
             self.path_list.takeItem(self.path_list.row(item))
     
+    def start_job(self, worker, priority=None):
+        """
+        启动后台任务并登记到 active_jobs（同时保留引用，避免线程对象在运行中被回收）
+        Args:
+            worker: QThread 任务
+            priority: 线程优先级，默认为继承
+        Returns:
+            QThread: 同一个任务
+        """
+        self.active_jobs = [job for job in self.active_jobs if job.isRunning()]
+        self.active_jobs.append(worker)
+        if priority is None:
+            worker.start()
+        else:
+            worker.start(priority)
+        return worker
+    
+    def cancel_jobs(self, jobs=None):
+        """
+        取消后台任务
+        Args:
+            jobs: 要取消的任务列表，默认为全部正在运行的任务
+        Returns:
+            int: 取消的任务数
+        """
+        count = 0
+        for job in list(self.active_jobs if jobs is None else jobs):
+            if job.isRunning() and hasattr(job, 'cancel'):
+                job.cancel()
+                count += 1
+        return count
+    
+    def cancel_collection(self):
+        """停止正在进行的列出文件或收集日志"""
+        worker = getattr(self, 'worker', None)
+        if worker is not None and self.cancel_jobs([worker]):
+            self.log_message("已停止收集日志")
+    
+    def closeEvent(self, event):
+        """关闭主窗口时取消所有后台任务，并等待它们结束"""
+        self.cancel_jobs()
+        for job in self.active_jobs:
+            job.wait(3000)
+        super().closeEvent(event)
+    
     def log_message(self, message):
-        """添加日志消息"""
+        """添加日志消息（写入缓冲区，由 flush_log_messages 定时显示）"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        self.log_text.append(f"[{timestamp}] {message}")
-        # 滚动到底部
-        self.log_text.verticalScrollBar().setValue(self.log_text.verticalScrollBar().maximum())
+        if len(self.pending_log_lines) == self.pending_log_lines.maxlen:
+            self.dropped_log_lines += 1
+        self.pending_log_lines.append(f"[{timestamp}] {message}")
+    
+    def flush_log_messages(self):
+        """把缓冲区中的日志消息一次性写入操作日志区域"""
+        if not self.pending_log_lines:
+            return
+        lines = list(self.pending_log_lines)
+        self.pending_log_lines.clear()
+        if self.dropped_log_lines:
+            lines.insert(0, f"...... 省略了 {self.dropped_log_lines} 条较早的消息 ......")
+            self.dropped_log_lines = 0
+        # 用户向上翻看时不强制滚动到底部
+        scroll_bar = self.log_text.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum()
+        self.log_text.appendPlainText('\n'.join(lines))
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
     
     def get_date_range(self):
         """获取日期范围设置"""
@@ -1786,16 +3492,21 @@ class MainWindow(QMainWindow):
         end_date = self.end_date.date().toString('yyyy-MM-dd')
         return start_date, end_date
     
+    def get_time_window(self):
+        """获取时间段设置，没有启用时返回None"""
+        if not self.use_time_window.isChecked():
+            return None
+        return {
+            'date': self.window_date.date().toString('yyyy-MM-dd'),
+            'start': self.window_start_time.time().toString('HH:mm'),
+            'end': self.window_end_time.time().toString('HH:mm'),
+        }
+    
     def list_files(self):
         """列出远程服务器上的日志文件"""
         # 获取SSH连接配置
         config = {
-            'ssh': {
-                'host': self.host_input.text(),
-                'port': self.port_input.value(),
-                'username': self.username_input.text(),
-                'password': self.password_input.text()
-            },
+            'ssh': self.ssh_settings(),
             'log_paths': [self.path_list.item(i).text() 
                           for i in range(self.path_list.count())]
         }
@@ -1810,47 +3521,25 @@ class MainWindow(QMainWindow):
             return
         
         # 清空文件列表
-        self.file_list.setRowCount(0)
+        self.file_model.clear()
         
         # 创建并启动工作线程
         self.log_message("开始列出文件...")
         self.worker = LogCollectorWorker(config, mode='list')
         self.worker.file_list.connect(self.show_file_list)
         self.worker.error.connect(self.collection_error)
-        self.worker.start()
+        self.start_job(self.worker)
     
     def show_file_list(self, file_info_list):
-        """显示文件列表"""
-        self.file_list.setRowCount(len(file_info_list))
-        
-        for row, file_info in enumerate(file_info_list):
-            # 文件名
-            name_item = QTableWidgetItem(file_info.get('name', ''))
-            self.file_list.setItem(row, 0, name_item)
-            
-            # 文件大小（如果有）
-            size_item = QTableWidgetItem(file_info.get('size', 'N/A'))
-            self.file_list.setItem(row, 1, size_item)
-            
-            # 日期
-            date_item = QTableWidgetItem(file_info.get('date', ''))
-            self.file_list.setItem(row, 2, date_item)
-            
-            # 存储完整路径
-            name_item.setData(Qt.ItemDataRole.UserRole, file_info.get('path'))
-        
+        """显示文件列表（每个目录的文件到达时追加）"""
+        self.file_model.append_rows(file_info_list)
         self.log_message(f"列出了 {len(file_info_list)} 个文件")
     
     def start_collection(self):
         """开始收集日志"""
         # 获取SSH连接配置
         config = {
-            'ssh': {
-                'host': self.host_input.text(),
-                'port': self.port_input.value(),
-                'username': self.username_input.text(),
-                'password': self.password_input.text()
-            },
+            'ssh': self.ssh_settings(),
             'log_paths': [self.path_list.item(i).text() 
                           for i in range(self.path_list.count())]
         }
@@ -1873,13 +3562,21 @@ class MainWindow(QMainWindow):
         else:
             config['use_date_range'] = False
         
+        # 时间段设置（优先于日期范围），前后各扩展一分钟
+        time_window = self.get_time_window()
+        if time_window:
+            if time_window['end'] <= time_window['start']:
+                QMessageBox.warning(self, "警告", "时间段的结束时间必须晚于开始时间")
+                return
+            config['time_window'] = time_window
+        
         # 创建并启动工作线程
         self.log_message("开始收集日志...")
         self.worker = LogCollectorWorker(config, mode='collect')
         self.worker.progress.connect(self.update_progress)
         self.worker.finished.connect(self.collection_finished)
         self.worker.error.connect(self.collection_error)
-        self.worker.start()
+        self.start_job(self.worker)
         
         # 保存配置
         self.save_config()
@@ -1910,12 +3607,7 @@ class MainWindow(QMainWindow):
         """获取日志文件列表"""
         # 获取SSH连接配置
         config = {
-            'ssh': {
-                'host': self.host_input.text(),
-                'port': self.port_input.value(),
-                'username': self.username_input.text(),
-                'password': self.password_input.text()
-            },
+            'ssh': self.ssh_settings(),
             'log_paths': [self.path_list.item(i).text() 
                           for i in range(self.path_list.count())]
         }
@@ -1936,15 +3628,16 @@ class MainWindow(QMainWindow):
         config['end_date_analysis'] = end_date
         
         # 清空日志列表
-        self.log_list.setRowCount(0)
+        self.log_model.clear()
         
         # 创建并启动工作线程
         self.log_message("正在获取日志文件列表...")
         self.analysis_worker = LogAnalysisWorker(config, mode='list')
+        self.analysis_worker.log_batch.connect(self.log_model.append_rows)
         self.analysis_worker.log_list.connect(self.display_log_list)
         self.analysis_worker.error.connect(self.analysis_error)
         self.analysis_worker.log_message_signal.connect(self.log_message)
-        self.analysis_worker.start()
+        self.start_job(self.analysis_worker)
     
     def get_date_range_analysis(self):
         """获取分析选项卡的日期范围设置"""
@@ -1953,590 +3646,87 @@ class MainWindow(QMainWindow):
         return start_date, end_date
     
     def display_log_list(self, logs):
-        """显示日志文件列表"""
-        self.log_list.setRowCount(len(logs))
-        
-        for row, log in enumerate(logs):
-            # 文件名
-            name_item = QTableWidgetItem(log.get('name', ''))
-            self.log_list.setItem(row, 0, name_item)
-            
-            # 文件大小
-            size_item = QTableWidgetItem(log.get('size', ''))
-            self.log_list.setItem(row, 1, size_item)
-            
-            # 日期
-            date_item = QTableWidgetItem(log.get('date', ''))
-            self.log_list.setItem(row, 2, date_item)
-            
-            # 存储完整路径
-            name_item.setData(Qt.ItemDataRole.UserRole, log.get('path'))
-        
+        """日志文件列表获取完成（各批文件已通过 log_batch 追加到表格）"""
         self.log_message(f"找到 {len(logs)} 个日志文件")
+        self.start_prefetch(logs)
+    
+    def selected_log_files(self):
+        """
+        获取日志列表中选中的文件（经过排序和筛选后映射回原始行）
+        Returns:
+            list: [(文件名, 文件路径), ...]
+        """
+        selected = []
+        for index in self.log_list.selectionModel().selectedRows():
+            row = self.log_proxy.mapToSource(index).row()
+            selected.append((self.log_model.listing.name(row), self.log_model.listing.path(row)))
+        return selected
+    
+    def start_prefetch(self, logs):
+        """在后台预取最可能被查看的日志文件"""
+        worker = getattr(self, 'analysis_worker', None)
+        if worker is None or worker.is_local_test_mode():
+            return
+        # 新列表到达时停止上一次的预取
+        if getattr(self, 'prefetch_worker', None) is not None:
+            self.prefetch_worker.stop()
+        self.prefetch_worker = LogPrefetchWorker(worker.config, logs)
+        self.prefetch_worker.log_message_signal.connect(self.log_message)
+        self.start_job(self.prefetch_worker, QThread.Priority.LowestPriority)
     
     def search_keyword(self):
-        """搜索关键字"""
+        """在后台搜索关键字，时间范围内的日志块边归并边显示"""
         # 获取关键字
         keyword = self.keyword_input.text().strip()
         if not keyword:
             QMessageBox.warning(self, "警告", "请输入要搜索的关键字")
             return
+        try:
+            query = LogQuery.parse(keyword)
+        except QueryError as e:
+            QMessageBox.warning(self, "警告", f"查询语句有误：{str(e)}")
+            return
         
         # 获取选中的日志文件
-        selected_rows = self.log_list.selectionModel().selectedRows()
-        if not selected_rows:
+        selected_files = [(name, path) for name, path in self.selected_log_files() if path]
+        if not selected_files:
             QMessageBox.warning(self, "警告", "请先选择要搜索的日志文件")
             return
-        
-        # 获取选中文件的路径和文件名
-        selected_files = []
-        file_prefixes = {}  # 用于存储文件前缀
-        file_names = {}     # 用于存储文件名
-        for row in selected_rows:
-            file_name = self.log_list.item(row.row(), 0).text()
-            file_path = self.log_list.item(row.row(), 0).data(Qt.ItemDataRole.UserRole)
-            if file_path:
-                selected_files.append(file_path)
-                # 提取文件前缀，例如从 "RsuLogic_2025-03-31.log" 提取 "RsuLogic"
-                file_prefix = re.match(r'([^_]+)_?', file_name)
-                prefix = file_prefix.group(1) if file_prefix else "LOG"
-                file_prefixes[file_path] = prefix
-                file_names[file_path] = file_name
+        if self.search_worker is not None and self.search_worker.isRunning():
+            QMessageBox.warning(self, "警告", "搜索正在进行，请先停止")
+            return
+        for _, path in selected_files:
+            if not os.path.exists(path):
+                access_history.record(path)
         
         # 清空结果显示区
-        self.result_text.clear()
+        self.result_model.clear()
+        self.result_delegate.query = query
         
-        # 创建进度对话框
+        # 进度对话框不阻塞主窗口，取消时中止下载、远程命令和扫描
         progress = QProgressDialog("正在搜索关键字...", "取消", 0, len(selected_files), self)
-        progress.setWindowModality(Qt.WindowModality.WindowModal)
-        progress.show()
-        
-        # 开始搜索
-        try:
-            self.log_message("开始搜索关键字: " + keyword)
-            keyword_results = []  # 包含关键字的结果
-            all_file_contents = {}  # 存储每个文件的完整内容
-            # 修改为匹配行首的时间戳格式，支持有无毫秒的情况
-            time_pattern = r'^(\d{2}:\d{2}:\d{2}(?:\.\d{3})?)'
-            # 不再匹配和使用RegTime
-            earliest_time = None
-            latest_time = None
-            
-            # 初始化SSH连接（如果需要搜索远程文件）
-            for i, file_path in enumerate(selected_files):
-                # 更新进度
-                progress.setValue(i)
-                if progress.wasCanceled():
-                    break
-                
-                # 获取文件前缀和文件名
-                prefix = file_prefixes.get(file_path, "LOG")
-                file_name = file_names.get(file_path, os.path.basename(file_path))
-                
-                # 判断是否为本地文件
-                if os.path.exists(file_path):
-                    # 处理本地文件
-                    # 检查文件是否为压缩文件
-                    if file_path.endswith('.zip'):
-                        # 处理压缩文件
-                        with zipfile.ZipFile(file_path, 'r') as zip_ref:
-                            for name in zip_ref.namelist():
-                                # 为zip内每个文件提取前缀
-                                name_prefix = re.match(r'([^_]+)_?', os.path.basename(name))
-                                inner_prefix = name_prefix.group(1) if name_prefix else prefix
-                                
-                                with zip_ref.open(name) as f:
-                                    # 尝试不同的编码读取zip文件内容
-                                    try:
-                                        content_lines = []
-                                        for line in io.TextIOWrapper(f, encoding='utf-8'):
-                                            content_lines.append(line.strip())
-                                            if keyword in line:
-                                                # 提取时间并更新最早/最晚时间
-                                                time_match = re.search(time_pattern, line)
-                                                if time_match:
-                                                    # 使用常规时间戳
-                                                    time_str = time_match.group(1)
-                                                    try:
-                                                        # 根据时间格式进行灵活解析
-                                                        if '.' in time_str:
-                                                            # 含有毫秒的时间格式 HH:MM:SS.fff
-                                                            time_obj = datetime.strptime(time_str, '%H:%M:%S.%f')
-                                                        else:
-                                                            # 不含毫秒的时间格式 HH:MM:SS
-                                                            time_obj = datetime.strptime(time_str, '%H:%M:%S')
-                                                    except ValueError as e:
-                                                        print(f"时间解析错误: {str(e)}")
-                                                    if earliest_time is None or time_obj < earliest_time:
-                                                        earliest_time = time_obj
-                                                    if latest_time is None or time_obj > latest_time:
-                                                        latest_time = time_obj
-                                                
-                                                # 只显示文件名，不显示完整路径
-                                                keyword_results.append(f"[{inner_prefix}] {line.strip()}")
-                                        
-                                        # 存储文件内容
-                                        all_file_contents[f"{file_path}/{name}"] = {
-                                            'content': content_lines, 
-                                            'prefix': inner_prefix,
-                                            'file_name': os.path.basename(name)
-                                        }
-                                    except UnicodeDecodeError:
-                                        # 如果UTF-8失败，尝试GBK
-                                        f.seek(0)  # 重置文件指针
-                                        try:
-                                            content_lines = []
-                                            for line in io.TextIOWrapper(f, encoding='gbk'):
-                                                content_lines.append(line.strip())
-                                                if keyword in line:
-                                                    # 提取时间并更新
-                                                    time_match = re.search(time_pattern, line)
-                                                    if time_match:
-                                                        # 使用常规时间戳
-                                                        time_str = time_match.group(1)
-                                                        try:
-                                                            # 根据时间格式进行灵活解析
-                                                            if '.' in time_str:
-                                                                # 含有毫秒的时间格式 HH:MM:SS.fff
-                                                                time_obj = datetime.strptime(time_str, '%H:%M:%S.%f')
-                                                            else:
-                                                                # 不含毫秒的时间格式 HH:MM:SS
-                                                                time_obj = datetime.strptime(time_str, '%H:%M:%S')
-                                                        except ValueError as e:
-                                                            print(f"时间解析错误: {str(e)}")
-                                                        if earliest_time is None or time_obj < earliest_time:
-                                                            earliest_time = time_obj
-                                                        if latest_time is None or time_obj > latest_time:
-                                                            latest_time = time_obj
-                                                    
-                                                    keyword_results.append(f"[{inner_prefix}] {line.strip()}")
-                                            
-                                            # 存储文件内容
-                                            all_file_contents[f"{file_path}/{name}"] = {
-                                                'content': content_lines, 
-                                                'prefix': inner_prefix,
-                                                'file_name': os.path.basename(name)
-                                            }
-                                        except UnicodeDecodeError:
-                                            # 如果GBK也失败，使用Latin1（可处理任何字节）
-                                            f.seek(0)
-                                            content_lines = []
-                                            for line in io.TextIOWrapper(f, encoding='latin1'):
-                                                content_lines.append(line.strip())
-                                                if keyword in line:
-                                                    # 提取时间并更新
-                                                    time_match = re.search(time_pattern, line)
-                                                    if time_match:
-                                                        # 使用常规时间戳
-                                                        time_str = time_match.group(1)
-                                                        try:
-                                                            # 根据时间格式进行灵活解析
-                                                            if '.' in time_str:
-                                                                # 含有毫秒的时间格式 HH:MM:SS.fff
-                                                                time_obj = datetime.strptime(time_str, '%H:%M:%S.%f')
-                                                            else:
-                                                                # 不含毫秒的时间格式 HH:MM:SS
-                                                                time_obj = datetime.strptime(time_str, '%H:%M:%S')
-                                                        except ValueError as e:
-                                                            print(f"时间解析错误: {str(e)}")
-                                                        if earliest_time is None or time_obj < earliest_time:
-                                                            earliest_time = time_obj
-                                                        if latest_time is None or time_obj > latest_time:
-                                                            latest_time = time_obj
-                                                    
-                                                    keyword_results.append(f"[{inner_prefix}] {line.strip()}")
-                                            
-                                            # 存储文件内容
-                                            all_file_contents[f"{file_path}/{name}"] = {
-                                                'content': content_lines, 
-                                                'prefix': inner_prefix,
-                                                'file_name': os.path.basename(name)
-                                            }
-                                            # 如果成功读取，跳出循环
-                                            break
-                    else:
-                        # 处理普通文本文件，尝试多种编码
-                        encodings = ['utf-8', 'gbk', 'gb18030', 'latin1']
-                        file_content = None
-                        
-                        # 依次尝试不同的编码
-                        for encoding in encodings:
-                            try:
-                                with open(file_path, 'r', encoding=encoding) as f:
-                                    file_content = f.readlines()
-                                self.log_message(f"成功使用 {encoding} 编码读取文件")
-                                # 如果成功读取，跳出循环
-                                break
-                            except UnicodeDecodeError:
-                                self.log_message(f"{encoding} 编码读取失败，尝试下一种编码")
-                                continue
-                            except Exception as e:
-                                self.log_message(f"读取文件时出错 ({encoding}): {str(e)}")
-                        
-                        # 如果所有编码都失败，使用二进制模式读取并强制解码
-                        if not file_content:
-                            try:
-                                self.log_message("尝试二进制模式读取文件")
-                                with open(file_path, 'rb') as f:
-                                    binary_content = f.read()
-                                    text_content = binary_content.decode('utf-8', errors='ignore')
-                                    file_content = text_content.splitlines(True)
-                            except Exception as e:
-                                self.log_message(f"二进制模式读取失败: {str(e)}")
-                                # 最后的尝试，使用最宽松的解码方式
-                                try:
-                                    with open(file_path, 'r', encoding='latin1') as f:
-                                        file_content = f.readlines()
-                                    self.log_message("使用latin1编码成功读取文件")
-                                except Exception as e:
-                                    self.log_message(f"所有读取方式都失败: {str(e)}")
-                                    continue
-                        
-                        # 存储文件内容并搜索匹配行
-                        if file_content:
-                            content_lines = []
-                            for line in file_content:
-                                line = line.strip()
-                                content_lines.append(line)
-                                if keyword in line:
-                                    # 提取时间并更新最早/最晚时间
-                                    time_match = re.search(time_pattern, line)
-                                    if time_match:
-                                        # 使用常规时间戳
-                                        time_str = time_match.group(1)
-                                        try:
-                                            # 根据时间格式进行灵活解析
-                                            if '.' in time_str:
-                                                # 含有毫秒的时间格式 HH:MM:SS.fff
-                                                time_obj = datetime.strptime(time_str, '%H:%M:%S.%f')
-                                            else:
-                                                # 不含毫秒的时间格式 HH:MM:SS
-                                                time_obj = datetime.strptime(time_str, '%H:%M:%S')
-                                        except ValueError as e:
-                                            print(f"时间解析错误: {str(e)}")
-                                        if earliest_time is None or time_obj < earliest_time:
-                                            earliest_time = time_obj
-                                        if latest_time is None or time_obj > latest_time:
-                                            latest_time = time_obj
-                                    
-                                    # 只显示文件名，不显示完整路径
-                                    keyword_results.append(f"[{prefix}] {line}")
-                            
-                            # 存储文件内容
-                            all_file_contents[file_path] = {
-                                'content': content_lines, 
-                                'prefix': prefix,
-                                'file_name': file_name
-                            }
-                else:
-                    # 通过SSH搜索远程文件
-                    # 初始化SSH连接（如果还没有）
-                    if not hasattr(self, 'log_collector') or not self.log_collector.is_connected():
-                        # 获取SSH连接配置
-                        config = {
-                            'ssh': {
-                                'host': self.host_input.text(),
-                                'port': self.port_input.value(),
-                                'username': self.username_input.text(),
-                                'password': self.password_input.text()
-                            }
-                        }
-                        # 创建连接
-                        self.log_collector = LogCollector(config_file=None)
-                        self.log_collector.config = config
-                        self.log_collector.connect()
-                        self.log_message("已连接到服务器")
-                    
-                    # 检查文件是否为压缩文件
-                    if file_path.endswith('.zip'):
-                        # 下载压缩文件到临时目录
-                        temp_dir = tempfile.mkdtemp()
-                        local_zip = os.path.join(temp_dir, os.path.basename(file_path))
-                        self.log_collector.download_file(file_path, local_zip)
-                        
-                        # 解压并搜索
-                        with zipfile.ZipFile(local_zip, 'r') as zip_ref:
-                            for name in zip_ref.namelist():
-                                # 为zip内每个文件提取前缀
-                                name_prefix = re.match(r'([^_]+)_?', os.path.basename(name))
-                                inner_prefix = name_prefix.group(1) if name_prefix else prefix
-                                
-                                with zip_ref.open(name) as f:
-                                    # 尝试多种编码读取文件内容
-                                    encodings = ['utf-8', 'gbk', 'gb18030', 'latin1']
-                                    content_lines = []
-                                    for encoding in encodings:
-                                        try:
-                                            f.seek(0)  # 重置文件指针
-                                            content_lines = []
-                                            for line in io.TextIOWrapper(f, encoding=encoding):
-                                                line = line.strip()
-                                                content_lines.append(line)
-                                                if keyword in line:
-                                                    # 提取时间并更新最早/最晚时间
-                                                    time_match = re.search(time_pattern, line)
-                                                    if time_match:
-                                                        # 使用常规时间戳
-                                                        time_str = time_match.group(1)
-                                                        try:
-                                                            # 根据时间格式进行灵活解析
-                                                            if '.' in time_str:
-                                                                # 含有毫秒的时间格式 HH:MM:SS.fff
-                                                                time_obj = datetime.strptime(time_str, '%H:%M:%S.%f')
-                                                            else:
-                                                                # 不含毫秒的时间格式 HH:MM:SS
-                                                                time_obj = datetime.strptime(time_str, '%H:%M:%S')
-                                                        except ValueError as e:
-                                                            print(f"时间解析错误: {str(e)}")
-                                                        if earliest_time is None or time_obj < earliest_time:
-                                                            earliest_time = time_obj
-                                                        if latest_time is None or time_obj > latest_time:
-                                                            latest_time = time_obj
-                                                    
-                                                    keyword_results.append(f"[{inner_prefix}] {line}")
-                                            
-                                            # 存储文件内容
-                                            all_file_contents[f"{file_path}/{name}"] = {
-                                                'content': content_lines, 
-                                                'prefix': inner_prefix,
-                                                'file_name': os.path.basename(name)
-                                            }
-                                            # 如果成功读取，跳出循环
-                                            break
-                                        except UnicodeDecodeError:
-                                            # 尝试下一种编码
-                                            continue
-                                        except Exception as e:
-                                            self.log_message(f"读取压缩文件时出错 ({encoding}): {str(e)}")
-                        
-                        # 清理临时文件
-                        shutil.rmtree(temp_dir)
-                    else:
-                        # 获取完整文件内容
-                        # 首先下载文件到本地临时文件
-                        temp_dir = tempfile.mkdtemp()
-                        local_file = os.path.join(temp_dir, os.path.basename(file_path))
-                        try:
-                            self.log_collector.download_file(file_path, local_file)
-                            
-                            # 读取文件内容
-                            encodings = ['utf-8', 'gbk', 'gb18030', 'latin1']
-                            content_lines = []
-                            for encoding in encodings:
-                                try:
-                                    with open(local_file, 'r', encoding=encoding) as f:
-                                        content_lines = [line.strip() for line in f.readlines()]
-                                    break
-                                except UnicodeDecodeError:
-                                    continue
-                            
-                            # 如果所有编码都失败，使用二进制模式读取
-                            if not content_lines:
-                                with open(local_file, 'rb') as f:
-                                    content = f.read().decode('utf-8', errors='ignore')
-                                    content_lines = [line.strip() for line in content.splitlines()]
-                            
-                            # 搜索关键字并保存文件内容
-                            all_file_contents[file_path] = {
-                                'content': content_lines,
-                                'prefix': prefix
-                            }
-                            
-                            # 在内容中搜索关键字
-                            for line in content_lines:
-                                if keyword in line:
-                                    # 提取时间并更新最早/最晚时间
-                                    time_match = re.search(time_pattern, line)
-                                    if time_match:
-                                        # 使用常规时间戳
-                                        time_str = time_match.group(1)
-                                        try:
-                                            # 根据时间格式进行灵活解析
-                                            if '.' in time_str:
-                                                # 含有毫秒的时间格式 HH:MM:SS.fff
-                                                time_obj = datetime.strptime(time_str, '%H:%M:%S.%f')
-                                            else:
-                                                # 不含毫秒的时间格式 HH:MM:SS
-                                                time_obj = datetime.strptime(time_str, '%H:%M:%S')
-                                        except ValueError as e:
-                                            print(f"时间解析错误: {str(e)}")
-                                        if earliest_time is None or time_obj < earliest_time:
-                                            earliest_time = time_obj
-                                        if latest_time is None or time_obj > latest_time:
-                                            latest_time = time_obj
-                                    
-                                    keyword_results.append(f"[{prefix}] {line}")
-                        
-                        except Exception as e:
-                            self.log_message(f"下载或处理远程文件失败: {str(e)}")
-                            # 直接在远程搜索
-                            command = f"grep -F '{keyword}' '{file_path}'"
-                            self.log_message(f"执行搜索命令: {command}")
-                            output = self.log_collector.execute_command(command)
-                            
-                            # 处理命令输出结果
-                            if output:
-                                # 尝试多种编码解码输出
-                                output_lines = None
-                                try:
-                                    output_lines = output.splitlines()
-                                except UnicodeDecodeError:
-                                    # 可能字符编码有问题，尝试不同的编码
-                                    try:
-                                        output_lines = output.decode('gbk').splitlines()
-                                    except UnicodeDecodeError:
-                                        try:
-                                            output_lines = output.decode('utf-8', errors='ignore').splitlines()
-                                        except Exception as e:
-                                            self.log_message(f"解码命令输出出错: {str(e)}")
-                                            output_lines = []
-                                
-                                # 处理每一行结果
-                                for line in output_lines:
-                                    line = line.strip()
-                                    # 提取时间并更新最早/最晚时间
-                                    time_match = re.search(time_pattern, line)
-                                    if time_match:
-                                        # 使用常规时间戳
-                                        time_str = time_match.group(1)
-                                        try:
-                                            # 根据时间格式进行灵活解析
-                                            if '.' in time_str:
-                                                # 含有毫秒的时间格式 HH:MM:SS.fff
-                                                time_obj = datetime.strptime(time_str, '%H:%M:%S.%f')
-                                            else:
-                                                # 不含毫秒的时间格式 HH:MM:SS
-                                                time_obj = datetime.strptime(time_str, '%H:%M:%S')
-                                        except ValueError as e:
-                                            print(f"时间解析错误: {str(e)}")
-                                        if earliest_time is None or time_obj < earliest_time:
-                                            earliest_time = time_obj
-                                        if latest_time is None or time_obj > latest_time:
-                                            latest_time = time_obj
-                                    
-                                    self.log_message(f"处理搜索结果: {line[:100]}")  # 只显示前100个字符以免日志过长
-                                    keyword_results.append(f"[{prefix}] {line}")
-                        finally:
-                            # 清理临时文件
-                            shutil.rmtree(temp_dir)
-            
-            # 检查是否找到了时间范围
-            if earliest_time and latest_time:
-                self.log_message(f"找到时间范围: {earliest_time.strftime('%H:%M:%S.%f')[:-3]} - {latest_time.strftime('%H:%M:%S.%f')[:-3]}")
-                
-                # 如果最早和最晚时间相同，扩展时间范围（前后5分钟）
-                if earliest_time == latest_time:
-                    earliest_time = earliest_time - timedelta(minutes=5)
-                    latest_time = latest_time + timedelta(minutes=5)
-                    self.log_message(f"扩展时间范围: {earliest_time.strftime('%H:%M:%S.%f')[:-3]} - {latest_time.strftime('%H:%M:%S.%f')[:-3]}")
-                
-                # 整理所有结果，确保正确添加前缀
-                sorted_results = []
-                displayed_blocks = set()  # 用于跟踪已经添加的日志块，避免重复
-                
-                # 优化时间范围处理：确保开始时间正确设置
-                if earliest_time == latest_time:
-                    # 如果开始时间和结束时间相同，向前扩展一分钟
-                    earliest_time = earliest_time - timedelta(minutes=1)
-                
-                self.log_message(f"时间范围: {earliest_time.strftime('%H:%M:%S.%f')} - {latest_time.strftime('%H:%M:%S.%f')}")
-                
-                # 第二阶段：在确定的时间范围内，提取所有日志行并显示
-                self.log_message(f"提取时间范围内的所有日志行")
-                
-                # 遍历所有文件，提取在时间范围内的所有日志
-                for file_path, file_data in all_file_contents.items():
-                    content_lines = file_data['content']
-                    prefix = file_data['prefix']
-                    file_name = file_data.get('file_name', os.path.basename(file_path))
-                    
-                    # 识别所有时间戳行
-                    i = 0
-                    while i < len(content_lines):
-                        line = content_lines[i].strip()
-                        
-                        # 检查是否包含时间戳（可能是日志块开始）
-                        time_match = re.search(time_pattern, line)
-                        
-                        if time_match:
-                            try:
-                                # 提取时间
-                                time_str = time_match.group(1)
-                                # 根据时间格式进行灵活解析
-                                if '.' in time_str:
-                                    time_obj = datetime.strptime(time_str, '%H:%M:%S.%f')
-                                else:
-                                    time_obj = datetime.strptime(time_str, '%H:%M:%S')
-                                
-                                # 检查是否在时间范围内
-                                if earliest_time <= time_obj <= latest_time:
-                                    # 确定日志块的结束
-                                    block_end = i
-                                    for j in range(i+1, min(len(content_lines), i+20)):
-                                        next_line = content_lines[j].strip()
-                                        if re.search(time_pattern, next_line) is not None:
-                                            break
-                                        block_end = j
-                                    
-                                    # 获取完整的日志块
-                                    block_lines = content_lines[i:block_end+1]
-                                    
-                                    # 只为第一行添加前缀，其他行保持原样
-                                    prefixed_block_lines = [f"[{prefix}] {block_lines[0]}"]
-                                    if len(block_lines) > 1:
-                                        prefixed_block_lines.extend(block_lines[1:])
-                                    
-                                    # 生成日志块的唯一标识（使用更严格的标识方式）
-                                    block_text = '\n'.join(prefixed_block_lines)
-                                    block_id = f"{file_name}_{time_str}_{hash(block_text)}"
-                                    
-                                    # 检查此日志块是否已被处理
-                                    if block_id not in displayed_blocks:
-                                        sorted_results.append((time_obj, block_text))
-                                        displayed_blocks.add(block_id)
-                            except ValueError as e:
-                                self.log_message(f"时间解析错误: {str(e)}")
-                                pass
-                        i += 1
-                
-                # 移除关键词匹配结果的单独处理
-                # 按时间排序
-                sorted_results.sort(key=lambda x: x[0])
-                
-                # 提取排序后结果中的最早和最晚时间
-                if sorted_results:
-                    actual_earliest_time = sorted_results[0][0]
-                    actual_latest_time = sorted_results[-1][0]
-                    self.log_message(f"实际日志块时间范围: {actual_earliest_time.strftime('%H:%M:%S.%f')[:-3]} - {actual_latest_time.strftime('%H:%M:%S.%f')[:-3]}")
-                    
-                    # 计算时间差异
-                    if actual_earliest_time > earliest_time:
-                        time_diff = actual_earliest_time - earliest_time
-                        self.log_message(f"注意: 实际最早时间比设定晚 {time_diff.total_seconds():.3f} 秒")
-                    elif actual_earliest_time < earliest_time:
-                        time_diff = earliest_time - actual_earliest_time
-                        self.log_message(f"注意: 实际最早时间比设定早 {time_diff.total_seconds():.3f} 秒")
-                        
-                    if actual_latest_time < latest_time:
-                        time_diff = latest_time - actual_latest_time
-                        self.log_message(f"注意: 实际最晚时间比设定早 {time_diff.total_seconds():.3f} 秒")
-                    elif actual_latest_time > latest_time:
-                        time_diff = actual_latest_time - latest_time
-                        self.log_message(f"注意: 实际最晚时间比设定晚 {time_diff.total_seconds():.3f} 秒")
-                
-                # 只保留排序后的内容
-                final_results = [item[1] for item in sorted_results]
-                
-                # 显示搜索结果
-                self.result_text.setPlainText('\n'.join(final_results))
-                self.log_message(f"搜索完成，找到 {len(final_results)} 个时间范围内的日志块")
-                
-                # 关闭进度对话框
-                progress.close()
-        except Exception as e:
-            self.error.emit(f"搜索关键字时出错: {str(e)}")
-            # 确保在发生错误时也关闭进度对话框
-            progress.close()
+        progress.setWindowTitle("搜索关键字")
+        progress.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        progress.setMinimumDuration(0)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        
+        self.search_worker = KeywordSearchWorker(self.get_ssh_config(), selected_files, query)
+        self.search_worker.progress.connect(functools.partial(self.update_progress_dialog, progress))
+        self.search_worker.blocks.connect(self.add_result_blocks)
+        self.search_worker.error.connect(self.analysis_error)
+        self.search_worker.log_message_signal.connect(self.log_message)
+        self.search_worker.index_stale.connect(self.update_stale_index)
+        self.search_worker.finished.connect(progress.close)
+        progress.canceled.connect(self.search_worker.cancel)
+        self.start_job(self.search_worker)
+    
+    def add_result_blocks(self, blocks):
+        """把一批按时间排序的日志块追加到结果列表"""
+        store = self.result_model.store
+        for time_obj, block_text, (source, member) in blocks:
+            store.add_block(source, member, time_obj, block_text)
+        self.result_model.flush()
     
     def analysis_error(self, error_message):
         """错误处理"""
@@ -2546,15 +3736,14 @@ class MainWindow(QMainWindow):
     def view_full_log(self):
         """查看完整日志"""
         # 获取选中的日志文件
-        selected_rows = self.log_list.selectionModel().selectedRows()
+        selected_rows = self.selected_log_files()
         if not selected_rows:
             QMessageBox.warning(self, "警告", "请先选择要查看完整日志的日志文件")
             return
         
         # 获取选中文件的路径和文件名
         selected_files = []
-        for row in selected_rows:
-            file_path = self.log_list.item(row.row(), 0).data(Qt.ItemDataRole.UserRole)
+        for _, file_path in selected_rows:
             if file_path:
                 selected_files.append(file_path)
         
@@ -2576,126 +3765,372 @@ class MainWindow(QMainWindow):
                     break
                 
                 # 获取完整日志
-                self.log_message(f"正在获取完整日志: {file_path}")
-                self.analysis_worker = LogAnalysisWorker(self.config, mode='full', log_path=file_path)
-                self.analysis_worker.complete_log.connect(self.display_full_log)
-                self.analysis_worker.error.connect(self.analysis_error)
-                self.analysis_worker.log_message_signal.connect(self.log_message)
-                self.analysis_worker.start()
+                self.start_full_log_worker(file_path)
+            progress.setValue(len(selected_files))
         except Exception as e:
-            self.error.emit(f"获取完整日志时出错: {str(e)}")
+            self.analysis_error(f"获取完整日志时出错: {str(e)}")
     
-    def display_full_log(self, full_log):
-        """显示完整日志"""
-        self.complete_log.emit(full_log)
+    def start_full_log_worker(self, file_path, member=None, jump=None):
+        """
+        在后台获取完整日志，完成后在查看窗口中显示
+        Args:
+            file_path: 日志文件路径（本地或远程）
+            member: 只查看zip包中的这个成员
+            jump: 打开后跳转的位置 (行号或None, 时间秒数或None)
+        """
+        self.log_message(f"正在获取完整日志: {file_path}")
+        worker = LogAnalysisWorker(self.get_ssh_config(), mode='full', log_path=file_path)
+        if member:
+            worker.member_names = [member]
+        worker.log_view.connect(
+            functools.partial(self.display_full_log, os.path.basename(file_path), jump))
+        worker.error.connect(self.analysis_error)
+        worker.log_message_signal.connect(self.log_message)
+        self.start_job(worker)
     
-    def export_results(self):
-        """导出搜索结果"""
-        # 获取搜索结果
+    def open_result(self, index):
+        """双击搜索结果时在日志查看窗口中打开对应位置"""
+        target = self.result_model.store.target(index.row())
+        if target is None:
+            return
+        file_path, member, line_num, seconds = target
+        self.start_full_log_worker(file_path, member, (line_num, seconds))
+    
+    def search_fleet(self):
+        """
+        在选中的多台主机上并发搜索关键字
+        每台主机各自确定时间范围并提取日志块，完成后立即归并到结果列表，日志块以 [主机][前缀] 开头
+        """
         keyword = self.keyword_input.text().strip()
         if not keyword:
             QMessageBox.warning(self, "警告", "请输入要搜索的关键字")
             return
+        try:
+            query = LogQuery.parse(keyword)
+        except QueryError as e:
+            QMessageBox.warning(self, "警告", f"查询语句有误：{str(e)}")
+            return
+        if not self.hosts_data:
+            QMessageBox.warning(self, "警告", "主机列表为空，请先添加主机")
+            return
+        if self.fleet_search_worker is not None and self.fleet_search_worker.isRunning():
+            QMessageBox.warning(self, "警告", "多主机搜索正在进行，请先停止")
+            return
         
-        # 获取选中的日志文件
-        selected_rows = self.log_list.selectionModel().selectedRows()
-        if not selected_rows:
-            QMessageBox.warning(self, "警告", "请先选择要导出搜索结果的日志文件")
+        dialog = HostSelectDialog(self, self.hosts_data, self.host_states, self.live_host_indexes)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        selected = set(dialog.selected_indexes())
+        if not selected:
+            return
+        # 搜索前重新探测选中的主机，离线的主机不搜索
+        hosts = [(i, self.hosts_data[i]) for i in sorted(selected)]
+        
+        # 日志列表中选中的文件决定每台主机上搜索的文件类别，没有选中时搜索日期范围内的全部文件
+        selected_files = self.selected_log_files()
+        patterns = {file_pattern(name) for name, _ in selected_files} if selected_files else None
+        
+        self.result_model.clear()
+        self.result_delegate.query = query
+        self.fleet_timeline.clear()
+        self.log_message(f"开始在 {len(hosts)} 台主机上搜索关键字: {keyword}")
+        self.fleet_search_worker = FleetSearchWorker(
+            hosts, query,
+            self.analysis_start_date.date().toPyDate(),
+            self.analysis_end_date.date().toPyDate(),
+            patterns)
+        self.fleet_search_worker.host_status.connect(self.show_host_status)
+        self.fleet_search_worker.host_finished.connect(self.show_fleet_host_result)
+        self.fleet_search_worker.finished_search.connect(self.fleet_search_finished)
+        self.fleet_search_worker.log_message_signal.connect(self.log_message)
+        self.start_job(self.fleet_search_worker)
+    
+    def show_fleet_host_result(self, host_index, result, error):
+        """
+        一台主机搜索完成，把它的日志块归并到结果列表
+        新日志块都晚于已显示的结果时直接追加，否则按全局时间线重新显示
+        """
+        name = self.hosts_data[host_index].get("name", f"未命名主机{host_index+1}") \
+            if host_index < len(self.hosts_data) else str(host_index)
+        if result is None:
+            self.log_message(f"主机 {name} 搜索失败: {error}")
             return
+        blocks = result['blocks']
+        if result['earliest'] is not None:
+            self.log_message(f"主机 {name}: 时间范围 {result['earliest'].strftime('%H:%M:%S.%f')[:-3]} - "
+                             f"{result['latest'].strftime('%H:%M:%S.%f')[:-3]}，{len(blocks)} 个日志块")
+        else:
+            self.log_message(f"主机 {name}: 没有找到匹配的日志")
         
-        # 获取选中文件的路径和文件名
-        selected_files = []
-        for row in selected_rows:
-            file_path = self.log_list.item(row.row(), 0).data(Qt.ItemDataRole.UserRole)
-            if file_path:
-                selected_files.append(file_path)
+        store = self.result_model.store
+        if self.fleet_timeline.add(blocks):
+            new_blocks = blocks
+        else:
+            self.result_model.clear()
+            new_blocks = self.fleet_timeline
+        for time_obj, block_text, (source, member) in new_blocks:
+            store.add_block(source, member, time_obj, block_text)
+        self.result_model.flush()
+    
+    def fleet_search_finished(self, host_count):
+        """多主机搜索结束"""
+        self.log_message(f"多主机搜索完成: {host_count} 台主机，共 {len(self.fleet_timeline)} 个日志块")
+    
+    def stop_search(self):
+        """停止正在进行的关键字搜索和多主机搜索"""
+        if self.search_worker is not None and self.cancel_jobs([self.search_worker]):
+            self.log_message("正在停止搜索...")
+        worker = self.fleet_search_worker
+        if worker is not None and self.cancel_jobs([worker]):
+            self.log_message("正在停止多主机搜索...")
+    
+    def copy_results(self):
+        """复制选中的搜索结果"""
+        rows = sorted(index.row() for index in self.result_view.selectionModel().selectedRows())
+        store = self.result_model.store
+        QApplication.clipboard().setText('\n'.join(store.text(row) for row in rows))
+    
+    def ssh_settings(self):
+        """获取当前界面上的SSH连接参数（包括传输配置）"""
+        return {
+            'host': self.host_input.text(),
+            'port': self.port_input.value(),
+            'username': self.username_input.text(),
+            'password': self.password_input.text(),
+            'transport': self.transport_combo.currentData()
+        }
+    
+    def calibrate_transport(self):
+        """测量当前主机上每种传输配置的速度，选用最快的配置"""
+        config = self.get_ssh_config()
+        if not config['ssh']['host'] or not config['ssh']['username'] or not config['ssh']['password']:
+            QMessageBox.warning(self, "配置不完整", "请填写SSH连接信息")
+            return
+        if not config['log_paths']:
+            QMessageBox.warning(self, "配置不完整", "请添加至少一个日志路径，用于选择测速的日志文件")
+            return
+        self.log_message(f"开始测量 {config['ssh']['host']} 的传输速度...")
+        worker = TransportCalibrationWorker(config)
+        worker.log_message_signal.connect(self.log_message)
+        worker.result.connect(functools.partial(self.apply_calibration, self.host_combo.currentData()))
+        worker.error.connect(self.analysis_error)
+        self.start_job(worker)
+    
+    def apply_calibration(self, host_index, best, results):
+        """
+        应用校准结果：选中最快的配置，并保存到主机列表（hosts.yaml）
+        Args:
+            host_index: 校准开始时选中的主机索引，没有选中主机时为None
+            best: 最快的配置名称
+            results: 每种配置的吞吐量
+        """
+        self.log_message(f"最快的传输配置: {best}")
+        set_transport_combo(self.transport_combo, best)
+        if host_index is not None and host_index < len(self.hosts_data):
+            store_calibration(self.hosts_data[host_index], best, results)
+            self.save_hosts_data()
+    
+    def get_ssh_config(self):
+        """获取当前界面上的SSH连接配置"""
+        return {
+            'ssh': self.ssh_settings(),
+            'log_paths': [self.path_list.item(i).text()
+                          for i in range(self.path_list.count())]
+        }
+    
+    def follow_logs(self):
+        """
+        实时跟踪选中的远程日志（类似 tail -f），关键字输入框中有查询时只显示满足查询的行
+        """
+        remote_files = [(name, path) for name, path in self.selected_log_files()
+                        if path and not os.path.exists(path) and not path.lower().endswith('.zip')]
+        if not remote_files:
+            QMessageBox.warning(self, "警告", "请先选择要跟踪的远程日志文件（不支持压缩包和本地文件）")
+            return
+        query = None
+        keyword = self.keyword_input.text().strip()
+        if keyword:
+            try:
+                query = LogQuery.parse(keyword)
+            except QueryError as e:
+                QMessageBox.warning(self, "警告", f"查询语句有误：{str(e)}")
+                return
         
+        worker = LogFollowWorker(self.get_ssh_config(), [path for _, path in remote_files], query)
+        worker.log_message_signal.connect(self.log_message)
+        worker.error.connect(self.log_message)
+        title = ', '.join(name for name, _ in remote_files)
+        dialog = LogFollowDialog(worker, title, self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+        self.log_message(f"开始实时跟踪: {title}" + (f"（筛选: {keyword}）" if keyword else ""))
+        self.start_job(worker)
+    
+    def show_histogram(self):
+        """
+        按分钟统计选中日志的行数（按级别、来源和查询匹配），关键字输入框中有查询时同时统计匹配行
+        """
+        selected_files = [(name, path) for name, path in self.selected_log_files() if path]
         if not selected_files:
-            QMessageBox.warning(self, "警告", "没有选中任何日志文件")
+            QMessageBox.warning(self, "警告", "请先选择要统计的日志文件")
             return
-        
-        # 创建进度对话框
-        progress = QProgressDialog("正在导出搜索结果...", "取消", 0, len(selected_files), self)
-        progress.setWindowModality(Qt.WindowModality.WindowModal)
-        progress.show()
-        
-        # 开始导出搜索结果
-        try:
-            for i, file_path in enumerate(selected_files):
-                # 更新进度
-                progress.setValue(i)
-                if progress.wasCanceled():
-                    break
-                
-                # 导出搜索结果
-                self.log_message(f"正在导出搜索结果: {file_path}")
-                self.analysis_worker = LogAnalysisWorker(self.config, mode='search', log_path=file_path, keyword=keyword)
-                self.analysis_worker.search_result.connect(self.append_search_result)
-                self.analysis_worker.error.connect(self.analysis_error)
-                self.analysis_worker.log_message_signal.connect(self.log_message)
-                self.analysis_worker.start()
-        except Exception as e:
-            self.error.emit(f"导出搜索结果时出错: {str(e)}")
+        query = None
+        keyword = self.keyword_input.text().strip()
+        if keyword:
+            try:
+                query = LogQuery.parse(keyword)
+            except QueryError as e:
+                QMessageBox.warning(self, "警告", f"查询语句有误：{str(e)}")
+                return
+        for _, path in selected_files:
+            if not os.path.exists(path):
+                access_history.record(path)
+        
+        self.log_message(f"正在统计 {len(selected_files)} 个日志文件...")
+        title = ', '.join(name for name, _ in selected_files)
+        worker = HistogramWorker(self.get_ssh_config(), selected_files, query)
+        worker.result.connect(functools.partial(self.display_histogram, title))
+        worker.error.connect(self.analysis_error)
+        worker.log_message_signal.connect(self.log_message)
+        self.start_job(worker)
+    
+    def display_histogram(self, title, result):
+        """显示分钟统计窗口"""
+        histogram, sources = result
+        dialog = HistogramDialog(histogram, title, self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.window_requested.connect(functools.partial(self.extract_histogram_window, sources))
+        dialog.show()
+    
+    def extract_histogram_window(self, sources, first_minute, last_minute):
+        """
+        提取分钟统计中被点击的时间段的日志块，显示在搜索结果中
+        Args:
+            sources: [(本地文件路径, 默认前缀), ...]
+            first_minute: 第一分钟
+            last_minute: 最后一分钟（包含）
+        """
+        earliest_time, latest_time = minute_time_range(first_minute, last_minute)
+        label = f"{first_minute // 60:02d}:{first_minute % 60:02d} - {last_minute // 60:02d}:{last_minute % 60:02d}"
+        self.log_message(f"提取时间范围 {label} 的日志")
+        worker = WindowExtractWorker(sources, earliest_time, latest_time)
+        worker.result.connect(functools.partial(self.display_window_blocks, label))
+        worker.error.connect(self.analysis_error)
+        self.start_job(worker)
+    
+    def display_window_blocks(self, label, blocks):
+        """在搜索结果中显示一个时间范围内的日志块"""
+        self.result_model.clear()
+        self.result_delegate.query = None
+        store = self.result_model.store
+        store.add_header(f"时间范围: {label}")
+        for time_obj, block_text, (source, member) in blocks:
+            store.add_block(source, member, time_obj, block_text)
+        self.result_model.flush()
+        self.log_message(f"时间范围 {label}: {len(blocks)} 个日志块")
     
-    def append_search_result(self, keyword, results):
-        """添加搜索结果"""
-        self.result_text.append(f"\n\n===== 搜索关键字: {keyword} =====\n\n")
-        for result in results:
-            self.result_text.append(f"{result['file']}:{result['line_num']}: {result['content']}\n")
-        self.log_message(f"搜索结果已添加到结果区域")
+    def show_templates(self):
+        """提取选中日志的模板，先看今天有哪些少见或新出现的日志"""
+        selected_files = [(name, path) for name, path in self.selected_log_files() if path]
+        if not selected_files:
+            QMessageBox.warning(self, "警告", "请先选择要统计模板的日志文件")
+            return
+        for _, path in selected_files:
+            if not os.path.exists(path):
+                access_history.record(path)
+        
+        self.log_message(f"正在提取 {len(selected_files)} 个日志文件的模板...")
+        title = ', '.join(name for name, _ in selected_files)
+        worker = TemplateWorker(self.get_ssh_config(), selected_files)
+        worker.result.connect(functools.partial(self.display_templates, title))
+        worker.error.connect(self.analysis_error)
+        worker.log_message_signal.connect(self.log_message)
+        self.start_job(worker)
+    
+    def display_templates(self, title, results):
+        """显示模板统计窗口"""
+        if not results:
+            self.log_message("没有可以统计模板的日志")
+            return
+        dialog = TemplateDialog(results, title, self)
+        dialog.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        dialog.show()
+    
+    def display_full_log(self, title, jump, views):
+        """在虚拟化的查看窗口中显示完整日志"""
+        viewer = LogViewerDialog(views, title, self)
+        viewer.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        viewer.show()
+        if jump:
+            viewer.jump_to(*jump)
+    
+    def export_results(self):
+        """把选中日志中满足查询的行导出到文件（不经过结果显示区域）"""
+        self.start_export('hits', "导出搜索结果")
     
     def export_time_range_logs(self):
-        """导出时间范围日志"""
-        # 获取时间范围设置
-        start_date = self.analysis_start_date.date().toString('yyyy-MM-dd')
-        end_date = self.analysis_end_date.date().toString('yyyy-MM-dd')
-        
-        # 获取选中的日志文件
-        selected_rows = self.log_list.selectionModel().selectedRows()
-        if not selected_rows:
-            QMessageBox.warning(self, "警告", "请先选择要导出时间范围日志的日志文件")
+        """把选中日志在关键字时间范围内的日志块按时间归并后导出到文件"""
+        self.start_export('window', "导出时间范围日志")
+    
+    def start_export(self, mode, title):
+        """
+        选择导出文件并在后台导出
+        Args:
+            mode: 'hits' 或 'window'（见 ExportWorker）
+            title: 对话框标题
+        """
+        keyword = self.keyword_input.text().strip()
+        if not keyword:
+            QMessageBox.warning(self, "警告", "请输入要搜索的关键字")
             return
-        
-        # 获取选中文件的路径和文件名
-        selected_files = []
-        for row in selected_rows:
-            file_path = self.log_list.item(row.row(), 0).data(Qt.ItemDataRole.UserRole)
-            if file_path:
-                selected_files.append(file_path)
-        
+        try:
+            query = LogQuery.parse(keyword)
+        except QueryError as e:
+            QMessageBox.warning(self, "警告", f"查询语句有误：{str(e)}")
+            return
+        selected_files = [(name, path) for name, path in self.selected_log_files() if path]
         if not selected_files:
-            QMessageBox.warning(self, "警告", "没有选中任何日志文件")
+            QMessageBox.warning(self, "警告", "请先选择要导出的日志文件")
             return
         
-        # 创建进度对话框
-        progress = QProgressDialog("正在导出时间范围日志...", "取消", 0, len(selected_files), self)
-        progress.setWindowModality(Qt.WindowModality.WindowModal)
-        progress.show()
-        
-        # 开始导出时间范围日志
-        try:
-            for i, file_path in enumerate(selected_files):
-                # 更新进度
-                progress.setValue(i)
-                if progress.wasCanceled():
-                    break
-                
-                # 导出时间范围日志
-                self.log_message(f"正在导出时间范围日志: {file_path}")
-                self.analysis_worker = LogAnalysisWorker(self.config, mode='list', log_path=file_path)
-                self.analysis_worker.log_list.connect(self.append_time_range_log)
-                self.analysis_worker.error.connect(self.analysis_error)
-                self.analysis_worker.log_message_signal.connect(self.log_message)
-                self.analysis_worker.start()
-        except Exception as e:
-            self.error.emit(f"导出时间范围日志时出错: {str(e)}")
-    
-    def append_time_range_log(self, logs):
-        """添加时间范围日志"""
-        self.result_text.append(f"\n\n===== 时间范围日志: {self.analysis_start_date.date().toString('yyyy-MM-dd')} - {self.analysis_end_date.date().toString('yyyy-MM-dd')} =====\n\n")
-        for log in logs:
-            self.result_text.append(f"{log['name']}:{log['date']}: {log['size']}\n")
-        self.log_message(f"时间范围日志已添加到结果区域")
+        default_name = "search_results.txt" if mode == 'hits' else "time_range_logs.txt"
+        output_path, _ = QFileDialog.getSaveFileName(
+            self, title, default_name,
+            "文本文件 (*.txt);;JSON Lines (*.jsonl);;gzip 压缩文本 (*.txt.gz);;gzip 压缩 JSON Lines (*.jsonl.gz)")
+        if not output_path:
+            return
+        for _, path in selected_files:
+            if not os.path.exists(path):
+                access_history.record(path)
+        
+        # 进度对话框不阻塞主窗口，取消时停止导出并删除不完整的文件
+        progress = QProgressDialog(f"正在{title}...", "取消", 0, len(selected_files), self)
+        progress.setWindowTitle(title)
+        progress.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        progress.setMinimumDuration(0)
+        # 获取文件、确定时间范围和写出分阶段报告进度，某个阶段完成时不能自动关闭
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        
+        self.log_message(f"正在{title}到 {output_path}")
+        worker = ExportWorker(self.get_ssh_config(), selected_files, query, output_path, mode)
+        worker.progress.connect(functools.partial(self.update_progress_dialog, progress))
+        worker.exported.connect(self.export_finished)
+        worker.error.connect(self.analysis_error)
+        worker.log_message_signal.connect(self.log_message)
+        worker.finished.connect(progress.close)
+        progress.canceled.connect(worker.cancel)
+        self.start_job(worker)
+    
+    def update_progress_dialog(self, progress, done, total, text):
+        """更新搜索或导出的进度对话框"""
+        progress.setMaximum(max(total, 1))
+        progress.setValue(min(done, total))
+        progress.setLabelText(text)
+    
+    def export_finished(self, output_path, records):
+        """导出完成"""
+        self.log_message(f"已导出 {records} 条记录到 {output_path}")
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+结果导出模块
+功能：把搜索结果和时间范围内的日志块以流的方式直接写入文件，不经过结果显示区域，
+内存占用与结果数量无关，可以导出数GB的结果
+支持：
+1. 导出格式由文件名决定：.txt 文本、.jsonl 每行一条JSON记录，再加 .gz 时以gzip压缩写入
+2. 搜索结果按文件逐行扫描，满足查询的行立即写出
+3. 时间范围日志先单遍扫描确定关键字的时间范围，再把所有文件（zip包按成员）的日志块按时间归并写出
+4. 先写入临时文件，完成后再改名，取消或出错时不留下不完整的导出文件
+"""
+
+import os
+import gzip
+import json
+from datetime import timedelta
+from log_search import (log_prefix, log_source_members, iter_member_lines,
+                        iter_stream_time_window_blocks, merge_timelines, tag_stream,
+                        match_log_time, merge_time_range)
+
+# 导出格式
+EXPORT_TEXT = 'txt'
+EXPORT_JSONL = 'jsonl'
+# 每写出多少条记录报告一次进度
+EXPORT_PROGRESS_RECORDS = 5000
+# 每读取多少行检查一次是否取消（匹配很少时也能及时取消）
+CANCEL_CHECK_LINES = 20000
+# 只找到一个时间点时，时间范围向前后各扩展的时间（与界面搜索一致）
+SINGLE_TIME_PADDING = timedelta(minutes=5)
+
+
+def export_format(path):
+    """
+    根据文件名确定导出格式
+    Returns:
+        tuple: (EXPORT_TEXT 或 EXPORT_JSONL, 是否gzip压缩)
+    """
+    name = path.lower()
+    compressed = name.endswith('.gz')
+    if compressed:
+        name = name[:-3]
+    return (EXPORT_JSONL if name.endswith('.jsonl') else EXPORT_TEXT), compressed
+
+
+def _format_time(time_obj):
+    return time_obj.strftime('%H:%M:%S.%f')[:-3]
+
+
+class ExportWriter:
+    """
+    导出文件写入器
+    用法：with ExportWriter(path) as writer: writer.write_hit(...)；
+    正常结束时临时文件改名为目标文件，出现异常（包括取消）时删除临时文件
+    """
+    def __init__(self, path):
+        """
+        Args:
+            path: 导出文件路径，扩展名决定格式（见 export_format）
+        """
+        self.path = path
+        self.format, self.compressed = export_format(path)
+        self.tmp_path = path + '.part'
+        self.records = 0
+        self._file = None
+
+    def __enter__(self):
+        if self.compressed:
+            self._file = gzip.open(self.tmp_path, 'wt', encoding='utf-8', newline='\n')
+        else:
+            self._file = open(self.tmp_path, 'w', encoding='utf-8', newline='\n')
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._file.close()
+        self._file = None
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        else:
+            try:
+                os.remove(self.tmp_path)
+            except OSError:
+                pass
+        return False
+
+    def write_header(self, text):
+        """写入标题行（JSONL格式不写标题）"""
+        if self.format == EXPORT_TEXT:
+            self._file.write(text + '\n')
+
+    def write_hit(self, label, member, line_num, line, terms=None):
+        """
+        写入一个匹配行
+        Args:
+            label: 显示的文件名
+            member: zip成员名，普通文件为None
+            line_num: 行号（从1开始）
+            line: 行内容
+            terms: 需要显示的命中词条列表
+        """
+        if self.format == EXPORT_JSONL:
+            record = {'file': label, 'member': member, 'line_num': line_num,
+                      'terms': list(terms or []), 'line': line}
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            terms_text = f"[{', '.join(terms)}] " if terms else ''
+            self._file.write(f"{label}:{line_num}: {terms_text}{line}\n")
+        self.records += 1
+
+    def write_block(self, time_obj, block_text, source=None, member=None):
+        """
+        写入一个日志块
+        Args:
+            time_obj: 日志块的时间
+            block_text: 日志块文本
+            source: 来源文件名
+            member: zip成员名，普通文件为None
+        """
+        if self.format == EXPORT_JSONL:
+            record = {'time': _format_time(time_obj), 'file': source, 'member': member,
+                      'text': block_text}
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        else:
+            self._file.write(block_text + '\n')
+        self.records += 1
+
+
+def _iter_sources(files):
+    """
+    展开要导出的文件
+    Args:
+        files: [(文件名, 本地文件路径), ...]
+    Yields:
+        tuple: (本地文件路径, zip成员名, 显示名称, 前缀)
+    """
+    for file_name, local_path in files:
+        prefix = log_prefix(file_name)
+        for member in log_source_members(local_path):
+            if member is None:
+                yield local_path, None, file_name, prefix
+            else:
+                name = os.path.basename(member)
+                yield local_path, member, name, log_prefix(name, prefix)
+
+
+def _checked_lines(local_path, member, cancel_token):
+    """逐行读取一个来源，每读取 CANCEL_CHECK_LINES 行检查一次是否取消"""
+    for count, line in enumerate(iter_member_lines(local_path, member), 1):
+        if cancel_token is not None and count % CANCEL_CHECK_LINES == 0:
+            cancel_token.check()
+        yield line
+
+
+def export_hits(writer, files, query, cancel_token=None, progress_callback=None):
+    """
+    逐行扫描所有文件，把满足查询的行写入导出文件
+    Args:
+        writer: ExportWriter 对象
+        files: [(文件名, 本地文件路径), ...]
+        query: LogQuery 查询对象
+        cancel_token: 取消标记
+        progress_callback: 进度回调函数，参数为 (已完成的来源数, 来源总数, 已写出的记录数)
+    Returns:
+        int: 写出的匹配行数
+    """
+    sources = list(_iter_sources(files))
+    show_terms = len(query.terms) > 1
+    count = 0
+    for done, (local_path, member, label, _) in enumerate(sources):
+        if progress_callback:
+            progress_callback(done, len(sources), writer.records)
+        for line_num, line in enumerate(_checked_lines(local_path, member, cancel_token), 1):
+            terms = query.match_terms(line)
+            if terms is None or not line:
+                continue
+            writer.write_hit(label, member, line_num, line, terms if show_terms else None)
+            count += 1
+            if progress_callback and count % EXPORT_PROGRESS_RECORDS == 0:
+                progress_callback(done, len(sources), writer.records)
+        if cancel_token is not None:
+            cancel_token.check()
+    if progress_callback:
+        progress_callback(len(sources), len(sources), writer.records)
+    return count
+
+
+def keyword_window(files, query, cancel_token=None, progress_callback=None):
+    """
+    单遍扫描所有文件，确定满足查询的行的时间范围（不保存匹配行）
+    只找到一个时间点时向前后各扩展 SINGLE_TIME_PADDING
+    Args:
+        files: [(文件名, 本地文件路径), ...]
+        query: LogQuery 查询对象
+        cancel_token: 取消标记
+        progress_callback: 进度回调函数，参数为 (已完成的来源数, 来源总数)
+    Returns:
+        tuple: (时间范围开始, 时间范围结束)，没有带时间戳的匹配行时返回 (None, None)
+    """
+    sources = list(_iter_sources(files))
+    earliest_time = None
+    latest_time = None
+    for done, (local_path, member, _, _) in enumerate(sources):
+        if progress_callback:
+            progress_callback(done, len(sources))
+        if cancel_token is not None:
+            cancel_token.check()
+        for line in _checked_lines(local_path, member, cancel_token):
+            if not line or query.match_terms(line) is None:
+                continue
+            _, time_obj = match_log_time(line)
+            if time_obj is not None:
+                earliest_time, latest_time = merge_time_range(
+                    earliest_time, latest_time, time_obj, time_obj)
+    if progress_callback:
+        progress_callback(len(sources), len(sources))
+    if earliest_time is not None and earliest_time == latest_time:
+        earliest_time -= SINGLE_TIME_PADDING
+        latest_time += SINGLE_TIME_PADDING
+    return earliest_time, latest_time
+
+
+def export_window_blocks(writer, files, earliest_time, latest_time, cancel_token=None,
+                         progress_callback=None):
+    """
+    把所有文件时间范围内的日志块按时间归并后写入导出文件
+    每个来源同时只在内存中保留一个日志块
+    Args:
+        writer: ExportWriter 对象
+        files: [(文件名, 本地文件路径), ...]
+        earliest_time: 时间范围开始
+        latest_time: 时间范围结束
+        cancel_token: 取消标记
+        progress_callback: 进度回调函数，参数为 (已读完的来源数, 来源总数, 已写出的记录数)
+    Returns:
+        int: 写出的日志块数
+    """
+    sources = list(_iter_sources(files))
+    finished = [0]
+
+    def counted(stream):
+        # 来源读完时计数，用于报告进度
+        yield from stream
+        finished[0] += 1
+
+    streams = [counted(tag_stream(iter_stream_time_window_blocks(
+        _checked_lines(local_path, member, cancel_token), prefix, earliest_time, latest_time),
+        (label, member)))
+        for local_path, member, label, prefix in sources]
+    writer.write_header(f"===== 时间范围日志: {_format_time(earliest_time)} - {_format_time(latest_time)} =====")
+    count = 0
+    for time_obj, block_text, (label, member) in merge_timelines(streams):
+        writer.write_block(time_obj, block_text, label, member)
+        count += 1
+        if progress_callback and count % EXPORT_PROGRESS_RECORDS == 0:
+            progress_callback(finished[0], len(sources), writer.records)
+    if cancel_token is not None:
+        cancel_token.check()
+    if progress_callback:
+        progress_callback(len(sources), len(sources), writer.records)
+    return count
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+车道主机预检模块
+功能：在批量收集或搜索之前，并发探测 hosts.yaml 中的所有主机，跳过关机或不可达的车道
+支持：
+1. 每台主机只建立一次TCP连接并读取SSH版本标识，使用较短的超时
+2. 测量TCP连接时间（RTT）和SSH标识返回时间，将主机分为 在线/较慢/离线
+3. 只把在线主机按预计开销排序后交给后续的收集或搜索
+"""
+
+import time
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+# 主机状态
+HOST_UP = 'up'
+HOST_SLOW = 'slow'
+HOST_DOWN = 'down'
+
+# 探测的TCP连接超时（秒）
+PROBE_TCP_TIMEOUT = 2.0
+# 探测时等待SSH版本标识的超时（秒）
+PROBE_BANNER_TIMEOUT = 3.0
+# SSH标识返回时间超过该值（秒）的主机视为较慢
+SLOW_THRESHOLD = 0.5
+# 同时探测的主机数量上限
+PROBE_MAX_WORKERS = 64
+
+
+def probe_host(host, port=22, tcp_timeout=PROBE_TCP_TIMEOUT, banner_timeout=PROBE_BANNER_TIMEOUT,
+               slow_threshold=SLOW_THRESHOLD):
+    """
+    探测一台主机的SSH服务
+    Args:
+        host: 主机地址
+        port: SSH端口
+        tcp_timeout: TCP连接超时（秒）
+        banner_timeout: 等待SSH版本标识的超时（秒）
+        slow_threshold: 判断为较慢的SSH标识返回时间（秒）
+    Returns:
+        dict: {'state': 状态, 'rtt': TCP连接时间, 'banner_time': SSH标识返回时间, 'banner': 标识, 'error': 错误}
+    """
+    result = {'state': HOST_DOWN, 'rtt': None, 'banner_time': None, 'banner': '', 'error': ''}
+    started = time.perf_counter()
+    try:
+        with socket.create_connection((host, port), timeout=tcp_timeout) as sock:
+            result['rtt'] = time.perf_counter() - started
+            # SSH服务端连接后立即发送版本标识，例如 SSH-2.0-OpenSSH_7.4
+            sock.settimeout(banner_timeout)
+            data = b''
+            while b'\n' not in data and len(data) < 1024:
+                chunk = sock.recv(256)
+                if not chunk:
+                    break
+                data += chunk
+            result['banner_time'] = time.perf_counter() - started
+    except (OSError, socket.timeout) as e:
+        result['error'] = str(e) or e.__class__.__name__
+        return result
+
+    banner = data.split(b'\n', 1)[0].decode('ascii', errors='replace').strip()
+    result['banner'] = banner
+    if not banner.startswith('SSH-'):
+        result['error'] = "没有返回SSH版本标识"
+        return result
+    result['state'] = HOST_SLOW if result['banner_time'] > slow_threshold else HOST_UP
+    return result
+
+
+def scan_fleet(hosts_data, max_workers=PROBE_MAX_WORKERS, on_result=None, **probe_options):
+    """
+    并发探测所有主机
+    Args:
+        hosts_data: 主机配置列表（hosts.yaml 的内容）
+        max_workers: 同时探测的主机数量上限
+        on_result: 每台主机探测完成时的回调函数，参数为 (主机配置, 探测结果)，在探测线程中调用
+        probe_options: 传给 probe_host 的超时参数
+    Returns:
+        list: [(主机配置, 探测结果), ...]，顺序与 hosts_data 相同
+    """
+    def probe(host_data):
+        ssh = host_data.get('ssh', {})
+        if not ssh.get('host'):
+            status = {'state': HOST_DOWN, 'rtt': None, 'banner_time': None, 'banner': '',
+                      'error': "没有配置主机地址"}
+        else:
+            status = probe_host(ssh['host'], ssh.get('port', 22), **probe_options)
+        if on_result:
+            on_result(host_data, status)
+        return status
+
+    if not hosts_data:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(hosts_data))) as executor:
+        statuses = list(executor.map(probe, hosts_data))
+    return list(zip(hosts_data, statuses))
+
+
+def expected_cost(host_data, status):
+    """
+    估计从一台主机获取日志的开销，用于排序（越小越先处理）
+    SSH标识返回时间反映网络延迟和主机负载；有测速结果时，传输越快的主机开销越小
+    """
+    cost = status['banner_time'] if status['banner_time'] is not None else float('inf')
+    speeds = [speed for speed in
+              (host_data.get('transport_benchmark') or {}).get('mb_per_second', {}).values() if speed]
+    if speeds:
+        # 以传输 1MB 所需的时间计入开销
+        cost += 1.0 / max(speeds)
+    return cost
+
+
+def live_hosts(scan_results, include_slow=True):
+    """
+    从探测结果中选出在线的主机，按预计开销从小到大排序
+    Args:
+        scan_results: scan_fleet 的返回值
+        include_slow: 是否包括较慢的主机（排在在线主机之后）
+    Returns:
+        list: 主机配置列表
+    """
+    states = (HOST_UP, HOST_SLOW) if include_slow else (HOST_UP,)
+    live = [(host_data, status) for host_data, status in scan_results if status['state'] in states]
+    live.sort(key=lambda item: (item[1]['state'] != HOST_UP, expected_cost(*item)))
+    return [host_data for host_data, _ in live]
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+多主机搜索模块
+功能：同一个查询并发发送到选中的多台车道主机，每台主机各自确定关键字的时间范围并提取日志块，
+再把所有主机的日志块归并为一条时间线，日志块以 [主机][前缀] 标识来源
+支持：
+1. 每台主机使用独立的SSH连接，同时搜索的主机数量有上限
+2. 每台主机与单主机搜索相同的两阶段流程：普通日志在车道主机上统计和提取，
+   压缩包和复杂查询先获取到本地缓存再搜索
+3. 每台主机完成后立即回调，界面可以边搜索边显示已完成主机的结果
+"""
+
+import os
+import stat
+import zipfile
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from log_collector import LogCollector
+from log_cancel import OperationCancelled
+from log_cache import shared_cache
+from log_index import forget_indexed_file
+from log_prefetch import file_pattern
+from log_search import (iter_time_window_blocks, merge_timelines, tag_stream, parse_log_time,
+                        seconds_of_day, decode_log_lines, read_log_lines, zip_log_members,
+                        keyword_time_range, merge_time_range, log_prefix)
+
+# 同时搜索的主机数量上限（每台主机可能需要下载和解码整个日志文件）
+FLEET_SEARCH_MAX_WORKERS = 4
+# 只找到一个时间点时，时间范围向前后各扩展的时间
+SINGLE_TIME_PADDING = timedelta(minutes=5)
+
+
+def host_label(host_data):
+    """主机的显示名称：配置的名称，没有时使用主机地址"""
+    return host_data.get('name') or host_data.get('ssh', {}).get('host', '')
+
+
+def list_host_logs(collector, log_paths, start_date, end_date, patterns=None):
+    """
+    通过SFTP递归列出主机上日期范围内的日志文件
+    Args:
+        collector: 已连接的 LogCollector 对象
+        log_paths: 日志目录列表
+        start_date: 开始日期
+        end_date: 结束日期
+        patterns: 只保留这些类别的文件（见 log_prefetch.file_pattern），None表示不限制
+    Returns:
+        list: [(远程路径, 文件名), ...]
+    """
+    files = []
+    pending = list(log_paths)
+    while pending:
+        collector.check_cancelled()
+        directory = pending.pop()
+        try:
+            entries = collector.sftp.listdir_attr(directory)
+        except (IOError, OSError):
+            collector.check_cancelled()
+            continue
+        separator = '\\' if '\\' in directory else '/'
+        for entry in entries:
+            path = directory.rstrip(separator) + separator + entry.filename
+            if entry.st_mode is not None and stat.S_ISDIR(entry.st_mode):
+                pending.append(path)
+                continue
+            if not collector.is_supported_file(entry.filename):
+                continue
+            if patterns is not None and file_pattern(entry.filename) not in patterns:
+                continue
+            # 传入完整路径，文件名中没有日期时可以按修改时间判断
+            if collector.is_log_in_date_range(path, start_date, end_date):
+                files.append((path, entry.filename))
+    return files
+
+
+def _host_blocks(stream, host_name):
+    """为日志块的第一行加上主机标识，得到 [主机][前缀] 开头的文本"""
+    for time_obj, block_text in stream:
+        yield time_obj, f"[{host_name}]{block_text}"
+
+
+def search_host(host_data, query, start_date, end_date, patterns=None, cancel_token=None,
+                log_callback=None):
+    """
+    在一台主机上搜索关键字，并提取该主机关键字时间范围内的日志块
+    Args:
+        host_data: 主机配置（hosts.yaml 中的一项）
+        query: LogQuery 查询对象
+        start_date: 开始日期
+        end_date: 结束日期
+        patterns: 只搜索这些类别的文件，None表示日期范围内的全部文件
+        cancel_token: 取消标记
+        log_callback: 日志回调函数，参数为消息文本
+    Returns:
+        dict: {'host': 显示名称, 'files': 搜索的文件数, 'matches': 匹配行数,
+               'earliest': 时间范围开始, 'latest': 时间范围结束,
+               'blocks': 按时间排序的 [(时间对象, 日志块文本, (来源文件, zip成员名)), ...]}
+               来源文件是本地缓存路径，在远程提取的日志块没有来源文件（None）
+    Raises:
+        OperationCancelled: 已取消
+        Exception: 连接或列出文件失败
+    """
+    name = host_label(host_data)
+
+    def log(message):
+        if log_callback:
+            log_callback(f"[{name}] {message}")
+
+    result = {'host': name, 'files': 0, 'matches': 0, 'earliest': None, 'latest': None, 'blocks': []}
+    collector = LogCollector(config_file=None, cancel_token=cancel_token)
+    collector.config = {'ssh': host_data.get('ssh', {}), 'log_paths': host_data.get('log_paths', [])}
+    try:
+        collector.connect()
+        files = list_host_logs(collector, collector.config['log_paths'], start_date, end_date, patterns)
+        result['files'] = len(files)
+        if not files:
+            log("没有找到符合条件的日志文件")
+            return result
+
+        cache = shared_cache(on_evict=forget_indexed_file)
+        literal = query.literal()
+        windows = collector.is_remote_windows()
+        earliest_time = None
+        latest_time = None
+        contents = []      # [(内容行, 前缀, 文件名, 来源)]
+        remote_files = []  # 在车道主机上完成搜索的文件：[(远程路径, 前缀, 文件名)]
+
+        # 第一阶段：确定这台主机上关键字的时间范围
+        for remote_path, file_name in files:
+            collector.check_cancelled()
+            prefix = log_prefix(file_name)
+            is_zip = file_name.lower().endswith('.zip')
+            if literal is not None and not is_zip and not windows:
+                try:
+                    count, first_str, last_str = collector.remote_keyword_times(remote_path, *literal)
+                except Exception as e:
+                    collector.check_cancelled()
+                    log(f"远程搜索失败，改为下载后搜索 {file_name}: {str(e)}")
+                else:
+                    result['matches'] += count
+                    for time_str in (first_str, last_str):
+                        if not time_str:
+                            continue
+                        try:
+                            time_obj = parse_log_time(time_str)
+                        except ValueError:
+                            continue
+                        earliest_time, latest_time = merge_time_range(
+                            earliest_time, latest_time, time_obj, time_obj)
+                    if count:
+                        remote_files.append((remote_path, prefix, file_name))
+                    continue
+
+            local_path = cache.get(collector, remote_path, log_callback=log_callback)
+            if is_zip:
+                with zipfile.ZipFile(local_path, 'r') as zip_ref:
+                    file_contents = [(decode_log_lines(zip_ref.read(member)),
+                                      log_prefix(os.path.basename(member), prefix),
+                                      os.path.basename(member), (local_path, member))
+                                     for member in zip_log_members(zip_ref)]
+            else:
+                file_contents = [(read_log_lines(local_path), prefix, file_name, (local_path, None))]
+            for content_lines, _, _, _ in file_contents:
+                first_time, last_time, matched_lines = keyword_time_range(content_lines, query)
+                result['matches'] += len(matched_lines)
+                earliest_time, latest_time = merge_time_range(
+                    earliest_time, latest_time, first_time, last_time)
+            contents.extend(file_contents)
+
+        log(f"搜索 {len(files)} 个文件，找到 {result['matches']} 个匹配行")
+        if earliest_time is None or latest_time is None:
+            return result
+        if earliest_time == latest_time:
+            earliest_time -= SINGLE_TIME_PADDING
+            latest_time += SINGLE_TIME_PADDING
+        result['earliest'] = earliest_time
+        result['latest'] = latest_time
+
+        # 第二阶段：提取这台主机时间范围内的日志块
+        for remote_path, prefix, file_name in remote_files:
+            collector.check_cancelled()
+            try:
+                content_lines = collector.remote_extract_window(
+                    remote_path, seconds_of_day(earliest_time), seconds_of_day(latest_time))
+            except Exception as e:
+                collector.check_cancelled()
+                log(f"远程提取时间范围日志失败 {file_name}: {str(e)}")
+                continue
+            contents.append((content_lines, prefix, file_name, (None, None)))
+
+        streams = [tag_stream(_host_blocks(iter_time_window_blocks(
+            content_lines, prefix, earliest_time, latest_time), name), source)
+            for content_lines, prefix, _, source in contents]
+        result['blocks'] = list(merge_timelines(streams))
+        collector.check_cancelled()
+        return result
+    finally:
+        collector.close()
+
+
+def fleet_search(hosts_data, query, start_date, end_date, patterns=None,
+                 max_workers=FLEET_SEARCH_MAX_WORKERS, cancel_token=None, on_host_done=None,
+                 log_callback=None):
+    """
+    并发在多台主机上搜索
+    Args:
+        hosts_data: 要搜索的主机配置列表，按提交顺序开始搜索（可先用 log_fleet.live_hosts 排序）
+        query: LogQuery 查询对象
+        start_date: 开始日期
+        end_date: 结束日期
+        patterns: 只搜索这些类别的文件
+        max_workers: 同时搜索的主机数量上限
+        cancel_token: 取消标记，所有主机共用
+        on_host_done: 每台主机完成时的回调函数，参数为 (主机配置, 搜索结果或None, 错误信息)，
+                      在搜索线程中调用
+        log_callback: 日志回调函数
+    Returns:
+        list: [(主机配置, 搜索结果或None, 错误信息), ...]，按完成顺序
+    Raises:
+        OperationCancelled: 已取消
+    """
+    if not hosts_data:
+        return []
+    completed = []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(hosts_data))) as executor:
+        futures = {executor.submit(search_host, host_data, query, start_date, end_date, patterns,
+                                   cancel_token, log_callback): host_data
+                   for host_data in hosts_data}
+        for future in as_completed(futures):
+            host_data = futures[future]
+            try:
+                item = (host_data, future.result(), '')
+            except OperationCancelled:
+                item = (host_data, None, "已取消")
+            except Exception as e:
+                item = (host_data, None, str(e))
+            completed.append(item)
+            if on_host_done:
+                on_host_done(*item)
+    if cancel_token is not None:
+        cancel_token.check()
+    return completed
+
+
+class FleetTimeline:
+    """
+    多主机时间线
+    每台主机的日志块已按时间排序，新主机加入后重新做K路归并得到全局时间线；
+    新加入的日志块都不早于已显示的最后一块时可以直接追加，不需要重新显示
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """清空所有主机的结果"""
+        self._hosts = []
+        self.latest = None  # 已加入的日志块中最晚的时间
+
+    def __len__(self):
+        return sum(len(blocks) for blocks in self._hosts)
+
+    def add(self, blocks):
+        """
+        加入一台主机的日志块
+        Args:
+            blocks: 按时间排序的 [(时间对象, 日志块文本, 来源), ...]
+        Returns:
+            bool: True表示这些日志块可以直接追加到已显示结果的末尾，False表示需要重新显示
+        """
+        if not blocks:
+            return True
+        appendable = self.latest is None or blocks[0][0] >= self.latest
+        self._hosts.append(blocks)
+        if self.latest is None or blocks[-1][0] > self.latest:
+            self.latest = blocks[-1][0]
+        return appendable
+
+    def __iter__(self):
+        return merge_timelines(self._hosts)
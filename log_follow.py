@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日志跟踪模块
+功能：像 tail -f 一样跟踪远程日志文件新追加的内容，所有文件共用一个SSH连接
+支持：
+1. 每个文件记录已读取的字节偏移，每次轮询先 stat 再只读取新增的字节，文件句柄保持打开
+2. 不完整的最后一行保留到下次读取，拼接完整后再输出
+3. 文件被截断或改名轮转（大小小于已读偏移）时从头读取
+4. 按日期命名的日志（例如 RsuLogic_2025-03-31.log）过了零点后，读完旧文件再切换到新日期的文件
+"""
+
+import re
+import posixpath
+import ntpath
+from datetime import date
+from log_search import decode_log_bytes
+
+# 轮询间隔（秒）
+FOLLOW_INTERVAL = 1.0
+# 开始跟踪时先显示的文件末尾字节数
+FOLLOW_INITIAL_BYTES = 64 * 1024
+# 每个文件每次轮询最多读取的字节数，积压更多时分多次读取
+FOLLOW_MAX_READ = 4 * 1024 * 1024
+# 文件名中的日期
+_DATE_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+def dated_path(remote_path, day):
+    """
+    把按日期命名的日志路径换成另一天的路径
+    Args:
+        remote_path: 远程文件路径
+        day: 日期
+    Returns:
+        str: 新的路径，文件名中没有日期时返回None
+    """
+    path_module = ntpath if '\\' in remote_path else posixpath
+    directory, file_name = path_module.split(remote_path)
+    if not _DATE_PATTERN.search(file_name):
+        return None
+    return path_module.join(directory, _DATE_PATTERN.sub(day.strftime('%Y-%m-%d'), file_name, count=1))
+
+
+class FollowedFile:
+    """
+    一个被跟踪的远程文件
+    记录已读取的偏移和不完整的最后一行，read_new 返回新追加的完整行
+    """
+    def __init__(self, remote_path, offset=None, initial_bytes=FOLLOW_INITIAL_BYTES):
+        """
+        Args:
+            remote_path: 远程文件路径
+            offset: 开始读取的偏移，None表示从文件末尾前 initial_bytes 处开始
+            initial_bytes: 开始跟踪时先读取的末尾字节数，0表示只读取之后追加的内容
+        """
+        self.remote_path = remote_path
+        self.offset = offset
+        self.initial_bytes = initial_bytes
+        self.partial = b''  # 还没有换行符结尾的内容
+        self._handle = None
+        self._skip_first_line = False
+        self.error = None  # 最近一次读取失败的原因
+
+    def close(self):
+        """关闭文件句柄"""
+        if self._handle is not None:
+            try:
+                self._handle.close()
+            except Exception:
+                pass
+            self._handle = None
+
+    def switch_to(self, remote_path):
+        """
+        切换到另一个文件（例如轮转后的新文件），从头读取
+        Returns:
+            list: 旧文件末尾没有换行符的最后一行（没有时为空列表）
+        """
+        rest = [decode_log_bytes(self.partial).rstrip('\r\n')] if self.partial else []
+        self.close()
+        self.remote_path = remote_path
+        self.offset = 0
+        self.partial = b''
+        return rest
+
+    def read_new(self, sftp, max_bytes=FOLLOW_MAX_READ):
+        """
+        读取文件新追加的内容
+        Args:
+            sftp: SFTP会话
+            max_bytes: 最多读取的字节数
+        Returns:
+            tuple: (新的完整行列表, 是否还有没读完的内容)
+        Raises:
+            IOError: 文件不存在或读取失败
+        """
+        size = sftp.stat(self.remote_path).st_size or 0
+        if self.offset is None:
+            self.offset = max(0, size - self.initial_bytes)
+            # 从文件中间开始时丢弃第一个不完整的行（从末尾开始时新追加的内容就是新的行）
+            self._skip_first_line = 0 < self.offset < size
+        elif size < self.offset:
+            # 文件被截断或轮转为新文件，从头读取
+            self.close()
+            self.offset = 0
+            self.partial = b''
+        if size == self.offset:
+            return [], False
+
+        if self._handle is None:
+            self._handle = sftp.open(self.remote_path, 'rb')
+        length = min(size - self.offset, max_bytes)
+        self._handle.seek(self.offset)
+        data = self._handle.read(length)
+        self.offset += len(data)
+
+        data = self.partial + data
+        end = data.rfind(b'\n')
+        if end < 0:
+            self.partial = data
+            return [], self.offset < size
+        self.partial = data[end + 1:]
+        data = data[:end + 1]
+        if self._skip_first_line:
+            data = data[data.find(b'\n') + 1:]
+            self._skip_first_line = False
+        lines = [line.rstrip('\r') for line in decode_log_bytes(data).split('\n')[:-1]]
+        return lines, self.offset < size
+
+    def next_file(self, sftp, today=None):
+        """
+        过了零点后查找新日期的日志文件
+        Args:
+            sftp: SFTP会话
+            today: 当前日期，默认为今天
+        Returns:
+            str: 新文件的路径，没有新文件时返回None
+        """
+        next_path = dated_path(self.remote_path, today or date.today())
+        if not next_path or next_path == self.remote_path:
+            return None
+        try:
+            sftp.stat(next_path)
+        except (IOError, OSError):
+            return None
+        return next_path
+
+
+class LogFollower:
+    """
+    同时跟踪多个远程日志文件，共用调用方提供的SFTP会话
+    """
+    def __init__(self, sftp, remote_paths, query=None, initial_bytes=FOLLOW_INITIAL_BYTES):
+        """
+        Args:
+            sftp: SFTP会话（例如已连接的 LogCollector.sftp）
+            remote_paths: 要跟踪的远程文件路径列表
+            query: LogQuery 查询对象，只返回满足查询的行；None表示返回全部行
+            initial_bytes: 开始跟踪时先读取的末尾字节数
+        """
+        self.sftp = sftp
+        self.query = query
+        self.files = [FollowedFile(path, initial_bytes=initial_bytes) for path in remote_paths]
+
+    def close(self):
+        """关闭所有文件句柄"""
+        for followed in self.files:
+            followed.close()
+
+    def poll(self, today=None, log_callback=None):
+        """
+        读取所有文件新追加的行
+        Args:
+            today: 当前日期，用于零点后切换到新日期的文件
+            log_callback: 日志回调函数，参数为消息文本
+        Returns:
+            list: [(远程路径, 日志行), ...]，只包含满足查询的行
+        """
+        results = []
+        for followed in self.files:
+            path = followed.remote_path
+            try:
+                lines, more = followed.read_new(self.sftp)
+                followed.error = None
+            except (IOError, OSError) as e:
+                # 文件已被轮转走，等待新文件出现；同一个错误只提示一次
+                lines, more = [], False
+                if log_callback and followed.error != str(e):
+                    log_callback(f"读取 {path} 失败: {str(e)}")
+                followed.error = str(e)
+            if not more:
+                # 旧文件已读完，检查是否已经有新日期的文件
+                next_path = followed.next_file(self.sftp, today)
+                if next_path:
+                    if log_callback:
+                        log_callback(f"日志已轮转，开始跟踪 {next_path}")
+                    lines = lines + followed.switch_to(next_path)
+            results.extend((path, line) for line in lines
+                           if line and (self.query is None or self.query.match_terms(line) is not None))
+        return results
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日志分钟统计模块
+功能：单遍扫描选中的日志，按分钟统计行数，并按日志级别、来源前缀（RsuLogic、CenterDevCtrl 等）
+和查询匹配分别计数，用于在搜索之前先找到出问题的时间段
+支持：
+1. 扫描时只把每行的分钟序号和级别编号追加到紧凑数组，扫描结束后用 NumPy 的 bincount 一次性计数
+2. 统计结果是 (类别数, 1440) 的计数矩阵，可以按级别、前缀或查询匹配显示
+3. 给出任意分钟范围对应的时间范围，用于提取该时间段的日志块
+"""
+
+import re
+from array import array
+import numpy as np
+from log_search import time_from_seconds
+
+# 一天的分钟数，统计按当天的分钟编号（0-1439）
+MINUTES_PER_DAY = 24 * 60
+# 日志级别，不能识别的行计入 OTHER
+LEVELS = ('ERROR', 'WARN', 'INFO', 'DEBUG', 'OTHER')
+_LEVEL_OTHER = LEVELS.index('OTHER')
+# 行中的级别关键字及对应的级别编号
+_LEVEL_PATTERN = re.compile(r'\b(?:FATAL|ERROR|ERR|WARNING|WARN|INFO|DEBUG|TRACE)\b|错误|异常|警告')
+_LEVEL_CODES = {
+    'FATAL': 0, 'ERROR': 0, 'ERR': 0, '错误': 0, '异常': 0,
+    'WARNING': 1, 'WARN': 1, '警告': 1,
+    'INFO': 2,
+    'DEBUG': 3, 'TRACE': 3,
+}
+# 行首时间 HH:MM
+_MINUTE_PATTERN = re.compile(r'^(\d{2}):(\d{2}):\d{2}')
+
+
+def line_level(line):
+    """
+    识别日志行的级别
+    Returns:
+        int: LEVELS 中的编号
+    """
+    match = _LEVEL_PATTERN.search(line)
+    if not match:
+        return _LEVEL_OTHER
+    return _LEVEL_CODES.get(match.group(0), _LEVEL_OTHER)
+
+
+class LogHistogram:
+    """
+    按分钟统计的日志直方图
+    by_level: (级别数, 1440)；by_prefix: (前缀数, 1440)；matched: (1440,) 查询匹配行数
+    只统计带行首时间的行，没有时间的延续行不计数
+    """
+    def __init__(self, query=None):
+        """
+        Args:
+            query: LogQuery 查询对象，None表示不统计查询匹配
+        """
+        self.query = query
+        self.prefixes = []  # 前缀名称，顺序与 by_prefix 的行一致
+        self.by_level = np.zeros((len(LEVELS), MINUTES_PER_DAY), dtype=np.int64)
+        self.by_prefix = np.zeros((0, MINUTES_PER_DAY), dtype=np.int64)
+        self.matched = np.zeros(MINUTES_PER_DAY, dtype=np.int64)
+
+    @property
+    def total(self):
+        """每分钟的总行数"""
+        return self.by_level.sum(axis=0)
+
+    def _prefix_index(self, prefix):
+        if prefix not in self.prefixes:
+            self.prefixes.append(prefix)
+            self.by_prefix = np.vstack([self.by_prefix, np.zeros((1, MINUTES_PER_DAY), dtype=np.int64)])
+        return self.prefixes.index(prefix)
+
+    def add_lines(self, lines, prefix):
+        """
+        单遍统计一个文件（或zip成员）的日志行
+        Args:
+            lines: 日志行的可迭代对象（可以是流式读取的迭代器）
+            prefix: 来源前缀
+        Returns:
+            int: 统计的行数
+        """
+        minutes = array('H')
+        levels = array('B')
+        hits = array('H')  # 查询匹配行的分钟编号
+        query = self.query
+        for line in lines:
+            match = _MINUTE_PATTERN.match(line)
+            if not match:
+                continue
+            minute = int(match.group(1)) * 60 + int(match.group(2))
+            if minute >= MINUTES_PER_DAY:
+                continue
+            minutes.append(minute)
+            levels.append(line_level(line))
+            if query is not None and query.match_terms(line) is not None:
+                hits.append(minute)
+        if not minutes:
+            return 0
+
+        minute_array = np.frombuffer(minutes, dtype=np.uint16).astype(np.int64)
+        level_array = np.frombuffer(levels, dtype=np.uint8).astype(np.int64)
+        self.by_level += np.bincount(level_array * MINUTES_PER_DAY + minute_array,
+                                     minlength=len(LEVELS) * MINUTES_PER_DAY
+                                     ).reshape(len(LEVELS), MINUTES_PER_DAY)
+        prefix_index = self._prefix_index(prefix)
+        self.by_prefix[prefix_index] += np.bincount(minute_array, minlength=MINUTES_PER_DAY)
+        if hits:
+            self.matched += np.bincount(np.frombuffer(hits, dtype=np.uint16), minlength=MINUTES_PER_DAY)
+        return len(minutes)
+
+    def series(self, mode):
+        """
+        获取用于显示的计数矩阵
+        Args:
+            mode: 'level'、'prefix' 或 'query'
+        Returns:
+            tuple: (类别名称列表, (类别数, 1440) 的计数矩阵)
+        """
+        if mode == 'prefix':
+            return list(self.prefixes), self.by_prefix
+        if mode == 'query':
+            return ['匹配'], self.matched.reshape(1, MINUTES_PER_DAY)
+        return list(LEVELS), self.by_level
+
+    def active_range(self):
+        """
+        有日志的分钟范围
+        Returns:
+            tuple: (第一分钟, 最后一分钟)，没有日志时返回None
+        """
+        nonzero = np.flatnonzero(self.total)
+        if not len(nonzero):
+            return None
+        return int(nonzero[0]), int(nonzero[-1])
+
+
+def minute_time_range(first_minute, last_minute=None):
+    """
+    分钟范围对应的日志时间范围
+    Args:
+        first_minute: 第一分钟
+        last_minute: 最后一分钟（包含），默认与第一分钟相同
+    Returns:
+        tuple: (开始时间, 结束时间)，与 parse_log_time 的结果可以比较
+    """
+    last_minute = first_minute if last_minute is None else last_minute
+    return time_from_seconds(first_minute * 60), time_from_seconds(last_minute * 60 + 59.999)
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日志全文索引模块
+功能：为本地缓存和已收集的日志建立持久化的全文索引，重复搜索时不再重新扫描文件
+支持：
+1. SQLite FTS5 三元组（trigram）索引，中英文关键字都可以使用索引
+2. 增量更新：日志文件变大时只索引新追加的部分
+3. zip包内的日志文件按成员分别索引
+4. 每行记录所属日志块的时间，可以按时间范围提取日志
+"""
+
+import os
+import hashlib   # 文件头校验
+import sqlite3   # 索引数据库
+import tempfile  # 临时目录
+import zipfile   # 压缩包读取
+from log_search import detect_encoding, match_log_time, seconds_of_day, STREAM_CHUNK_SIZE
+
+# 用于判断文件是否被替换（而不是追加）的文件头字节数
+HEAD_CHECK_SIZE = 4096
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL DEFAULT 0,
+    mtime REAL NOT NULL DEFAULT 0,
+    indexed_bytes INTEGER NOT NULL DEFAULT 0,
+    line_count INTEGER NOT NULL DEFAULT 0,
+    encoding TEXT,
+    head_hash TEXT,
+    block_time REAL
+);
+CREATE TABLE IF NOT EXISTS lines (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    line_num INTEGER NOT NULL,
+    log_time REAL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lines_file_line ON lines (file_id, line_num);
+CREATE INDEX IF NOT EXISTS lines_file_time ON lines (file_id, log_time);
+'''
+
+_FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS lines_fts USING fts5(
+    content, content='lines', content_rowid='id', tokenize='trigram'
+);
+'''
+
+
+def default_index_path():
+    """获取默认的索引数据库路径（与分析缓存放在同一目录）"""
+    return os.path.join(tempfile.gettempdir(), "log_cache", "log_index.db")
+
+
+def member_key(zip_path, member_name):
+    """生成zip包成员在索引中的路径"""
+    return f"{zip_path}::{member_name}"
+
+
+def forget_indexed_file(path):
+    """删除已不存在的文件在默认索引中的记录（分析缓存淘汰文件时的回调）"""
+    index = LogIndex()
+    try:
+        index.remove_file(path)
+    finally:
+        index.close()
+
+
+class LogIndex:
+    """
+    日志全文索引
+    每个线程应使用单独的 LogIndex 对象（SQLite连接不能跨线程共享）
+    """
+    def __init__(self, db_path=None):
+        """
+        打开或创建索引数据库
+        Args:
+            db_path: 数据库路径，默认为 default_index_path()
+        """
+        self.db_path = db_path or default_index_path()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(_SCHEMA)
+        # 较老的SQLite没有trigram分词器，此时退回到LIKE扫描（仍然不需要读取和解码日志文件）
+        try:
+            self.conn.executescript(_FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+        self.conn.commit()
+
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
+
+    # ------------------------------------------------------------------
+    # 建立索引
+    # ------------------------------------------------------------------
+
+    def update_file(self, path):
+        """
+        更新单个文件的索引
+        .log 文件只索引新追加的部分；文件被截断或替换时重建；.zip 文件变化时重建全部成员
+
+        Args:
+            path: 本地文件路径
+        Returns:
+            int: 新索引的行数
+        """
+        if path.lower().endswith('.zip'):
+            return self._update_zip(path)
+        return self._update_log(path)
+
+    def update_directory(self, directory):
+        """
+        更新目录下所有日志文件的索引
+        Args:
+            directory: 本地目录
+        Returns:
+            int: 新索引的行数
+        """
+        total = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.lower().endswith(('.log', '.zip')):
+                    total += self.update_file(os.path.join(root, name))
+        return total
+
+    def remove_file(self, path):
+        """
+        删除文件（或zip包的所有成员）的索引，用于缓存文件被淘汰时
+        Args:
+            path: 本地文件路径
+        """
+        for file_id, _ in self._file_ids(path):
+            self._delete_file_lines(file_id)
+            self.conn.execute('DELETE FROM files WHERE id = ?', (file_id,))
+        self.conn.commit()
+
+    def is_current(self, path):
+        """
+        判断文件（zip包按整个压缩包判断）的索引是否与当前文件一致，只比较大小和修改时间，不读取文件内容
+        Args:
+            path: 本地文件路径
+        Returns:
+            bool: 索引是最新的返回True
+        """
+        stat = os.stat(path)
+        row = self.conn.execute('SELECT size, mtime FROM files WHERE path = ?', (path,)).fetchone()
+        return row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime
+
+    def _file_row(self, path):
+        return self.conn.execute(
+            'SELECT id, size, mtime, indexed_bytes, line_count, encoding, head_hash, block_time '
+            'FROM files WHERE path = ?', (path,)).fetchone()
+
+    def _delete_file_lines(self, file_id):
+        if self.has_fts:
+            self.conn.execute(
+                "INSERT INTO lines_fts (lines_fts, rowid, content) "
+                "SELECT 'delete', id, content FROM lines WHERE file_id = ?", (file_id,))
+        self.conn.execute('DELETE FROM lines WHERE file_id = ?', (file_id,))
+
+    def _delete_lines_after(self, file_id, line_num):
+        """删除指定行号之后的索引（上次索引的不完整末行）"""
+        if self.has_fts:
+            self.conn.execute(
+                "INSERT INTO lines_fts (lines_fts, rowid, content) "
+                "SELECT 'delete', id, content FROM lines WHERE file_id = ? AND line_num > ?",
+                (file_id, line_num))
+        self.conn.execute('DELETE FROM lines WHERE file_id = ? AND line_num > ?', (file_id, line_num))
+
+    def _reset_file(self, path, row):
+        """删除文件已有的索引，返回可用于重新索引的文件ID"""
+        if row is None:
+            cursor = self.conn.execute('INSERT INTO files (path) VALUES (?)', (path,))
+            return cursor.lastrowid
+        self._delete_file_lines(row[0])
+        self.conn.execute(
+            'UPDATE files SET indexed_bytes = 0, line_count = 0, encoding = NULL, '
+            'head_hash = NULL, block_time = NULL WHERE id = ?', (row[0],))
+        return row[0]
+
+    def _insert_lines(self, file_id, data, encoding, line_base, block_time):
+        """
+        索引一段完整的行
+        Returns:
+            tuple: (行数, 最后一个日志块的时间)
+        """
+        rows = []
+        text = data.decode(encoding, errors='replace')
+        parts = text.split('\n')
+        if parts and parts[-1] == '':
+            parts.pop()
+        for offset, line in enumerate(parts, 1):
+            line = line.strip()
+            time_str, time_obj = match_log_time(line)
+            if time_obj is not None:
+                block_time = seconds_of_day(time_obj)
+            if line:
+                rows.append((file_id, line_base + offset, block_time, line))
+        if rows:
+            first_id = self.conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM lines').fetchone()[0]
+            self.conn.executemany(
+                'INSERT INTO lines (file_id, line_num, log_time, content) VALUES (?, ?, ?, ?)', rows)
+            if self.has_fts:
+                self.conn.execute(
+                    'INSERT INTO lines_fts (rowid, content) SELECT id, content FROM lines '
+                    'WHERE id >= ? AND file_id = ?', (first_id, file_id))
+        return len(parts), block_time
+
+    def _index_stream(self, file_id, stream, encoding, line_base, block_time):
+        """
+        按数据块索引二进制流中的完整行
+        Returns:
+            tuple: (已索引字节数, 行数, 编码, 最后一个日志块的时间, 末尾不完整的行)
+        """
+        consumed = 0
+        line_count = 0
+        pending = b''
+        while True:
+            chunk = stream.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            data = pending + chunk
+            cut = data.rfind(b'\n') + 1
+            if cut == 0:
+                pending = data
+                continue
+            data, pending = data[:cut], data[cut:]
+            if encoding is None:
+                encoding = detect_encoding(data)
+            count, block_time = self._insert_lines(file_id, data, encoding, line_base + line_count, block_time)
+            line_count += count
+            consumed += cut
+        return consumed, line_count, encoding, block_time, pending
+
+    def _update_log(self, path):
+        stat = os.stat(path)
+        row = self._file_row(path)
+        with open(path, 'rb') as f:
+            head = f.read(HEAD_CHECK_SIZE)
+
+            if row is not None:
+                file_id, size, mtime, indexed_bytes, line_count, encoding, head_hash, block_time = row
+                if stat.st_size == size and stat.st_mtime == mtime:
+                    return 0
+                # 文件变小或文件头变化，说明文件被替换，需要重建索引
+                old_head = head[:min(HEAD_CHECK_SIZE, indexed_bytes)]
+                replaced = (stat.st_size < indexed_bytes
+                            or hashlib.md5(old_head).hexdigest() != head_hash)
+            else:
+                replaced = True
+
+            if replaced:
+                file_id = self._reset_file(path, row)
+                indexed_bytes, line_count, encoding, block_time = 0, 0, None, None
+            else:
+                # 上次没有换行符的末行可能还在写入，删除后和新内容一起重新索引
+                self._delete_lines_after(file_id, line_count)
+
+            # 只读取新追加的部分
+            f.seek(indexed_bytes)
+            consumed, new_lines, encoding, block_time, pending = self._index_stream(
+                file_id, f, encoding, line_count, block_time)
+            if pending:
+                # 末行暂时单独索引，不计入已索引的字节数和行数
+                self._insert_lines(file_id, pending, encoding or detect_encoding(pending),
+                                   line_count + new_lines, block_time)
+
+        indexed_bytes += consumed
+        head_hash = hashlib.md5(head[:min(HEAD_CHECK_SIZE, indexed_bytes)]).hexdigest()
+        self.conn.execute(
+            'UPDATE files SET size = ?, mtime = ?, indexed_bytes = ?, line_count = ?, '
+            'encoding = ?, head_hash = ?, block_time = ? WHERE id = ?',
+            (stat.st_size, stat.st_mtime, indexed_bytes, line_count + new_lines,
+             encoding, head_hash, block_time, file_id))
+        self.conn.commit()
+        return new_lines
+
+    def _update_zip(self, path):
+        stat = os.stat(path)
+        zip_row = self._file_row(path)
+        if zip_row is not None and zip_row[1] == stat.st_size and zip_row[2] == stat.st_mtime:
+            return 0
+
+        # 压缩包不会追加内容，变化后重建全部成员的索引
+        for (member_id,) in self.conn.execute(
+                'SELECT id FROM files WHERE path LIKE ? ESCAPE ?',
+                (_like_escape(path + '::') + '%', '\\')).fetchall():
+            self._delete_file_lines(member_id)
+            self.conn.execute('DELETE FROM files WHERE id = ?', (member_id,))
+
+        total = 0
+        with zipfile.ZipFile(path, 'r') as zip_ref:
+            for name in zip_ref.namelist():
+                if not name.lower().endswith('.log'):
+                    continue
+                cursor = self.conn.execute('INSERT INTO files (path) VALUES (?)', (member_key(path, name),))
+                member_id = cursor.lastrowid
+                with zip_ref.open(name) as stream:
+                    consumed, line_count, encoding, block_time, pending = self._index_stream(
+                        member_id, stream, None, 0, None)
+                    if pending:
+                        # 压缩包成员的最后一行没有换行符也要索引
+                        count, block_time = self._insert_lines(
+                            member_id, pending, encoding or detect_encoding(pending), line_count, block_time)
+                        line_count += count
+                self.conn.execute(
+                    'UPDATE files SET line_count = ?, encoding = ?, block_time = ? WHERE id = ?',
+                    (line_count, encoding, block_time, member_id))
+                total += line_count
+
+        if zip_row is None:
+            self.conn.execute('INSERT INTO files (path, size, mtime) VALUES (?, ?, ?)',
+                              (path, stat.st_size, stat.st_mtime))
+        else:
+            self.conn.execute('UPDATE files SET size = ?, mtime = ? WHERE id = ?',
+                              (stat.st_size, stat.st_mtime, zip_row[0]))
+        self.conn.commit()
+        return total
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def _file_ids(self, path):
+        """获取文件（或zip包的所有成员）在索引中的ID和显示名称"""
+        if path.lower().endswith('.zip'):
+            rows = self.conn.execute(
+                'SELECT id, path FROM files WHERE path LIKE ? ESCAPE ?',
+                (_like_escape(path + '::') + '%', '\\')).fetchall()
+            return [(file_id, indexed_path.split('::', 1)[1]) for file_id, indexed_path in rows]
+        row = self.conn.execute('SELECT id FROM files WHERE path = ?', (path,)).fetchone()
+        return [(row[0], os.path.basename(path))] if row else []
+
+    def search(self, query, paths):
+        """
+        在索引中按查询条件搜索
+        先用全文索引（或LIKE）筛选候选行，再用查询对象精确确认
+
+        Args:
+            query: LogQuery 查询对象
+            paths: 要搜索的本地文件路径列表（需要先调用 update_file，可以用 is_current 检查）
+        Returns:
+            list: 字典列表，包含 file、line_num、content、terms
+        """
+        names = {}
+        for path in paths:
+            for file_id, name in self._file_ids(path):
+                names[file_id] = name
+        if not names:
+            return []
+
+        id_list = ','.join(str(file_id) for file_id in names)
+        candidates = query.candidate_literals()
+        if candidates and self.has_fts and all(len(text) >= 3 for text in candidates):
+            # 三元组索引只能加速至少3个字符的关键字
+            # 全文匹配放在子查询中只执行一次；写成JOIN时SQLite会对每一行单独查询全文索引
+            match_expr = ' OR '.join('"' + text.replace('"', '""') + '"' for text in candidates)
+            rows = self.conn.execute(
+                f'SELECT file_id, line_num, content FROM lines '
+                f'WHERE id IN (SELECT rowid FROM lines_fts WHERE lines_fts MATCH ?) '
+                f'AND file_id IN ({id_list}) ORDER BY file_id, line_num', (match_expr,))
+        elif candidates:
+            conditions = ' OR '.join("content LIKE ? ESCAPE '\\'" for _ in candidates)
+            rows = self.conn.execute(
+                f'SELECT file_id, line_num, content FROM lines '
+                f'WHERE ({conditions}) AND file_id IN ({id_list}) ORDER BY file_id, line_num',
+                ['%' + _like_escape(text) + '%' for text in candidates])
+        else:
+            rows = self.conn.execute(
+                f'SELECT file_id, line_num, content FROM lines '
+                f'WHERE file_id IN ({id_list}) ORDER BY file_id, line_num')
+
+        results = []
+        for file_id, line_num, content in rows:
+            terms = query.match_terms(content)
+            if terms is not None:
+                results.append({
+                    'line_num': line_num,
+                    'content': content,
+                    'file': names[file_id],
+                    'terms': terms
+                })
+        return results
+
+
+def _like_escape(text):
+    """转义LIKE模式中的特殊字符"""
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
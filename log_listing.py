@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+文件列表解析模块
+功能：把远程目录列表中的文件大小和时间文本转换为数值，用于按大小、时间排序
+支持：
+1. ls -lh 的大小（1.5K、20M），dir 命令的大小（1,234），以及 "12.00 KB" 这样的格式
+2. ls 的时间（Mar 31 10:00、Mar 31 2024），dir 的时间（2025/03/31 10:00），ISO 格式时间
+3. 文件列表以数组保存大小和修改时间，供表格模型按需显示、按数值排序
+"""
+
+import re
+from array import array
+from datetime import datetime
+
+# 大小单位
+_SIZE_UNITS = {'': 1, 'B': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2,
+               'G': 1024 ** 3, 'GB': 1024 ** 3, 'T': 1024 ** 4, 'TB': 1024 ** 4}
+_SIZE_PATTERN = re.compile(r'^([\d,]+(?:\.\d+)?)\s*([KMGT]?B?)$', re.IGNORECASE)
+
+# 带年份的时间格式
+_TIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d %H:%M',
+                 '%Y-%m-%d', '%Y/%m/%d', '%m/%d/%Y %H:%M', '%m/%d/%Y', '%b %d %Y')
+
+
+def format_size(size):
+    """
+    将字节数格式化为便于阅读的文本
+    Args:
+        size: 字节数，负数表示未知
+    Returns:
+        str: 例如 "12.00 KB"
+    """
+    if size < 0:
+        return "未知"
+    if size < 1024:
+        return f"{size} B"
+    if size < 1024 * 1024:
+        return f"{size / 1024:.2f} KB"
+    return f"{size / (1024 * 1024):.2f} MB"
+
+
+def parse_size(text):
+    """
+    解析文件大小文本
+    Args:
+        text: 大小文本
+    Returns:
+        int: 字节数，无法解析时返回-1
+    """
+    match = _SIZE_PATTERN.match((text or '').strip())
+    if not match:
+        return -1
+    number = float(match.group(1).replace(',', ''))
+    return int(number * _SIZE_UNITS[match.group(2).upper()])
+
+
+def parse_listing_time(text, now=None):
+    """
+    解析文件列表中的修改时间文本
+    Args:
+        text: 时间文本
+        now: 当前时间，用于补全 ls 输出中省略的年份
+    Returns:
+        float: 时间戳，无法解析时返回-1
+    """
+    text = ' '.join((text or '').split())
+    # dir 命令可能带有“上午/下午”或 AM/PM
+    for marker in ('上午', '下午', 'AM', 'PM'):
+        text = text.replace(f' {marker}', '')
+    for time_format in _TIME_FORMATS:
+        try:
+            return datetime.strptime(text, time_format).timestamp()
+        except ValueError:
+            continue
+    # ls 对半年内的文件省略年份，例如 "Mar 31 10:00"
+    try:
+        parsed = datetime.strptime(text, '%b %d %H:%M')
+    except ValueError:
+        return -1
+    now = now or datetime.now()
+    parsed = parsed.replace(year=now.year)
+    if parsed > now:
+        parsed = parsed.replace(year=now.year - 1)
+    return parsed.timestamp()
+
+
+def typed_file_info(info):
+    """
+    为文件信息补充数值形式的大小和修改时间
+    已有 size_bytes / mtime 时保持不变，否则从 size / date 文本解析
+    Args:
+        info: 文件信息字典，包含 name、path、size、date
+    Returns:
+        dict: 同一个字典
+    """
+    if 'size_bytes' not in info:
+        info['size_bytes'] = parse_size(info.get('size', ''))
+    if 'mtime' not in info:
+        info['mtime'] = parse_listing_time(info.get('date', ''))
+    return info
+
+
+class FileListing:
+    """
+    文件列表存储
+    名称和路径保存在列表中，大小和修改时间保存在数组中（-1表示未知），
+    只有无法解析的原始时间文本才单独保存
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """清空所有文件"""
+        self._names = []
+        self._paths = []
+        self._sizes = array('q')
+        self._mtimes = array('d')
+        self._dates = {}  # 行号 -> 无法解析的时间文本
+
+    def __len__(self):
+        return len(self._names)
+
+    def append(self, info):
+        """
+        添加一个文件
+        Args:
+            info: 文件信息字典，包含 name、path，以及 size_bytes/mtime 或 size/date
+        """
+        typed_file_info(info)
+        row = len(self._names)
+        self._names.append(info.get('name', ''))
+        self._paths.append(info.get('path'))
+        self._sizes.append(int(info['size_bytes']))
+        self._mtimes.append(float(info['mtime']))
+        if info['mtime'] < 0 and info.get('date'):
+            self._dates[row] = info['date']
+
+    def name(self, row):
+        return self._names[row]
+
+    def path(self, row):
+        return self._paths[row]
+
+    def size(self, row):
+        return self._sizes[row]
+
+    def mtime(self, row):
+        return self._mtimes[row]
+
+    def size_text(self, row):
+        """大小的显示文本"""
+        return format_size(self._sizes[row])
+
+    def date_text(self, row):
+        """修改时间的显示文本"""
+        mtime = self._mtimes[row]
+        if mtime < 0:
+            return self._dates.get(row, "未知")
+        return datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日志预取模块
+功能：在用户选择文件之前，把最可能被查看的远程日志提前下载到分析缓存
+支持：
+1. 按文件名中的日期和用户的历史访问记录对文件排序
+2. 前台搜索或查看日志时立即让出连接，结束后再继续预取
+3. 访问记录按“去掉日期后的文件名”统计，例如每天的 lane_YYYY-MM-DD.log 视为同一类文件
+"""
+
+import os
+import re
+import json
+import threading
+from datetime import datetime
+from log_cache import DEFAULT_CACHE_DIR
+
+# 访问记录文件
+HISTORY_FILE = os.path.join(DEFAULT_CACHE_DIR, "access_history.json")
+# 文件名中的日期
+_DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+
+class PrefetchPaused(Exception):
+    """前台任务需要连接，当前的预取下载被中止"""
+
+
+class ForegroundGate:
+    """
+    前台任务标记
+    前台搜索或查看日志期间预取暂停，所有前台任务结束后恢复
+    """
+    def __init__(self):
+        self._active = 0
+        self._condition = threading.Condition()
+
+    def __enter__(self):
+        with self._condition:
+            self._active += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def is_busy(self):
+        """是否有前台任务正在进行"""
+        return self._active > 0
+
+    def wait_idle(self, timeout=None):
+        """
+        等待所有前台任务结束
+        Args:
+            timeout: 最长等待时间（秒）
+        Returns:
+            bool: 是否已空闲
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: self._active == 0, timeout)
+
+
+# 进程内共享的前台任务标记
+foreground = ForegroundGate()
+
+
+def file_pattern(file_name):
+    """去掉文件名中的日期，得到同一类日志文件的共同名称"""
+    return _DATE_PATTERN.sub('{date}', file_name)
+
+
+class AccessHistory:
+    """用户打开日志文件的历史记录，按文件类别计数"""
+    def __init__(self, history_file=HISTORY_FILE):
+        self.history_file = history_file
+        self._lock = threading.Lock()
+
+    def load(self):
+        """
+        读取访问记录
+        Returns:
+            dict: 文件类别 -> 访问次数
+        """
+        try:
+            with open(self.history_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def record(self, file_path):
+        """
+        记录一次文件访问
+        Args:
+            file_path: 远程文件路径
+        """
+        pattern = file_pattern(os.path.basename(file_path))
+        with self._lock:
+            counts = self.load()
+            counts[pattern] = counts.get(pattern, 0) + 1
+            # 访问记录只影响预取顺序，写入失败时忽略
+            try:
+                os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
+                tmp_path = self.history_file + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(counts, f, ensure_ascii=False)
+                os.replace(tmp_path, self.history_file)
+            except OSError:
+                pass
+
+
+def rank_prefetch_candidates(logs, history_counts, today=None):
+    """
+    按被查看的可能性对日志文件排序
+    今天的文件和较新的文件优先，经常被打开的同类文件优先
+
+    Args:
+        logs: 日志文件信息列表，每项包含 path 和 name
+        history_counts: 访问记录（文件类别 -> 访问次数）
+        today: 当前日期，默认为今天
+    Returns:
+        list: 排序后的远程文件路径列表
+    """
+    today = today or datetime.now().date()
+    max_hits = max(history_counts.values(), default=0)
+    scored = []
+    for log in logs:
+        name = log.get('name', '')
+        # 日期得分：今天为1，越早越低；文件名中没有日期时按较旧的文件处理
+        date_score = 0.1
+        date_match = _DATE_PATTERN.search(name)
+        if date_match:
+            try:
+                days_ago = (today - datetime.strptime(date_match.group(1), '%Y-%m-%d').date()).days
+                date_score = 1.0 / (1 + max(days_ago, 0))
+            except ValueError:
+                pass
+        # 历史得分：同类文件被打开的次数占比
+        hits = history_counts.get(file_pattern(name), 0)
+        history_score = hits / max_hits if max_hits else 0
+        scored.append((date_score + history_score, log.get('path')))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [path for _, path in scored if path]
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日志查询模块
+功能：解析搜索框中的查询语句，一次扫描同时匹配多个关键字和正则表达式
+支持：
+1. 多个词条：车牌号、OBU号、错误码等可以在一次搜索中同时查找
+2. 布尔运算：AND、OR、NOT 和括号，相邻词条默认为 AND
+3. 词条前缀：re: 表示正则表达式，cs: 表示区分大小写，可组合为 cs:re:
+4. 没有 AND/OR/NOT 和双引号的输入整体作为一个词条，例如 connect timeout、func(a)
+5. 使用运算符时，含空格或括号的词条需要用双引号括起来，例如 re:"(超时|失败)\\d+"
+6. 报告每一行匹配到了哪些词条
+
+示例：
+    connect timeout
+    京A12345 OR 0123456789ABCDEF
+    NOT 心跳 AND (cs:ERROR OR 超时)
+"""
+
+import re  # 正则表达式
+
+# 词法单元：带前缀的引号词条、括号、普通词条
+_TOKEN_REGEX = re.compile(r'\s*((?:(?:re|cs):)*"(?:[^"\\]|\\.)*"|\(|\)|[^\s()]+)')
+_OPERATORS = ('AND', 'OR', 'NOT')
+
+
+class QueryError(Exception):
+    """查询语句格式错误"""
+
+
+class QueryTerm:
+    """
+    查询中的单个词条
+    负责把词条编译为正则表达式，并判断一行是否包含该词条
+    """
+    def __init__(self, label, text, is_regex=False, case_sensitive=False):
+        """
+        初始化词条
+        Args:
+            label: 词条在查询中的原始写法，用于报告匹配结果
+            text: 关键字或正则表达式
+            is_regex: 是否为正则表达式
+            case_sensitive: 是否区分大小写
+        Raises:
+            QueryError: 正则表达式无效
+        """
+        self.label = label
+        self.text = text
+        self.is_regex = is_regex
+        self.case_sensitive = case_sensitive
+        self.source = text if is_regex else re.escape(text)
+        try:
+            self.regex = re.compile(self.source, 0 if case_sensitive else re.IGNORECASE)
+        except re.error as e:
+            raise QueryError(f"无效的正则表达式 {text}: {str(e)}")
+
+    def scoped_source(self):
+        """返回带有局部大小写标志的正则片段，用于合并成一个自动机"""
+        return f"(?:{self.source})" if self.case_sensitive else f"(?i:{self.source})"
+
+
+class LogQuery:
+    """
+    日志查询
+    所有词条合并成一个正则表达式，对每一行先做一次整体匹配；
+    只有命中的行才逐个确认具体是哪些词条，再按布尔表达式求值。
+    """
+    def __init__(self, text, terms, tree):
+        self.text = text
+        self.terms = terms
+        self.tree = tree
+        self._combined = re.compile('|'.join(term.scoped_source() for term in terms))
+        # 整个查询是否只在至少一个词条命中时才可能成立（没有NOT时总是如此）
+        self._needs_hit = not _can_match_empty(tree)
+
+    @classmethod
+    def parse(cls, text):
+        """
+        解析查询语句
+        Args:
+            text: 查询语句
+        Returns:
+            LogQuery: 查询对象
+        Raises:
+            QueryError: 查询语句格式错误
+        """
+        tokens = _tokenize(text)
+        if not tokens:
+            raise QueryError("查询语句为空")
+        if '"' not in text and not any(token in _OPERATORS for token in tokens):
+            # 没有运算符和引号：整个输入是一个关键字（可以包含空格和括号）
+            term = _make_term(text.strip())
+            return cls(text, [term], ('term', 0))
+        parser = _Parser(tokens)
+        tree = parser.parse_or()
+        if parser.pos != len(tokens):
+            raise QueryError(f"无法解析的内容: {' '.join(tokens[parser.pos:])}")
+        return cls(text, parser.terms, tree)
+
+    def literal(self):
+        """
+        如果查询只是一个普通关键字，返回 (关键字, 是否区分大小写)，否则返回None
+        只有单个关键字的查询可以使用字节搜索和远程awk搜索等快速路径
+        """
+        if self.tree[0] == 'term' and len(self.terms) == 1 and not self.terms[0].is_regex:
+            term = self.terms[0]
+            return term.text, term.case_sensitive
+        return None
+
+    def candidate_literals(self):
+        """
+        返回用于索引预筛选的关键字列表
+        满足查询的行至少包含其中一个关键字（不区分大小写）；无法确定时返回None
+        """
+        return _candidate_literals(self.tree, self.terms)
+
+    def conjuncts(self):
+        """
+        查询形如 A AND B 时返回各个条件的规范化文本，否则返回空列表
+        满足查询的行一定满足其中每一个条件，可以用已缓存的条件结果缩小扫描范围
+        """
+        if self.tree[0] != 'and':
+            return []
+        return [_format_tree(child, self.terms) for child in self.tree[1]]
+
+    def match_terms(self, line):
+        """
+        判断一行是否满足查询
+        Args:
+            line: 日志行
+        Returns:
+            list: 满足查询时返回命中的词条列表（可能为空，例如纯NOT查询），不满足时返回None
+        """
+        if self._combined.search(line) is None:
+            if self._needs_hit:
+                return None
+            matched = set()
+        else:
+            matched = {i for i, term in enumerate(self.terms) if term.regex.search(line)}
+        if not _evaluate(self.tree, matched):
+            return None
+        return [self.terms[i].label for i in sorted(matched)]
+
+    def highlight_spans(self, line):
+        """
+        获取行中所有词条命中的位置，用于高亮显示
+        Returns:
+            list: [(开始位置, 结束位置), ...]
+        """
+        return [match.span() for match in self._combined.finditer(line) if match.end() > match.start()]
+
+    def matches(self, line):
+        """判断一行是否满足查询"""
+        return self.match_terms(line) is not None
+
+    def normalized(self):
+        """
+        返回规范化的查询文本，用于缓存键
+        去掉多余空白，词条之间的隐式AND写为显式AND
+        """
+        return _format_tree(self.tree, self.terms)
+
+
+def _tokenize(text):
+    """将查询语句拆分为词法单元"""
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN_REGEX.match(text, pos)
+        if not match:
+            raise QueryError(f"无法解析的内容: {text[pos:]}")
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+
+def _make_term(token):
+    """根据词法单元创建词条"""
+    rest = token
+    is_regex = False
+    case_sensitive = False
+    while True:
+        if rest.startswith('re:'):
+            is_regex = True
+            rest = rest[3:]
+        elif rest.startswith('cs:'):
+            case_sensitive = True
+            rest = rest[3:]
+        else:
+            break
+    if len(rest) >= 2 and rest.startswith('"') and rest.endswith('"'):
+        # 只还原转义的双引号，正则表达式中的其他反斜杠保持原样
+        rest = rest[1:-1].replace('\\"', '"')
+    if not rest:
+        raise QueryError(f"词条为空: {token}")
+    return QueryTerm(token, rest, is_regex, case_sensitive)
+
+
+class _Parser:
+    """递归下降解析器，优先级：NOT > AND > OR"""
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.terms = []
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self.peek() == 'OR':
+            self.pos += 1
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+
+    def parse_and(self):
+        nodes = [self.parse_not()]
+        while True:
+            token = self.peek()
+            if token == 'AND':
+                self.pos += 1
+            elif token is None or token in (')', 'OR'):
+                break
+            nodes.append(self.parse_not())
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+
+    def parse_not(self):
+        if self.peek() == 'NOT':
+            self.pos += 1
+            return ('not', self.parse_not())
+        return self.parse_primary()
+
+    def parse_primary(self):
+        token = self.peek()
+        if token is None:
+            raise QueryError("查询语句不完整")
+        if token == '(':
+            self.pos += 1
+            node = self.parse_or()
+            if self.peek() != ')':
+                raise QueryError("缺少右括号")
+            self.pos += 1
+            return node
+        if token == ')' or token in _OPERATORS:
+            raise QueryError(f"意外的 {token}")
+        self.pos += 1
+        self.terms.append(_make_term(token))
+        return ('term', len(self.terms) - 1)
+
+
+def _evaluate(node, matched):
+    """按布尔表达式求值"""
+    kind = node[0]
+    if kind == 'term':
+        return node[1] in matched
+    if kind == 'not':
+        return not _evaluate(node[1], matched)
+    if kind == 'and':
+        return all(_evaluate(child, matched) for child in node[1])
+    return any(_evaluate(child, matched) for child in node[1])
+
+
+def _can_match_empty(node):
+    """判断在没有任何词条命中时表达式是否可能成立"""
+    return _evaluate(node, set())
+
+
+def _candidate_literals(node, terms):
+    """计算满足表达式的行必须包含的关键字（任选其一）"""
+    kind = node[0]
+    if kind == 'term':
+        term = terms[node[1]]
+        return None if term.is_regex else [term.text]
+    if kind == 'not':
+        return None
+    children = [_candidate_literals(child, terms) for child in node[1]]
+    if kind == 'and':
+        # 任意一个子表达式的约束都成立，选择最短关键字最长（最有选择性）的那个
+        usable = [child for child in children if child]
+        if not usable:
+            return None
+        return max(usable, key=lambda texts: min(len(text) for text in texts))
+    # OR 需要每个分支都有约束
+    if not all(children):
+        return None
+    return [text for child in children for text in child]
+
+
+def _format_tree(node, terms):
+    """将表达式树格式化为规范文本"""
+    kind = node[0]
+    if kind == 'term':
+        return terms[node[1]].label
+    if kind == 'not':
+        return f"NOT {_format_tree(node[1], terms)}"
+    joined = f" {kind.upper()} ".join(_format_tree(child, terms) for child in node[1])
+    return f"({joined})"
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+搜索结果缓存模块
+功能：记住每个文件版本上每个查询的匹配结果，重复搜索时不再读取和解码文件内容
+支持：
+1. 缓存键为（文件，文件大小、修改时间和文件头字节的哈希，规范化的查询），检查缓存只读取文件开头的字节
+2. 只保存紧凑的匹配行号、命中词条位图和行首时间
+3. 完全相同的查询直接返回；在已缓存查询上追加 AND 条件的查询只读取已缓存的匹配行
+4. 日志文件变大（只追加）时只搜索新增的字节
+"""
+
+import os
+import math
+import time
+import hashlib   # 文件头校验
+import mmap      # 内存映射
+import sqlite3   # 缓存数据库
+import zipfile   # 压缩包读取
+from array import array
+from log_cache import DEFAULT_CACHE_DIR
+from log_search import (match_log_time, seconds_of_day, time_from_seconds, detect_encoding,
+                        iter_query_lines, iter_file_lines_at, search_file_bytes, count_newlines,
+                        hits_time_range, HIT_CANCEL_CHECK)
+
+# 默认缓存数据库路径
+DEFAULT_RESULT_DB = os.path.join(DEFAULT_CACHE_DIR, "search_results.db")
+# 保留的缓存结果数量上限，超出时删除最久未使用的结果
+MAX_RESULTS = 500
+# 用于判断文件是否被替换（而不是追加）的文件头字节数
+HEAD_CHECK_SIZE = 4096
+# 命中词条用64位整数记录，词条更多的查询不缓存
+MAX_CACHED_TERMS = 64
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    file_key TEXT NOT NULL,
+    query TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    head_hash TEXT NOT NULL,
+    line_count INTEGER NOT NULL,
+    matches BLOB NOT NULL,
+    term_masks BLOB NOT NULL,
+    times BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (file_key, query)
+);
+'''
+
+
+def _read_head(local_path, member=None):
+    """读取文件（或zip成员）开头的 HEAD_CHECK_SIZE 字节"""
+    if member is None:
+        with open(local_path, 'rb') as f:
+            return f.read(HEAD_CHECK_SIZE)
+    with zipfile.ZipFile(local_path, 'r') as zip_ref:
+        with zip_ref.open(member) as stream:
+            return stream.read(HEAD_CHECK_SIZE)
+
+
+def _head_hash(head):
+    """计算文件头字节的哈希，用于判断文件是否被替换"""
+    return hashlib.md5(head).hexdigest()
+
+
+def source_version(local_path, member=None):
+    """
+    获取文件版本，只读取文件开头的字节，不读取和解码文件内容
+    Args:
+        local_path: 本地文件路径
+        member: zip成员名，版本使用压缩包的大小和修改时间以及成员开头的字节
+    Returns:
+        tuple: (大小, 修改时间, 文件头哈希)
+    """
+    stat = os.stat(local_path)
+    return stat.st_size, stat.st_mtime, _head_hash(_read_head(local_path, member))
+
+
+class _Matches:
+    """一个查询在一个文件上的匹配结果：行号（从1开始）、命中词条位图、行首时间（秒，没有时间为NaN）"""
+    def __init__(self, lines=None, masks=None, times=None):
+        self.lines = lines if lines is not None else array('I')
+        self.masks = masks if masks is not None else array('Q')
+        self.times = times if times is not None else array('d')
+
+    @classmethod
+    def from_row(cls, matches, term_masks, times):
+        result = cls()
+        result.lines.frombytes(matches)
+        result.masks.frombytes(term_masks)
+        result.times.frombytes(times)
+        return result
+
+    def truncate(self, line_num):
+        """删除指定行号及之后的匹配（需要重新扫描的部分）"""
+        keep = len(self.lines)
+        while keep and self.lines[keep - 1] >= line_num:
+            keep -= 1
+        del self.lines[keep:]
+        del self.masks[keep:]
+        del self.times[keep:]
+
+    def add_hits(self, hits, query, cancel_token=None):
+        """
+        追加匹配结果
+        Args:
+            hits: 可迭代对象，产生 (行号, 行内容, 命中的词条列表)
+            query: LogQuery 查询对象
+            cancel_token: 取消标记，每 HIT_CANCEL_CHECK 个匹配行检查一次
+        """
+        labels = {term.label: i for i, term in enumerate(query.terms)}
+        for count, (line_num, line, terms) in enumerate(hits, 1):
+            if cancel_token is not None and count % HIT_CANCEL_CHECK == 0:
+                cancel_token.check()
+            mask = 0
+            for label in terms:
+                mask |= 1 << labels[label]
+            _, time_obj = match_log_time(line)
+            self.lines.append(line_num)
+            self.masks.append(mask)
+            self.times.append(seconds_of_day(time_obj) if time_obj is not None else math.nan)
+
+    def time_range(self, query):
+        """
+        统计匹配行的最早和最晚时间（结果与 log_search.hits_time_range 相同）
+        Returns:
+            tuple: (最早时间, 最晚时间, [命中的词条列表, ...])
+        """
+        first_seconds = None
+        last_seconds = None
+        matched_terms = []
+        for mask, seconds in zip(self.masks, self.times):
+            matched_terms.append([term.label for i, term in enumerate(query.terms) if mask >> i & 1])
+            if not math.isnan(seconds):
+                if first_seconds is None or seconds < first_seconds:
+                    first_seconds = seconds
+                if last_seconds is None or seconds > last_seconds:
+                    last_seconds = seconds
+        first_time = time_from_seconds(first_seconds) if first_seconds is not None else None
+        last_time = time_from_seconds(last_seconds) if last_seconds is not None else None
+        return first_time, last_time, matched_terms
+
+
+class SearchResultCache:
+    """
+    搜索结果缓存
+    SQLite连接不能跨线程共享，每个线程应使用单独的对象
+    """
+    def __init__(self, db_path=None):
+        """
+        打开或创建缓存数据库
+        Args:
+            db_path: 数据库路径，默认为 DEFAULT_RESULT_DB
+        """
+        self.db_path = db_path or DEFAULT_RESULT_DB
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=30)
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def close(self):
+        """关闭数据库连接"""
+        self.conn.close()
+
+    def lookup(self, file_key, version, query):
+        """
+        查找同一文件版本上相同查询的缓存结果，不读取文件内容
+        Args:
+            file_key: 文件标识（本地路径，zip成员为 zip路径::成员名）
+            version: source_version 的返回值
+            query: LogQuery 查询对象
+        Returns:
+            tuple: (最早时间, 最晚时间, [命中的词条列表, ...])，没有缓存时返回None
+        """
+        if len(query.terms) > MAX_CACHED_TERMS:
+            return None
+        query_text = query.normalized()
+        row = self.conn.execute(
+            'SELECT size, mtime, head_hash, matches, term_masks, times '
+            'FROM results WHERE file_key = ? AND query = ?', (file_key, query_text)).fetchone()
+        if not row or tuple(row[:3]) != tuple(version):
+            return None
+        self._touch(file_key, query_text)
+        return _Matches.from_row(row[3], row[4], row[5]).time_range(query)
+
+    def store(self, file_key, version, query, hits, cancel_token=None):
+        """
+        保存一次完整搜索的匹配结果（用于zip成员等不会追加内容的文件）
+        Args:
+            file_key: 文件标识
+            version: source_version 的返回值（搜索前获取）
+            query: LogQuery 查询对象
+            hits: 可迭代对象，产生 (行号, 行内容, 命中的词条列表)
+            cancel_token: 取消标记
+        Returns:
+            tuple: (最早时间, 最晚时间, [命中的词条列表, ...])
+        """
+        if len(query.terms) > MAX_CACHED_TERMS:
+            return hits_time_range(hits, cancel_token)
+        matches = _Matches()
+        matches.add_hits(hits, query, cancel_token)
+        self._store(file_key, query.normalized(), version, 0, matches)
+        return matches.time_range(query)
+
+    def search_file(self, local_path, query, cancel_token=None):
+        """
+        在本地普通日志文件中查找满足查询的行，并统计这些行的最早和最晚时间（结果与 log_search.hits_time_range 相同）
+        先按文件版本检查缓存，命中时只读取文件开头的字节；文件只是被追加时只搜索新增的字节；
+        已缓存较宽的查询时只读取和解码这些匹配行
+
+        Args:
+            local_path: 本地文件路径
+            query: LogQuery 查询对象
+            cancel_token: 取消标记
+        Returns:
+            tuple: (最早时间, 最晚时间, [命中的词条列表, ...])
+        """
+        if len(query.terms) > MAX_CACHED_TERMS:
+            return hits_time_range(search_file_bytes(local_path, query), cancel_token)
+
+        stat = os.stat(local_path)
+        head = _read_head(local_path)
+        version = (stat.st_size, stat.st_mtime, _head_hash(head))
+        query_text = query.normalized()
+        row = self.conn.execute(
+            'SELECT size, mtime, head_hash, line_count, matches, term_masks, times '
+            'FROM results WHERE file_key = ? AND query = ?', (local_path, query_text)).fetchone()
+
+        if row and tuple(row[:3]) == version:
+            # 同一文件版本上的相同查询
+            self._touch(local_path, query_text)
+            return _Matches.from_row(row[4], row[5], row[6]).time_range(query)
+
+        if (row and row[3] > 0 and stat.st_size >= row[0]
+                and _head_hash(head[:row[0]]) == row[2]):
+            # 文件只是被追加：上次没有换行符的末行可能不完整，从该行开始重新搜索
+            matches = _Matches.from_row(row[4], row[5], row[6])
+            matches.truncate(row[3] + 1)
+            line_count = self._scan_file(local_path, query, matches, cancel_token, row[0], row[3])
+        else:
+            narrower = self._narrower_candidates(local_path, version, query)
+            matches = _Matches()
+            if narrower is not None:
+                # 只读取已缓存的较宽查询的匹配行
+                candidates, line_count = narrower
+                hits = ((line_num, line, terms)
+                        for line_num, line in iter_file_lines_at(local_path, candidates)
+                        for terms in [query.match_terms(line)]
+                        if terms is not None and line)
+                matches.add_hits(hits, query, cancel_token)
+            else:
+                line_count = self._scan_file(local_path, query, matches, cancel_token)
+
+        self._store(local_path, query_text, version, line_count, matches)
+        return matches.time_range(query)
+
+    def _scan_file(self, local_path, query, matches, cancel_token, old_size=0, old_line_count=0):
+        """
+        在文件字节上搜索（内存映射，只解码匹配的行），从上次搜索的最后一个完整行之后开始
+        Returns:
+            int: 完整行（以换行符结束）的数量，下次追加时从这些行之后开始搜索
+        """
+        with open(local_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return 0
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                encoding = detect_encoding(data)
+                start = data.rfind(b'\n', 0, old_size) + 1 if old_size else 0
+                matches.add_hits(iter_query_lines(data, query, encoding, start, old_line_count + 1),
+                                 query, cancel_token)
+                return old_line_count + count_newlines(data, start, data.rfind(b'\n') + 1)
+
+    def _narrower_candidates(self, file_key, version, query):
+        """
+        查询形如 A AND B 时，如果 A（或 B）在同一文件版本上已有缓存结果，
+        满足查询的行一定在这些结果中，只需要检查这些行
+        Returns:
+            tuple: (候选行号数组, 完整行数)，没有可用的缓存时返回None
+        """
+        best = None
+        for conjunct in query.conjuncts():
+            row = self.conn.execute(
+                'SELECT size, mtime, head_hash, line_count, matches FROM results '
+                'WHERE file_key = ? AND query = ?', (file_key, conjunct)).fetchone()
+            if not row or tuple(row[:3]) != tuple(version):
+                continue
+            lines = array('I')
+            lines.frombytes(row[4])
+            if best is None or len(lines) < len(best[0]):
+                best = (lines, row[3])
+        return best
+
+    def _touch(self, file_key, query_text):
+        self.conn.execute('UPDATE results SET last_used = ? WHERE file_key = ? AND query = ?',
+                          (time.time(), file_key, query_text))
+        self.conn.commit()
+
+    def _store(self, file_key, query_text, version, line_count, matches):
+        """保存匹配结果，并删除最久未使用的结果"""
+        size, mtime, head_hash = version
+        self.conn.execute(
+            'INSERT OR REPLACE INTO results (file_key, query, size, mtime, head_hash, line_count, '
+            'matches, term_masks, times, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (file_key, query_text, size, mtime, head_hash, line_count, matches.lines.tobytes(),
+             matches.masks.tobytes(), matches.times.tobytes(), time.time()))
+        self.conn.execute(
+            'DELETE FROM results WHERE rowid NOT IN '
+            '(SELECT rowid FROM results ORDER BY last_used DESC LIMIT ?)', (MAX_RESULTS,))
+        self.conn.commit()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+搜索结果存储模块
+功能：以紧凑的数组保存大量搜索结果，供结果列表按需读取和格式化
+支持：
+1. 所有行的文本以UTF-8拼接在一个 bytearray 中，按偏移读取
+2. 行类型、来源文件、行号、时间使用 array 保存，每行只占几十个字节
+3. 来源文件只保存一次，各行保存编号
+4. 每行记录来源文件和行号（或时间），用于在日志查看窗口中打开
+"""
+
+import math
+from array import array
+from log_search import seconds_of_day
+
+# 行类型
+ROW_HEADER = 0  # 分组标题，例如“搜索关键字: xxx”
+ROW_BLOCK = 2   # 时间范围内日志块中的一行
+
+
+class ResultStore:
+    """搜索结果存储"""
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """清空所有结果"""
+        self._text = bytearray()
+        self._offsets = array('Q', [0])
+        self._kinds = array('B')
+        self._sources = array('I')    # 来源编号，0表示没有来源
+        self._line_nums = array('I')  # 行号（从1开始），0表示未知
+        self._times = array('d')      # 行首时间（相对当天零点的秒数），NaN表示未知
+        self._source_list = [None]    # (文件路径, zip成员名)
+        self._source_ids = {}
+
+    def __len__(self):
+        return len(self._kinds)
+
+    def _intern_source(self, source):
+        if source is None:
+            return 0
+        source_id = self._source_ids.get(source)
+        if source_id is None:
+            source_id = len(self._source_list)
+            self._source_list.append(source)
+            self._source_ids[source] = source_id
+        return source_id
+
+    def _append(self, kind, text, source_id=0, line_num=0, seconds=math.nan):
+        self._text += text.encode('utf-8')
+        self._offsets.append(len(self._text))
+        self._kinds.append(kind)
+        self._sources.append(source_id)
+        self._line_nums.append(line_num)
+        self._times.append(seconds)
+
+    def add_header(self, text):
+        """添加分组标题"""
+        self._append(ROW_HEADER, text)
+
+    def add_line(self, text):
+        """添加一行没有来源位置的文本"""
+        self._append(ROW_BLOCK, text)
+
+    def add_block(self, path, member, time_obj, block_text):
+        """
+        添加一个日志块，块中的每一行作为一行结果
+        Args:
+            path: 日志文件路径（本地或远程），None表示没有可以打开的来源文件
+            member: zip包中的成员名，普通文件为None
+            time_obj: 日志块的时间
+            block_text: 日志块文本
+        """
+        source_id = self._intern_source((path, member)) if path else 0
+        seconds = seconds_of_day(time_obj)
+        for line in block_text.split('\n'):
+            self._append(ROW_BLOCK, line, source_id, 0, seconds)
+
+    def kind(self, row):
+        return self._kinds[row]
+
+    def content(self, row):
+        """获取一行的原始内容"""
+        return self._text[self._offsets[row]:self._offsets[row + 1]].decode('utf-8')
+
+    def text(self, row):
+        """获取一行的显示文本"""
+        return self.content(row)
+
+    def target(self, row):
+        """
+        获取一行对应的日志位置
+        Returns:
+            tuple: (文件路径, zip成员名, 行号或None, 时间秒数或None)，标题行返回None
+        """
+        source = self._source_list[self._sources[row]]
+        if source is None:
+            return None
+        line_num = self._line_nums[row] or None
+        seconds = self._times[row]
+        return source[0], source[1], line_num, None if math.isnan(seconds) else seconds
@@ -0,0 +1,858 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日志搜索辅助模块
+功能：提供与界面无关的日志搜索与时间线处理工具
+支持：
+1. 行首时间戳解析
+2. 按时间范围提取日志块：每个文件版本只切分一次日志块，块的开始位置和时间保存在紧凑数组中
+3. 多个文件时间线的流式归并
+4. 一次检测编码、直接在字节上搜索关键字，支持多词条和布尔查询（见 log_query）
+5. 直接以解压流的方式搜索zip包内的日志文件，不落盘
+6. 以流的方式逐行读取本地文件或zip包成员，供统计、模板提取等单遍处理使用
+"""
+
+import io
+import os
+import math
+import contextlib
+import bisect    # 二分查找
+import heapq     # 堆归并
+import mmap      # 内存映射文件
+import re        # 正则表达式
+import threading # 日志块索引缓存锁
+import zipfile   # 压缩包读取
+from array import array  # 紧凑数组
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor  # 并行搜索压缩包成员
+from datetime import datetime, timedelta
+
+# 行首时间戳格式，支持有无毫秒的情况
+TIME_PATTERN = r'^(\d{2}:\d{2}:\d{2}(?:\.\d{3})?)'
+_time_regex = re.compile(TIME_PATTERN)
+
+
+def parse_log_time(time_str):
+    """
+    解析日志行首的时间字符串
+    Args:
+        time_str: HH:MM:SS 或 HH:MM:SS.fff 格式的时间字符串
+    Returns:
+        datetime: 解析后的时间对象
+    Raises:
+        ValueError: 时间格式不正确
+    """
+    if '.' in time_str:
+        # 含有毫秒的时间格式 HH:MM:SS.fff
+        return datetime.strptime(time_str, '%H:%M:%S.%f')
+    # 不含毫秒的时间格式 HH:MM:SS
+    return datetime.strptime(time_str, '%H:%M:%S')
+
+
+def match_log_time(line):
+    """
+    提取一行日志的行首时间
+    Args:
+        line: 日志行
+    Returns:
+        tuple: (时间字符串, 时间对象)，没有时间戳或解析失败时返回 (None, None)
+    """
+    match = _time_regex.search(line)
+    if not match:
+        return None, None
+    time_str = match.group(1)
+    try:
+        return time_str, parse_log_time(time_str)
+    except ValueError:
+        return time_str, None
+
+
+class LogBlockIndex:
+    """
+    单个文件的日志块索引
+    一次扫描把内容切分为日志块：每个以时间戳开头的行是一个日志块的开始，后续没有时间戳的行
+    都属于该块（不限制行数），第一个时间戳之前的行不属于任何日志块。
+    每个日志块只记录开始行号和时间（当天秒数），保存在紧凑数组中；日志块的结束即下一个块的开始。
+    时间按顺序排列时（绝大多数日志）用二分查找确定时间范围内的日志块，否则逐个比较时间数组。
+    """
+    def __init__(self, content_lines):
+        """
+        Args:
+            content_lines: 文件内容行列表
+        """
+        self.lines = content_lines
+        self._reset()
+        for i, line in enumerate(content_lines):
+            time_str, time_obj = match_log_time(line.strip())
+            if time_str is None:
+                continue
+            self._add_block(i, seconds_of_day(time_obj) if time_obj is not None else math.nan)
+
+    def _reset(self):
+        self.starts = array('q')  # 每个日志块的开始位置（行号，LogFileBlockIndex 中为字节偏移）
+        self.times = array('d')   # 每个日志块的时间（当天秒数），时间无法解析时为 NaN
+        self.ordered = True       # 日志块的时间是否按顺序排列
+
+    def _add_block(self, start, seconds):
+        """记录一个日志块的开始位置和时间"""
+        if math.isnan(seconds) or (self.times and seconds < self.times[-1]):
+            self.ordered = False
+        self.starts.append(start)
+        self.times.append(seconds)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def block_bounds(self, number):
+        """
+        日志块的行范围
+        Returns:
+            tuple: (开始行号, 结束行号（不包含）)
+        """
+        end = self.starts[number + 1] if number + 1 < len(self.starts) else len(self.lines)
+        return self.starts[number], end
+
+    def window(self, earliest_time, latest_time):
+        """
+        时间范围内的日志块编号，按文件中的顺序
+        Args:
+            earliest_time: 时间范围开始
+            latest_time: 时间范围结束
+        Returns:
+            iterable: 日志块编号
+        """
+        low = seconds_of_day(earliest_time)
+        high = seconds_of_day(latest_time)
+        if self.ordered:
+            return range(bisect.bisect_left(self.times, low), bisect.bisect_right(self.times, high))
+        # NaN 与任何时间比较都不成立，无法解析时间的日志块不会被选中
+        return [number for number, seconds in enumerate(self.times) if low <= seconds <= high]
+
+    def iter_blocks(self, prefix, earliest_time, latest_time):
+        """
+        按顺序生成时间范围内的日志块
+        Args:
+            prefix: 日志前缀，例如 RsuLogic
+            earliest_time: 时间范围开始
+            latest_time: 时间范围结束
+        Yields:
+            tuple: (时间对象, 添加前缀后的日志块文本)
+        """
+        for number in self.window(earliest_time, latest_time):
+            start, end = self.block_bounds(number)
+            first_line = self.lines[start].strip()
+            _, time_obj = match_log_time(first_line)
+            # 只为第一行添加前缀，其他行保持原样
+            block_lines = [f"[{prefix}] {first_line}"]
+            block_lines.extend(self.lines[start + 1:end])
+            yield time_obj, '\n'.join(block_lines)
+
+
+# 在原始字节中查找以时间戳开头的行（与 TIME_PATTERN 对应，行首空白在比较前会被去除）
+_BLOCK_START_REGEX = re.compile(rb'^[ \t]*(\d{2}):(\d{2}):(\d{2})(?:\.(\d{3}))?', re.M)
+
+
+class LogFileBlockIndex(LogBlockIndex):
+    """
+    本地日志文件（或zip成员）的日志块索引
+    切分方式与 LogBlockIndex 相同，但直接扫描原始字节，只记录每个日志块的字节偏移和时间，不解码文件内容；
+    提取时间范围时只读取和解码范围内的日志块。通过 file_block_index 获取，每个文件版本只建立一次。
+    """
+    def __init__(self, local_path, member=None):
+        """
+        Args:
+            local_path: 本地文件路径
+            member: zip成员名，普通文件为None
+        """
+        self.local_path = local_path
+        self.member = member
+        self._reset()
+        self.size = 0  # 已扫描的字节数，最后为文件大小
+        with self._open() as stream:
+            # 编码检测方式与 iter_member_lines 相同
+            if member is None:
+                self.encoding = _file_encoding(stream)
+            else:
+                self.encoding = _sample_encoding(stream.read(ENCODING_SAMPLE_SIZE))
+                stream.seek(0)
+            pending = b''
+            while True:
+                chunk = stream.read(STREAM_CHUNK_SIZE)
+                data = pending + chunk
+                if chunk:
+                    # 只扫描完整的行，剩余部分与下一个数据块拼接
+                    cut = data.rfind(b'\n') + 1
+                    data, pending = data[:cut], data[cut:]
+                for match in _BLOCK_START_REGEX.finditer(data):
+                    self._add_block(self.size + match.start(), _match_seconds(match))
+                self.size += len(data)
+                if not chunk:
+                    break
+
+    @contextlib.contextmanager
+    def _open(self):
+        """打开文件或zip成员的二进制流"""
+        if self.member is None:
+            with open(self.local_path, 'rb') as f:
+                yield f
+            return
+        with zipfile.ZipFile(self.local_path, 'r') as zip_ref:
+            with zip_ref.open(self.member) as stream:
+                yield stream
+
+    def block_bounds(self, number):
+        """
+        日志块的字节范围
+        Returns:
+            tuple: (开始偏移, 结束偏移（不包含）)
+        """
+        end = self.starts[number + 1] if number + 1 < len(self.starts) else self.size
+        return self.starts[number], end
+
+    def iter_blocks(self, prefix, earliest_time, latest_time):
+        """
+        按顺序生成时间范围内的日志块，只读取和解码这些日志块
+        Args:
+            prefix: 日志前缀，例如 RsuLogic
+            earliest_time: 时间范围开始
+            latest_time: 时间范围结束
+        Yields:
+            tuple: (时间对象, 添加前缀后的日志块文本)
+        """
+        numbers = self.window(earliest_time, latest_time)
+        if not len(numbers):
+            return
+        with self._open() as stream:
+            for number in numbers:
+                start, end = self.block_bounds(number)
+                # 日志块按偏移递增，zip成员只需要向前解压
+                stream.seek(start)
+                text = stream.read(end - start).decode(self.encoding, errors='replace')
+                # 与流式读取相同的换行规则（\r、\n、\r\n），每行去除首尾空白
+                block_lines = [line.strip() for line in io.StringIO(text, newline=None)]
+                _, time_obj = match_log_time(block_lines[0])
+                # 只为第一行添加前缀，其他行保持原样
+                block_lines[0] = f"[{prefix}] {block_lines[0]}"
+                yield time_obj, '\n'.join(block_lines)
+
+
+def _match_seconds(match):
+    """
+    _BLOCK_START_REGEX 匹配到的行首时间（当天秒数），与 parse_log_time 的结果一致，无效时间为 NaN
+    """
+    hour, minute, second = int(match.group(1)), int(match.group(2)), int(match.group(3))
+    if hour >= 24 or minute >= 60 or second >= 60:
+        return math.nan
+    millis = int(match.group(4)) if match.group(4) else 0
+    # 与 timedelta.total_seconds 的计算方式相同，保证与 seconds_of_day 的结果完全一致
+    return ((hour * 3600 + minute * 60 + second) * 10**6 + millis * 1000) / 10**6
+
+
+def _file_encoding(f):
+    """根据开头、中间和结尾的采样检测已打开的本地文件的编码"""
+    if os.fstat(f.fileno()).st_size == 0:
+        return 'utf-8'
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return detect_encoding(data)
+
+
+def _sample_encoding(head):
+    """根据流开头的采样检测编码，采样截断到完整的行，避免多字节字符被截断导致误判"""
+    end = head.rfind(b'\n')
+    return detect_encoding(head[:end + 1] if end >= 0 else head)
+
+
+# 保留在内存中的日志块索引数量（每个日志块16字节）
+BLOCK_INDEX_CACHE_SIZE = 32
+_block_index_cache = OrderedDict()  # (本地路径, zip成员名) -> (大小, 修改时间, 索引)
+_block_index_lock = threading.Lock()
+
+
+def file_block_index(local_path, member=None):
+    """
+    获取本地日志文件（或zip成员）的日志块索引
+    索引按文件版本（大小和修改时间）缓存，同一版本上的多次搜索和提取只切分一次日志块
+
+    Args:
+        local_path: 本地文件路径
+        member: zip成员名，普通文件为None
+    Returns:
+        LogFileBlockIndex: 日志块索引
+    """
+    stat = os.stat(local_path)
+    key = (local_path, member)
+    version = (stat.st_size, stat.st_mtime)
+    with _block_index_lock:
+        cached = _block_index_cache.get(key)
+        if cached is not None and cached[:2] == version:
+            _block_index_cache.move_to_end(key)
+            return cached[2]
+    index = LogFileBlockIndex(local_path, member)
+    with _block_index_lock:
+        _block_index_cache[key] = (version[0], version[1], index)
+        _block_index_cache.move_to_end(key)
+        while len(_block_index_cache) > BLOCK_INDEX_CACHE_SIZE:
+            _block_index_cache.popitem(last=False)
+    return index
+
+
+def iter_time_window_blocks(content_lines, prefix, earliest_time, latest_time):
+    """
+    按顺序生成内存中日志行的时间范围内的日志块（本地文件使用 file_block_index）
+    每个以时间戳开头的行作为一个日志块的开始，后续没有时间戳的行视为该块的延续
+
+    Args:
+        content_lines: 文件内容行列表
+        prefix: 日志前缀，例如 RsuLogic
+        earliest_time: 时间范围开始
+        latest_time: 时间范围结束
+    Yields:
+        tuple: (时间对象, 添加前缀后的日志块文本)
+    """
+    return LogBlockIndex(content_lines).iter_blocks(prefix, earliest_time, latest_time)
+
+
+def iter_stream_time_window_blocks(lines, prefix, earliest_time, latest_time):
+    """
+    以流的方式生成时间范围内的日志块，与 LogBlockIndex 的切分方式相同，内存中只保留当前日志块
+    用于导出等不能把整个文件读入内存的场合
+    Args:
+        lines: 日志行的可迭代对象
+        prefix: 日志前缀，例如 RsuLogic
+        earliest_time: 时间范围开始
+        latest_time: 时间范围结束
+    Yields:
+        tuple: (时间对象, 添加前缀后的日志块文本)
+    """
+    block_lines = None
+    block_time = None
+    for line in lines:
+        stripped = line.strip()
+        time_str, time_obj = match_log_time(stripped)
+        if time_str is None:
+            if block_lines is not None:
+                block_lines.append(line)
+            continue
+        if block_lines is not None:
+            yield block_time, '\n'.join(block_lines)
+        block_lines = None
+        if time_obj is not None and earliest_time <= time_obj <= latest_time:
+            block_lines = [f"[{prefix}] {stripped}"]
+            block_time = time_obj
+    if block_lines is not None:
+        yield block_time, '\n'.join(block_lines)
+
+
+def merge_timelines(streams):
+    """
+    将多个已按时间排序的日志块流归并为一条全局时间线
+    使用基于堆的K路归并，内存占用只与流的数量有关，结果可以边生成边输出。
+    时间相同的日志块按流的先后顺序输出，与对全部结果做稳定排序的效果一致。
+
+    Args:
+        streams: 可迭代对象列表，每个元素产生 (时间对象, 日志块文本)
+    Returns:
+        iterator: 按时间排序的 (时间对象, 日志块文本)
+    """
+    return heapq.merge(*streams, key=lambda item: item[0])
+
+
+def tag_stream(stream, tag):
+    """
+    为日志块流中的每一项附加来源标识，归并后仍可以知道日志块来自哪个文件
+    Yields:
+        tuple: (时间对象, 日志块文本, 来源标识)
+    """
+    for time_obj, block_text in stream:
+        yield time_obj, block_text, tag
+
+
+# 编码检测时每段采样的字节数
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+
+def sample_bytes(data, size=ENCODING_SAMPLE_SIZE):
+    """
+    从文件内容的开头、中间和结尾各取一段用于编码检测
+    每段都截断到完整的行，避免多字节字符被截断导致误判
+    Args:
+        data: 字节内容（bytes或mmap）
+        size: 每段采样的字节数
+    Returns:
+        list: 采样片段列表
+    """
+    total = len(data)
+    if total <= size * 3:
+        return [bytes(data[:total])]
+
+    samples = []
+    for start in (0, (total - size) // 2, total - size):
+        chunk = bytes(data[start:start + size])
+        if start > 0:
+            # 丢弃第一个不完整的行
+            chunk = chunk[chunk.find(b'\n') + 1:]
+        end = chunk.rfind(b'\n')
+        if end >= 0:
+            chunk = chunk[:end + 1]
+        samples.append(chunk)
+    return samples
+
+
+def detect_encoding(data):
+    """
+    根据采样内容检测日志文件编码，只检测一次
+    依次尝试UTF-8和GBK，都失败时使用latin1（可处理任何字节）
+    Args:
+        data: 字节内容（bytes或mmap）
+    Returns:
+        str: 编码名称
+    """
+    samples = sample_bytes(data)
+    for encoding in ('utf-8', 'gbk'):
+        try:
+            for chunk in samples:
+                chunk.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin1'
+
+
+def decode_log_bytes(data):
+    """
+    解码日志字节内容
+    先根据采样检测编码，再整体解码一次，个别无法解码的字节用替换字符代替
+    Args:
+        data: 字节内容
+    Returns:
+        str: 解码后的文本
+    """
+    return data.decode(detect_encoding(data), errors='replace')
+
+
+def decode_log_lines(data):
+    """
+    解码日志字节内容并拆分为去除首尾空白的行列表
+    Args:
+        data: 字节内容
+    Returns:
+        list: 日志行列表
+    """
+    return [line.strip() for line in decode_log_bytes(data).splitlines()]
+
+
+def read_log_lines(file_path):
+    """
+    读取本地日志文件并拆分为行列表，只读取和解码一次
+    Args:
+        file_path: 本地文件路径
+    Returns:
+        list: 日志行列表
+    """
+    with open(file_path, 'rb') as f:
+        return decode_log_lines(f.read())
+
+
+def iter_keyword_lines(data, keyword, encoding, ignore_case=False, start=0, first_line=1):
+    """
+    直接在字节内容中搜索关键字，只解码匹配的行
+    关键字先按文件编码转换为字节，搜索由正则引擎在字节上完成。
+    GBK双字节字符的第二个字节可能落在ASCII范围内，因此命中的行解码后会再次确认。
+
+    Args:
+        data: 字节内容（bytes或mmap）
+        keyword: 搜索关键字
+        encoding: 内容编码
+        ignore_case: 是否忽略大小写（只对ASCII字母在字节层面生效）
+        start: 开始搜索的偏移（必须是行首），用于只搜索文件新追加的部分
+        first_line: start 处的行号
+    Yields:
+        tuple: (行号, 去除首尾空白的行内容)
+    """
+    try:
+        keyword_bytes = keyword.encode(encoding)
+    except UnicodeEncodeError:
+        # 关键字无法用该编码表示，不可能出现在内容中
+        return
+    if not keyword_bytes:
+        return
+
+    flags = re.IGNORECASE if ignore_case else 0
+    pattern = re.compile(re.escape(keyword_bytes), flags)
+    folded_keyword = keyword.lower()
+    total = len(data)
+    line_num = first_line
+    counted = start  # 已统计换行符的位置
+    pos = start
+    while pos < total:
+        match = pattern.search(data, pos)
+        if not match:
+            break
+        line_start = data.rfind(b'\n', 0, match.start()) + 1
+        line_end = data.find(b'\n', match.end())
+        if line_end < 0:
+            line_end = total
+        # mmap没有count方法，按区间切片统计（每个字节只复制一次）
+        line_num += data[counted:line_start].count(b'\n')
+        counted = line_start
+
+        line = data[line_start:line_end].decode(encoding, errors='replace').strip()
+        if ignore_case:
+            found = folded_keyword in line.lower()
+        else:
+            found = keyword in line
+        if found:
+            yield line_num, line
+        pos = line_end + 1
+
+
+def iter_query_lines(data, query, encoding, start=0, first_line=1):
+    """
+    在字节内容中按查询条件查找日志行
+    单个关键字的查询直接在字节上搜索，只解码命中的行；
+    多词条或布尔查询整体解码一次，再由合并后的正则逐行判断。
+
+    Args:
+        data: 字节内容（bytes或mmap）
+        query: LogQuery 查询对象
+        encoding: 内容编码
+        start: 开始搜索的偏移（必须是行首）
+        first_line: start 处的行号
+    Yields:
+        tuple: (行号, 行内容, 命中的词条列表)
+    """
+    literal = query.literal()
+    if literal is not None:
+        keyword, case_sensitive = literal
+        label = query.terms[0].label
+        for line_num, line in iter_keyword_lines(data, keyword, encoding, not case_sensitive,
+                                                 start, first_line):
+            yield line_num, line, [label]
+        return
+
+    text = bytes(data[start:]).decode(encoding, errors='replace')
+    for line_num, line in enumerate(text.split('\n'), first_line):
+        line = line.strip()
+        terms = query.match_terms(line)
+        if terms is not None and line:
+            yield line_num, line, terms
+
+
+def search_file_bytes(file_path, query):
+    """
+    使用内存映射在本地文件中按查询条件搜索
+    Args:
+        file_path: 本地文件路径
+        query: LogQuery 查询对象
+    Yields:
+        tuple: (行号, 行内容, 命中的词条列表)
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            encoding = detect_encoding(data)
+            for result in iter_query_lines(data, query, encoding):
+                yield result
+
+
+# 流式搜索时每次读取的字节数
+STREAM_CHUNK_SIZE = 4 * 1024 * 1024
+# 统计匹配行时每处理多少行检查一次取消标记
+HIT_CANCEL_CHECK = 1000
+
+
+def count_newlines(data, start=0, end=None):
+    """
+    统计字节内容中一段区间的换行符数量
+    mmap没有count方法，按数据块切片统计，内存占用与内容大小无关
+    """
+    end = len(data) if end is None else end
+    count = 0
+    for pos in range(start, end, STREAM_CHUNK_SIZE):
+        count += data[pos:min(pos + STREAM_CHUNK_SIZE, end)].count(b'\n')
+    return count
+
+
+def iter_file_lines_at(file_path, line_nums):
+    """
+    读取本地文件中指定行号的行，只解码这些行
+    目标行之前的内容按数据块统计换行符后跳过，不逐行处理
+    Args:
+        file_path: 本地文件路径
+        line_nums: 按顺序排列的行号（从1开始，行号的含义与 search_file_bytes 一致）
+    Yields:
+        tuple: (行号, 去除首尾空白的行内容)
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            encoding = detect_encoding(data)
+            total = len(data)
+            line_num = 1
+            pos = 0  # 第 line_num 行的行首
+            for target in line_nums:
+                while line_num < target:
+                    chunk_end = min(pos + STREAM_CHUNK_SIZE, total)
+                    if chunk_end == pos:
+                        return
+                    newlines = data[pos:chunk_end].count(b'\n')
+                    if line_num + newlines < target:
+                        line_num += newlines
+                        pos = chunk_end
+                        continue
+                    # 目标行在这个数据块中，逐行前进
+                    while line_num < target:
+                        pos = data.find(b'\n', pos) + 1
+                        line_num += 1
+                end = data.find(b'\n', pos)
+                if end < 0:
+                    end = total
+                yield target, data[pos:end].decode(encoding, errors='replace').strip()
+
+
+def iter_stream_query_lines(stream, query, chunk_size=STREAM_CHUNK_SIZE, cancel_token=None):
+    """
+    以数据块的方式在二进制流中按查询条件搜索，内存占用与流的大小无关
+    编码根据第一个数据块检测一次，跨数据块的行会拼接完整后再搜索。
+
+    Args:
+        stream: 可读的二进制流，例如zip成员或SFTP文件
+        query: LogQuery 查询对象
+        chunk_size: 每次读取的字节数
+        cancel_token: 取消标记，每个数据块检查一次
+    Yields:
+        tuple: (行号, 行内容, 命中的词条列表)
+    """
+    encoding = None
+    pending = b''
+    line_base = 0  # 当前数据块之前的行数
+    while True:
+        if cancel_token is not None:
+            cancel_token.check()
+        chunk = stream.read(chunk_size)
+        if chunk:
+            data = pending + chunk
+            cut = data.rfind(b'\n') + 1
+            if cut == 0:
+                # 还没有读到完整的行
+                pending = data
+                continue
+            data, pending = data[:cut], data[cut:]
+        else:
+            data, pending = pending, b''
+        if data:
+            if encoding is None:
+                encoding = detect_encoding(data)
+            for line_num, line, terms in iter_query_lines(data, query, encoding):
+                yield line_base + line_num, line, terms
+            line_base += data.count(b'\n')
+        if not chunk:
+            break
+
+
+def zip_log_members(zip_ref):
+    """
+    列出压缩包中的日志文件
+    Args:
+        zip_ref: 已打开的ZipFile对象
+    Returns:
+        list: .log 成员名称列表
+    """
+    return [name for name in zip_ref.namelist() if name.lower().endswith('.log')]
+
+
+def log_prefix(file_name, default='LOG'):
+    """提取日志文件前缀，例如从 "RsuLogic_2025-03-31.log" 提取 "RsuLogic" """
+    match = re.match(r'([^_]+)_?', file_name)
+    return match.group(1) if match else default
+
+
+def _iter_text_lines(stream, encoding):
+    """把二进制流按指定编码逐行解码，去除首尾空白"""
+    for line in io.TextIOWrapper(stream, encoding=encoding, errors='replace'):
+        yield line.strip()
+
+
+def _zip_member_lines(zip_ref, name):
+    """逐行读取zip包的一个成员，先采样检测一次编码"""
+    with zip_ref.open(name) as stream:
+        encoding = _sample_encoding(stream.read(ENCODING_SAMPLE_SIZE))
+    with zip_ref.open(name) as stream:
+        yield from _iter_text_lines(stream, encoding)
+
+
+def _file_lines(local_path):
+    """逐行读取本地日志文件，先检测一次编码"""
+    with open(local_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        encoding = _file_encoding(f)
+        yield from _iter_text_lines(f, encoding)
+
+
+def iter_log_sources(local_path):
+    """
+    以流的方式逐行读取本地日志文件，zip包按成员逐个读取，不整体解码到内存
+    每个文件或成员先采样检测一次编码；必须读完一个成员的行再取下一个成员
+    Args:
+        local_path: 本地文件路径（.log 或 .zip）
+    Yields:
+        tuple: (zip成员名，普通文件为None, 行迭代器)
+    """
+    if local_path.lower().endswith('.zip'):
+        with zipfile.ZipFile(local_path, 'r') as zip_ref:
+            for name in zip_log_members(zip_ref):
+                yield name, _zip_member_lines(zip_ref, name)
+        return
+    yield None, _file_lines(local_path)
+
+
+def log_source_members(local_path):
+    """
+    列出本地日志文件中可以读取的来源
+    Returns:
+        list: zip包返回日志成员名列表，普通文件返回 [None]
+    """
+    if local_path.lower().endswith('.zip'):
+        with zipfile.ZipFile(local_path, 'r') as zip_ref:
+            return zip_log_members(zip_ref)
+    return [None]
+
+
+def iter_member_lines(local_path, member=None):
+    """
+    以流的方式逐行读取一个本地日志文件或zip成员
+    每次调用单独打开文件，多个文件和成员的行迭代器可以交替读取（用于按时间归并）
+    Args:
+        local_path: 本地文件路径
+        member: zip成员名，普通文件为None
+    Yields:
+        str: 去除首尾空白的日志行
+    """
+    if member is None:
+        yield from _file_lines(local_path)
+        return
+    with zipfile.ZipFile(local_path, 'r') as zip_ref:
+        yield from _zip_member_lines(zip_ref, member)
+
+
+def search_zip_member(zip_path, member_name, query, cancel_token=None):
+    """
+    以解压流的方式在压缩包的单个成员中搜索
+    每次调用单独打开压缩包，可以在多个线程中同时使用
+
+    Returns:
+        list: (行号, 行内容, 命中的词条列表) 列表
+    """
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        with zip_ref.open(member_name) as stream:
+            return list(iter_stream_query_lines(stream, query, cancel_token=cancel_token))
+
+
+def search_zip_members(zip_path, query, max_workers=4, members=None, cancel_token=None):
+    """
+    在压缩包的日志文件中搜索，不解压到磁盘
+    成员较多时按成员并行搜索，zlib解压时会释放GIL
+
+    Args:
+        zip_path: 本地压缩包路径
+        query: LogQuery 查询对象
+        max_workers: 最大并行线程数，为1时顺序搜索
+        members: 要搜索的成员名称列表，None表示所有日志文件（见 zip_log_members）
+        cancel_token: 取消标记，每个成员每读取一个数据块检查一次
+    Returns:
+        list: (成员名称, [(行号, 行内容, 命中的词条列表), ...]) 列表，顺序与 members（或压缩包）中一致
+    """
+    if members is None:
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            members = zip_log_members(zip_ref)
+    if not members:
+        return []
+
+    def search(name):
+        return search_zip_member(zip_path, name, query, cancel_token)
+
+    workers = min(max_workers, len(members))
+    if workers <= 1:
+        return [(name, search(name)) for name in members]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(zip(members, executor.map(search, members)))
+
+
+def keyword_time_range(content_lines, query):
+    """
+    在内容行中查找满足查询的行，并统计这些行的最早和最晚时间
+    Args:
+        content_lines: 日志行列表
+        query: LogQuery 查询对象
+    Returns:
+        tuple: (最早时间, 最晚时间, [(匹配行, 命中的词条列表), ...])，
+               没有带时间戳的匹配行时时间为None
+    """
+    first_time = None
+    last_time = None
+    matched_lines = []
+    for line in content_lines:
+        terms = query.match_terms(line)
+        if terms is None or not line:
+            continue
+        matched_lines.append((line, terms))
+        time_str, time_obj = match_log_time(line)
+        if time_obj is None:
+            continue
+        if first_time is None or time_obj < first_time:
+            first_time = time_obj
+        if last_time is None or time_obj > last_time:
+            last_time = time_obj
+    return first_time, last_time, matched_lines
+
+
+def hits_time_range(hits, cancel_token=None):
+    """
+    统计匹配行的最早和最晚时间，匹配行只在统计时逐个读取，不保存行内容
+    Args:
+        hits: 可迭代对象，产生 (行号, 行内容, 命中的词条列表)，例如 search_file_bytes 的结果
+        cancel_token: 取消标记，每 HIT_CANCEL_CHECK 个匹配行检查一次
+    Returns:
+        tuple: (最早时间, 最晚时间, [命中的词条列表, ...])，没有带时间戳的匹配行时时间为None
+    """
+    first_time = None
+    last_time = None
+    matched_terms = []
+    for _, line, terms in hits:
+        matched_terms.append(terms)
+        if cancel_token is not None and len(matched_terms) % HIT_CANCEL_CHECK == 0:
+            cancel_token.check()
+        _, time_obj = match_log_time(line)
+        first_time, last_time = merge_time_range(first_time, last_time, time_obj, time_obj)
+    return first_time, last_time, matched_terms
+
+
+def merge_time_range(earliest_time, latest_time, first_time, last_time):
+    """
+    将一个文件的时间范围合并到总的时间范围中
+    Returns:
+        tuple: (合并后的最早时间, 合并后的最晚时间)
+    """
+    if first_time is not None and (earliest_time is None or first_time < earliest_time):
+        earliest_time = first_time
+    if last_time is not None and (latest_time is None or last_time > latest_time):
+        latest_time = last_time
+    return earliest_time, latest_time
+
+
+def seconds_of_day(time_obj):
+    """
+    将日志时间对象转换为相对当天零点的秒数
+    时间范围扩展后可能跨到前一天，此时返回负数
+    """
+    return (time_obj - datetime(1900, 1, 1)).total_seconds()
+
+
+def time_from_seconds(seconds):
+    """将相对当天零点的秒数转换回日志时间对象（seconds_of_day 的逆运算）"""
+    return datetime(1900, 1, 1) + timedelta(seconds=seconds)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+按时间段截取日志模块
+功能：收集日志时只下载一个时间段（例如故障前后十分钟）的内容，传输量与时间段长度有关，与文件大小无关
+支持：
+1. 在文件的若干偏移处读取一小段内容，找到其后第一行的行首时间，按字节偏移二分查找时间段的开始和结束
+2. 时间段前后各扩展一点时间，开始和结束都落在日志块的开头，不会截断多行日志块
+3. 只按行首的 HH:MM:SS 判断时间，与编码无关（GBK 和 UTF-8 中数字都是单字节）
+4. 适用于任何支持 seek/read 的文件对象：SFTP远程文件和本地文件
+注意：二分查找要求文件中的时间基本按顺序排列（按日期命名的日志都是如此）
+"""
+
+import re
+import datetime
+
+# 每次探测读取的字节数，二分查找缩小到这个范围以内后改为顺序读取
+SLICE_PROBE_BYTES = 64 * 1024
+# 时间段前后各扩展的秒数
+SLICE_PADDING_SECONDS = 60
+# 复制时每次读取的字节数
+SLICE_COPY_CHUNK = 1024 * 1024
+# 行首时间 HH:MM:SS 或 HH:MM:SS.fff
+_LINE_TIME = re.compile(rb'(\d{2}):(\d{2}):(\d{2})(?:\.(\d{3}))?')
+
+
+def parse_clock(text):
+    """
+    解析 HH:MM 或 HH:MM:SS 格式的时刻
+    Returns:
+        int: 当天的秒数
+    Raises:
+        ValueError: 格式不正确
+    """
+    for fmt in ('%H:%M:%S', '%H:%M'):
+        try:
+            clock = datetime.datetime.strptime(text.strip(), fmt)
+        except ValueError:
+            continue
+        return clock.hour * 3600 + clock.minute * 60 + clock.second
+    raise ValueError(f"时间格式不正确: {text}")
+
+
+def window_seconds(start_text, end_text, padding=SLICE_PADDING_SECONDS):
+    """
+    把 HH:MM 格式的时间段转换为扩展后的当天秒数范围
+    结束时刻只精确到分钟时包含该分钟的全部日志（例如 10:10 表示到 10:10:59.999）
+    Args:
+        start_text: 开始时刻
+        end_text: 结束时刻
+        padding: 前后各扩展的秒数
+    Returns:
+        tuple: (开始秒数, 结束秒数（不包含）)
+    Raises:
+        ValueError: 格式不正确或结束早于开始
+    """
+    start_seconds = parse_clock(start_text)
+    end_seconds = parse_clock(end_text) + (60 if end_text.strip().count(':') == 1 else 1)
+    if end_seconds <= start_seconds:
+        raise ValueError(f"结束时间 {end_text} 早于开始时间 {start_text}")
+    return start_seconds - padding, end_seconds + padding
+
+
+def _line_seconds(line):
+    """行首时间的当天秒数，不以时间开头时返回None"""
+    match = _LINE_TIME.match(line)
+    if not match:
+        return None
+    hour, minute, second, millis = match.groups()
+    seconds = int(hour) * 3600 + int(minute) * 60 + int(second)
+    return seconds + int(millis) / 1000 if millis else seconds
+
+
+def iter_line_times(f, offset, limit, probe_bytes=SLICE_PROBE_BYTES):
+    """
+    从指定偏移开始顺序读取，生成每个以时间开头的行的偏移和时间
+    偏移不在行首时从下一行开始（偏移恰好是行首时包含该行）
+    Args:
+        f: 支持 seek/read 的二进制文件对象
+        offset: 开始偏移
+        limit: 只考虑开始于这个偏移之前的行
+        probe_bytes: 每次读取的字节数
+    Yields:
+        tuple: (行首偏移, 当天秒数)
+    """
+    # 从前一个字节开始读，前一个字节是换行符时偏移处就是行首
+    buffer_start = max(0, offset - 1)
+    f.seek(buffer_start)
+    buffer = b''
+    skip_partial = offset > 0
+    eof = False
+    while not eof:
+        chunk = f.read(probe_bytes)
+        eof = not chunk
+        buffer += chunk
+        position = 0
+        if skip_partial:
+            newline = buffer.find(b'\n')
+            if newline < 0:
+                if eof:
+                    return
+                # 还没有读到行尾，继续读取（跳过的部分已超过 limit 时停止）
+                if buffer_start + len(buffer) >= limit:
+                    return
+                continue
+            position = newline + 1
+            skip_partial = False
+        while True:
+            newline = buffer.find(b'\n', position)
+            if newline < 0 and not eof:
+                break
+            line_offset = buffer_start + position
+            if line_offset >= limit or position >= len(buffer):
+                return
+            end = newline if newline >= 0 else len(buffer)
+            seconds = _line_seconds(buffer[position:end])
+            if seconds is not None:
+                yield line_offset, seconds
+            if newline < 0:
+                return
+            position = newline + 1
+        # 保留不完整的最后一行，与下一段拼接
+        buffer_start += position
+        buffer = buffer[position:]
+
+
+def find_time_offset(f, size, target, probe_bytes=SLICE_PROBE_BYTES):
+    """
+    二分查找第一个时间不早于 target 的日志行的偏移
+    Args:
+        f: 支持 seek/read 的二进制文件对象
+        size: 文件大小
+        target: 当天秒数
+        probe_bytes: 每次探测读取的字节数
+    Returns:
+        int: 行首偏移，所有行都早于 target 时返回文件大小
+    """
+    # low: 时间早于 target 的某一行的行首（或文件开头）
+    # high: 从这里往后第一个带时间的行不早于 target（或文件末尾）
+    low, high = 0, size
+    while high - low > probe_bytes:
+        middle = (low + high) // 2
+        probe = next(iter_line_times(f, middle, high, probe_bytes), None)
+        if probe is None:
+            high = middle
+        elif probe[1] < target:
+            low = probe[0]
+        else:
+            high = middle
+    for line_offset, seconds in iter_line_times(f, low, size, probe_bytes):
+        if seconds >= target:
+            return line_offset
+    return size
+
+
+def window_byte_range(f, size, start_seconds, end_seconds, probe_bytes=SLICE_PROBE_BYTES):
+    """
+    时间段在文件中的字节范围
+    Args:
+        f: 支持 seek/read 的二进制文件对象
+        size: 文件大小
+        start_seconds: 时间段开始（当天秒数）
+        end_seconds: 时间段结束（当天秒数，不包含）
+        probe_bytes: 每次探测读取的字节数
+    Returns:
+        tuple: (开始偏移, 结束偏移)，开始等于结束表示时间段内没有日志
+    """
+    start = find_time_offset(f, size, start_seconds, probe_bytes)
+    if start >= size:
+        return size, size
+    end = find_time_offset(f, size, end_seconds, probe_bytes)
+    return start, max(start, end)
+
+
+def copy_byte_range(f, start, end, output, callback=None, chunk_size=SLICE_COPY_CHUNK):
+    """
+    把文件的一段字节复制到输出文件
+    Args:
+        f: 支持 seek/read 的二进制文件对象
+        start: 开始偏移
+        end: 结束偏移（不包含）
+        output: 二进制输出文件对象
+        callback: 进度回调函数，参数为 (已复制字节数, 总字节数)，与 SFTP get 的回调一致
+        chunk_size: 每次读取的字节数
+    Returns:
+        int: 复制的字节数
+    """
+    total = end - start
+    f.seek(start)
+    if total > 0 and hasattr(f, 'prefetch'):
+        # SFTP文件：并发请求整个范围，避免每个数据块等待一次往返
+        f.prefetch(end)
+    copied = 0
+    while copied < total:
+        data = f.read(min(chunk_size, total - copied))
+        if not data:
+            break
+        output.write(data)
+        copied += len(data)
+        if callback:
+            callback(copied, total)
+    return copied
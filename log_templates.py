@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日志模板提取模块
+功能：参照 Drain 算法，单遍扫描日志，把结构相同、只有变量不同的行归为同一个模板，
+统计每个模板的行数和首次、末次出现时间，用于快速了解一整天的日志里有哪些不寻常的内容
+支持：
+1. 固定深度的前缀树：先按词数分组，再按开头的几个词分组，叶子中按词相似度匹配模板
+2. 含有数字的词（时间、编号、车牌、IP等）视为变量，不同位置的差异合并为 <*>
+3. 每个文件（或zip成员）的模板统计结果缓存到本地，文件没有变化时直接读取
+4. 与同一类文件（例如前一天的 RsuLogic 日志）的缓存结果比较，标记今天新出现的模板
+"""
+
+import os
+import json
+import time
+import hashlib
+from log_cache import DEFAULT_CACHE_DIR
+from log_prefetch import file_pattern
+from log_search import match_log_time, iter_log_sources
+
+# 模板统计缓存目录
+TEMPLATE_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, "templates")
+# 缓存的模板统计文件数量上限，超过时删除最早的
+TEMPLATE_CACHE_MAX_FILES = 200
+# 前缀树中用于分组的开头词数
+TREE_DEPTH = 2
+# 归入已有模板所需的最低相似度（相同位置上相同的词所占的比例）
+SIMILARITY_THRESHOLD = 0.5
+# 变量占位符
+WILDCARD = '<*>'
+
+
+def tokenize(line):
+    """
+    把日志行拆分为词，去掉行首时间，含有数字的词替换为占位符
+    Returns:
+        tuple: (词元组, 行首时间字符串或None)
+    """
+    time_str, _ = match_log_time(line)
+    if time_str:
+        line = line[len(time_str):]
+    tokens = tuple(WILDCARD if any(c.isdigit() for c in token) else token for token in line.split())
+    return tokens, time_str
+
+
+class LogTemplate:
+    """一个日志模板及其统计"""
+    __slots__ = ('tokens', 'count', 'first_time', 'last_time', 'example')
+
+    def __init__(self, tokens, time_str, example):
+        self.tokens = list(tokens)
+        self.count = 0
+        self.first_time = time_str
+        self.last_time = time_str
+        self.example = example
+
+    @property
+    def text(self):
+        return ' '.join(self.tokens)
+
+    def similarity(self, tokens):
+        """相同位置上相同的词所占的比例（两边都是变量的位置也算相同）"""
+        same = sum(1 for template_token, token in zip(self.tokens, tokens) if template_token == token)
+        return same / len(tokens) if tokens else 1.0
+
+    def merge(self, tokens):
+        """把不同位置的词合并为占位符"""
+        for i, token in enumerate(tokens):
+            if self.tokens[i] != token:
+                self.tokens[i] = WILDCARD
+
+    def to_dict(self):
+        return {'template': self.text, 'count': self.count, 'first_time': self.first_time,
+                'last_time': self.last_time, 'example': self.example}
+
+
+class TemplateMiner:
+    """
+    在线模板提取（Drain 算法的简化实现）
+    add() 逐行处理，所有行处理完后 templates() 给出统计结果
+    """
+    def __init__(self, depth=TREE_DEPTH, threshold=SIMILARITY_THRESHOLD):
+        self.depth = depth
+        self.threshold = threshold
+        self._groups = {}  # (词数, 开头的词...) -> [LogTemplate, ...]
+        self._exact = {}   # 词元组 -> LogTemplate，重复出现的行直接命中
+        self.line_count = 0
+
+    def add(self, line):
+        """
+        处理一行日志
+        Returns:
+            LogTemplate: 该行所属的模板，空行返回None
+        """
+        tokens, time_str = tokenize(line)
+        if not tokens:
+            return None
+        self.line_count += 1
+        template = self._exact.get(tokens)
+        if template is None:
+            # 开头的词是占位符时用占位符分组，与其他开头为变量的行放在一起
+            key = (len(tokens),) + tokens[:self.depth]
+            group = self._groups.setdefault(key, [])
+            best = None
+            best_similarity = -1.0
+            for candidate in group:
+                similarity = candidate.similarity(tokens)
+                if similarity > best_similarity:
+                    best, best_similarity = candidate, similarity
+            if best is not None and best_similarity >= self.threshold:
+                template = best
+                template.merge(tokens)
+            else:
+                template = LogTemplate(tokens, time_str, line)
+                group.append(template)
+            self._exact[tokens] = template
+        template.count += 1
+        if time_str:
+            if template.first_time is None:
+                template.first_time = time_str
+            template.last_time = time_str
+        return template
+
+    def add_lines(self, lines):
+        """处理多行日志（可以是流式读取的迭代器）"""
+        for line in lines:
+            if line:
+                self.add(line)
+
+    def templates(self):
+        """
+        获取所有模板的统计
+        Returns:
+            list: 模板字典列表，按行数从少到多排序（少见的模板排在前面）
+        """
+        templates = [template for group in self._groups.values() for template in group]
+        return sorted((template.to_dict() for template in templates), key=lambda item: item['count'])
+
+
+def _cache_path(local_path, member):
+    key = f"{os.path.abspath(local_path)}|{member or ''}"
+    return os.path.join(TEMPLATE_CACHE_DIR, hashlib.md5(key.encode('utf-8')).hexdigest() + '.json')
+
+
+def _load_cached(cache_path, size, mtime):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get('size') != size or data.get('mtime') != mtime:
+        return None
+    return data
+
+
+def _save_cached(cache_path, data):
+    os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    tmp_path = cache_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, cache_path)
+    # 超过数量上限时删除最早的统计
+    entries = [os.path.join(TEMPLATE_CACHE_DIR, name) for name in os.listdir(TEMPLATE_CACHE_DIR)
+               if name.endswith('.json')]
+    if len(entries) > TEMPLATE_CACHE_MAX_FILES:
+        entries.sort(key=os.path.getmtime)
+        for path in entries[:len(entries) - TEMPLATE_CACHE_MAX_FILES]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def find_baseline(pattern, file_name, exclude=()):
+    """
+    查找同一类文件的模板统计，作为判断“新出现”的基准
+    优先使用文件名排在当前文件之前的最后一个（按日期命名时即前一天的日志）
+    Args:
+        pattern: 文件类别（见 log_prefetch.file_pattern）
+        file_name: 当前文件名
+        exclude: 不作为基准的缓存文件路径
+    Returns:
+        set: 基准中的模板文本集合，没有基准时返回None
+    """
+    if not os.path.isdir(TEMPLATE_CACHE_DIR):
+        return None
+    earlier = None
+    later = None
+    for name in os.listdir(TEMPLATE_CACHE_DIR):
+        path = os.path.join(TEMPLATE_CACHE_DIR, name)
+        if not name.endswith('.json') or path in exclude:
+            continue
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if data.get('pattern') != pattern:
+            continue
+        other_name = data.get('file_name', '')
+        if other_name < file_name:
+            if earlier is None or other_name > earlier.get('file_name', ''):
+                earlier = data
+        elif later is None or other_name < later.get('file_name', ''):
+            later = data
+    best = earlier or later
+    if best is None:
+        return None
+    return {item['template'] for item in best['templates']}
+
+
+def mine_file(local_path, file_name, use_cache=True, cancel_token=None):
+    """
+    提取一个本地日志文件（zip包按成员分别提取）的模板，结果按文件缓存
+    Args:
+        local_path: 本地文件路径
+        file_name: 原始文件名（远程文件的缓存副本名称不含日期，需要用原始文件名确定文件类别）
+        use_cache: 是否使用缓存的统计结果
+        cancel_token: 取消标记，每个成员开始前检查
+    Returns:
+        list: [{'file_name': 文件名, 'member': zip成员名, 'lines': 行数, 'cached': 是否来自缓存,
+                'templates': [模板字典, ...], 'baseline': 是否有基准}, ...]
+              模板字典中的 'new' 表示基准中没有这个模板
+    """
+    stat = os.stat(local_path)
+    results = []
+    cache_paths = []
+    for member, lines in iter_log_sources(local_path):
+        if cancel_token is not None:
+            cancel_token.check()
+        member_name = os.path.basename(member) if member else file_name
+        cache_path = _cache_path(local_path, member)
+        cache_paths.append(cache_path)
+        data = _load_cached(cache_path, stat.st_size, stat.st_mtime) if use_cache else None
+        cached = data is not None
+        if data is None:
+            miner = TemplateMiner()
+            miner.add_lines(lines)
+            data = {
+                'file_name': member_name,
+                'member': member,
+                'pattern': file_pattern(member_name),
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'mined': time.time(),
+                'lines': miner.line_count,
+                'templates': miner.templates(),
+            }
+            _save_cached(cache_path, data)
+        results.append({'file_name': member_name, 'member': member, 'lines': data['lines'],
+                        'cached': cached, 'templates': data['templates'], 'pattern': data['pattern']})
+
+    for result in results:
+        baseline = find_baseline(result.pop('pattern'), result['file_name'], exclude=cache_paths)
+        result['baseline'] = baseline is not None
+        for item in result['templates']:
+            item['new'] = baseline is not None and item['template'] not in baseline
+    return results
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+SSH传输配置模块
+功能：按主机选择SSH传输参数（协商的加密算法、SSH压缩、窗口和数据包大小、保活间隔），
+并通过实际下载一段日志测量每种配置的速度，选出最快的配置
+支持：
+1. 预定义的传输配置，主机配置中以 ssh.transport 指定名称
+2. 校准：依次用每种配置连接并读取同一个远程日志文件的开头部分，比较吞吐量
+3. 命令行校准：python log_transport.py [hosts.yaml] [主机名...]，结果写回 hosts.yaml
+"""
+
+import os
+import sys
+import time
+import datetime
+import paramiko  # SSH连接库
+import yaml      # 配置文件解析
+
+# 默认使用的配置名称
+DEFAULT_PROFILE = 'default'
+# 校准时每种配置读取的字节数
+CALIBRATION_BYTES = 8 * 1024 * 1024
+# 校准时每次读取的字节数
+CALIBRATION_CHUNK = 1024 * 1024
+# 连接超时（秒）：TCP连接、等待SSH版本标识、身份验证
+# 不设置时paramiko会一直等待，关机的车道会让批量操作长时间卡住
+CONNECT_TIMEOUT = 10
+BANNER_TIMEOUT = 10
+AUTH_TIMEOUT = 15
+
+# paramiko 按固定的优先顺序协商加密算法，CTR 和 CBC 模式的 AES 排在 AES-GCM 之前，
+# 只能通过禁用排在前面的算法让协商结果落到 AES-GCM（paramiko 3.5 起支持；不支持 chacha20-poly1305）
+NON_GCM_CIPHERS = ['aes128-ctr', 'aes192-ctr', 'aes256-ctr',
+                   'aes128-cbc', 'aes192-cbc', 'aes256-cbc', '3des-cbc']
+
+# 传输配置
+# disabled_ciphers: 禁用的加密算法（通过 disabled_algorithms 传给paramiko），None表示不限制
+# compress: 是否启用SSH层压缩（文本日志通常可压缩到1/10左右，适合慢速链路）
+# window_size / max_packet_size: SFTP通道的窗口和最大数据包大小，None表示paramiko默认值
+# keepalive: 保活间隔（秒），0表示不发送
+TRANSPORT_PROFILES = {
+    # paramiko默认协商 aes128-ctr + hmac-sha2-256
+    'default': {
+        'disabled_ciphers': None, 'compress': False,
+        'window_size': None, 'max_packet_size': None, 'keepalive': 0,
+    },
+    # AES-GCM 加密和校验一次完成，不再单独计算HMAC，支持AES指令的CPU上通常更快
+    # （车道主机的SSH服务不支持 AES-GCM 时无法连接，校准中记为失败）
+    'fast-cipher': {
+        'disabled_ciphers': NON_GCM_CIPHERS, 'compress': False,
+        'window_size': 8 * 1024 * 1024, 'max_packet_size': 256 * 1024, 'keepalive': 30,
+    },
+    # 带宽较低的链路上，压缩节省的传输时间超过压缩本身的开销
+    'compressed': {
+        'disabled_ciphers': None, 'compress': True,
+        'window_size': 8 * 1024 * 1024, 'max_packet_size': 256 * 1024, 'keepalive': 30,
+    },
+    # 低带宽链路上同时使用 AES-GCM 和压缩
+    'fast-cipher-compressed': {
+        'disabled_ciphers': NON_GCM_CIPHERS, 'compress': True,
+        'window_size': 8 * 1024 * 1024, 'max_packet_size': 256 * 1024, 'keepalive': 30,
+    },
+    # 高延迟链路上，更大的窗口可以减少等待确认的时间
+    'large-window': {
+        'disabled_ciphers': None, 'compress': True,
+        'window_size': 32 * 1024 * 1024, 'max_packet_size': 256 * 1024, 'keepalive': 30,
+    },
+}
+
+
+def get_profile(name):
+    """
+    获取传输配置
+    Args:
+        name: 配置名称，未知或为空时使用默认配置
+    Returns:
+        dict: 传输配置
+    """
+    return TRANSPORT_PROFILES.get(name or DEFAULT_PROFILE, TRANSPORT_PROFILES[DEFAULT_PROFILE])
+
+
+def connect_kwargs(profile):
+    """
+    根据传输配置生成 SSHClient.connect 的参数（包括连接超时）
+    加密算法通过 disabled_algorithms 禁用配置中列出的算法来选择
+    Args:
+        profile: 传输配置
+    Returns:
+        dict: connect 的关键字参数
+    """
+    kwargs = {
+        'compress': bool(profile.get('compress')),
+        'timeout': CONNECT_TIMEOUT,
+        'banner_timeout': BANNER_TIMEOUT,
+        'auth_timeout': AUTH_TIMEOUT,
+    }
+    if profile.get('disabled_ciphers'):
+        kwargs['disabled_algorithms'] = {'ciphers': list(profile['disabled_ciphers'])}
+    return kwargs
+
+
+def open_sftp(ssh, profile):
+    """
+    按传输配置打开SFTP会话并设置保活
+    Args:
+        ssh: 已连接的 SSHClient
+        profile: 传输配置
+    Returns:
+        SFTPClient: SFTP会话
+    """
+    transport = ssh.get_transport()
+    if profile.get('keepalive'):
+        transport.set_keepalive(profile['keepalive'])
+    return paramiko.SFTPClient.from_transport(
+        transport, window_size=profile.get('window_size'),
+        max_packet_size=profile.get('max_packet_size'))
+
+
+def find_sample_file(sftp, log_paths):
+    """
+    在日志目录中选择校准用的文件：最大的 .log 文件（文本日志才能体现压缩的效果）
+    Args:
+        sftp: SFTP会话
+        log_paths: 日志目录列表
+    Returns:
+        str: 远程文件路径，没有找到时返回None
+    """
+    best_path = None
+    best_size = -1
+    for log_path in log_paths:
+        try:
+            entries = sftp.listdir_attr(log_path)
+        except (IOError, OSError):
+            continue
+        separator = '\\' if '\\' in log_path else '/'
+        for entry in entries:
+            if entry.filename.lower().endswith('.log') and (entry.st_size or 0) > best_size:
+                best_size = entry.st_size or 0
+                best_path = log_path.rstrip(separator) + separator + entry.filename
+    return best_path
+
+
+def measure_profile(ssh_config, profile, remote_path, sample_bytes=CALIBRATION_BYTES):
+    """
+    用指定的传输配置连接主机，读取远程文件的开头部分并测量吞吐量
+    Args:
+        ssh_config: SSH连接配置（host、port、username、password）
+        profile: 传输配置
+        remote_path: 用于测量的远程文件
+        sample_bytes: 读取的字节数
+    Returns:
+        float: 吞吐量（字节/秒）
+    """
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    try:
+        ssh.connect(hostname=ssh_config['host'], port=ssh_config.get('port', 22),
+                    username=ssh_config['username'], password=ssh_config['password'],
+                    **connect_kwargs(profile))
+        sftp = open_sftp(ssh, profile)
+        try:
+            with sftp.open(remote_path, 'rb') as remote:
+                size = min(sample_bytes, remote.stat().st_size)
+                remote.prefetch(size)
+                started = time.perf_counter()
+                received = 0
+                while received < size:
+                    data = remote.read(min(CALIBRATION_CHUNK, size - received))
+                    if not data:
+                        break
+                    received += len(data)
+                elapsed = time.perf_counter() - started
+        finally:
+            sftp.close()
+    finally:
+        ssh.close()
+    return received / elapsed if elapsed > 0 else float(received)
+
+
+def calibrate(ssh_config, log_paths, profiles=None, log_callback=None):
+    """
+    测量每种传输配置的吞吐量，选出最快的配置
+    Args:
+        ssh_config: SSH连接配置
+        log_paths: 日志目录列表，从中选择测量用的文件
+        profiles: 要测量的配置名称列表，默认为全部
+        log_callback: 日志回调函数，参数为消息文本
+    Returns:
+        tuple: (最快的配置名称, {配置名称: 吞吐量（字节/秒），失败为None})
+    Raises:
+        Exception: 无法连接主机或没有可用于测量的日志文件
+    """
+    def log(message):
+        if log_callback:
+            log_callback(message)
+
+    # 先用默认配置连接一次，选择测量用的文件
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+    try:
+        ssh.connect(hostname=ssh_config['host'], port=ssh_config.get('port', 22),
+                    username=ssh_config['username'], password=ssh_config['password'],
+                    **connect_kwargs(get_profile(DEFAULT_PROFILE)))
+        sftp = ssh.open_sftp()
+        try:
+            remote_path = find_sample_file(sftp, log_paths)
+            if remote_path:
+                # 预读一次，使每种配置都从远程主机的文件缓存读取，测量结果可比较
+                with sftp.open(remote_path, 'rb') as remote:
+                    remote.prefetch(min(CALIBRATION_BYTES, remote.stat().st_size))
+                    remote.read(CALIBRATION_BYTES)
+        finally:
+            sftp.close()
+    finally:
+        ssh.close()
+    if not remote_path:
+        raise Exception("日志目录中没有可用于测量的 .log 文件")
+    log(f"使用 {remote_path} 测量传输速度")
+
+    results = {}
+    for name in profiles or TRANSPORT_PROFILES:
+        try:
+            speed = measure_profile(ssh_config, get_profile(name), remote_path)
+            results[name] = speed
+            log(f"{name}: {speed / 1024 / 1024:.2f} MB/s")
+        except Exception as e:
+            results[name] = None
+            log(f"{name}: 测量失败 ({str(e)})")
+    measured = {name: speed for name, speed in results.items() if speed}
+    if not measured:
+        raise Exception("所有传输配置都测量失败")
+    return max(measured, key=measured.get), results
+
+
+def store_calibration(host_data, best, results):
+    """
+    把校准结果写入主机配置（hosts.yaml 中的一项）
+    Args:
+        host_data: 主机配置字典
+        best: 最快的配置名称
+        results: 每种配置的吞吐量
+    """
+    ssh = host_data.setdefault('ssh', {})
+    ssh['transport'] = best
+    host_data['transport_benchmark'] = {
+        'time': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'mb_per_second': {name: round(speed / 1024 / 1024, 2) if speed else None
+                          for name, speed in results.items()},
+    }
+
+
+def main():
+    """
+    命令行校准：python log_transport.py [hosts.yaml] [主机名...]
+    不指定主机名时校准所有主机
+    """
+    hosts_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'hosts.yaml')
+    names = set(sys.argv[2:])
+    with open(hosts_file, 'r', encoding='utf-8') as f:
+        hosts_data = yaml.safe_load(f) or []
+
+    for host_data in hosts_data:
+        if names and host_data.get('name') not in names:
+            continue
+        print(f"校准主机: {host_data.get('name', host_data.get('ssh', {}).get('host'))}")
+        try:
+            best, results = calibrate(host_data['ssh'], host_data.get('log_paths', []), log_callback=print)
+        except Exception as e:
+            print(f"校准失败: {str(e)}")
+            continue
+        store_calibration(host_data, best, results)
+        print(f"最快的传输配置: {best}")
+
+    with open(hosts_file, 'w', encoding='utf-8') as f:
+        yaml.dump(hosts_data, f, allow_unicode=True)
+
+
+if __name__ == "__main__":
+    main()
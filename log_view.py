@@ -0,0 +1,597 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日志查看模块
+功能：为查看完整日志提供按行随机访问，不把整个文件读入内存
+支持：
+1. 文件通过mmap映射，只读取和解码当前需要显示的行
+2. 稀疏的行偏移索引（每隔 LINE_INDEX_STEP 行记录一次），几GB的日志也只占用很少内存
+3. 跳转到指定行号或指定时间（按行首时间二分查找）
+4. 文件变大时只索引新增部分（用于边下载边查看和实时跟踪）
+5. zip包中的日志文件解压到临时文件后查看
+6. 远程大文件先显示首尾页，跳转或滚动到未下载的位置时按范围读取需要显示的页
+"""
+
+import os
+import mmap
+import bisect
+import shutil
+import tempfile
+import zipfile
+from array import array
+from collections import deque
+from itertools import accumulate
+from log_search import detect_encoding, match_log_time, zip_log_members
+
+# 每隔多少行记录一次行首偏移
+LINE_INDEX_STEP = 64
+# 建立索引时每次读取的字节数
+INDEX_CHUNK_SIZE = 16 * 1024 * 1024
+# 跳转到时间时，向后查找带时间戳的行的最大行数
+TIME_SCAN_LIMIT = LINE_INDEX_STEP * 16
+# zip包成员解压后的临时目录
+VIEW_TEMP_DIR = os.path.join(tempfile.gettempdir(), "log_view")
+
+
+class MappedLog:
+    """
+    内存映射的日志文件
+    建立索引后可以按行号读取任意位置的行
+    """
+    def __init__(self, path, title=None, temporary=False):
+        """
+        初始化
+        Args:
+            path: 本地文件路径
+            title: 显示名称，默认为文件名
+            temporary: 是否为临时文件（关闭时删除）
+        """
+        self.path = path
+        self.title = title or os.path.basename(path)
+        self.temporary = temporary
+        self.encoding = 'utf-8'
+        self._file = open(path, 'rb')
+        self._map = None
+        self._size = 0
+        # 第 i 项为第 i * LINE_INDEX_STEP 行的起始偏移
+        self._checkpoints = array('Q', [0])
+        self._indexed_bytes = 0
+        self._newline_count = 0
+
+    @property
+    def size(self):
+        """已映射的文件大小"""
+        return self._size
+
+    @property
+    def line_count(self):
+        """已索引的行数（末尾没有换行符的不完整行也计算在内）"""
+        if self._indexed_bytes == 0:
+            return 0
+        if self._map[self._indexed_bytes - 1:self._indexed_bytes] == b'\n':
+            return self._newline_count
+        return self._newline_count + 1
+
+    def _remap(self):
+        """文件变大后重新映射，返回是否有新内容"""
+        size = os.fstat(self._file.fileno()).st_size
+        if size <= self._size:
+            return False
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._size == 0:
+            self.encoding = detect_encoding(self._map)
+        self._size = size
+        return True
+
+    def update(self, progress_callback=None):
+        """
+        索引文件中尚未索引的部分（首次调用时索引整个文件）
+        Args:
+            progress_callback: 进度回调函数，参数为 (已索引字节数, 文件大小)
+        Returns:
+            bool: 是否有新的行
+        """
+        if not self._remap():
+            return False
+        checkpoints = self._checkpoints
+        pos = self._indexed_bytes
+        newline_count = self._newline_count
+        while pos < self._size:
+            chunk = self._map[pos:pos + INDEX_CHUNK_SIZE]
+            parts = chunk.split(b'\n')
+            # 最后一段没有换行符，属于下一块的开头
+            ends = list(accumulate(map(len, parts[:-1])))
+            # 第 k 个换行符之后是第 newline_count + k + 1 行
+            first = (-(newline_count + 1)) % LINE_INDEX_STEP
+            checkpoints.extend(pos + ends[k] + k + 1 for k in range(first, len(ends), LINE_INDEX_STEP))
+            newline_count += len(ends)
+            pos += len(chunk)
+            if progress_callback:
+                progress_callback(pos, self._size)
+        self._indexed_bytes = pos
+        self._newline_count = newline_count
+        return True
+
+    def _line_start(self, line_num):
+        """获取指定行的起始偏移"""
+        pos = self._checkpoints[line_num // LINE_INDEX_STEP]
+        for _ in range(line_num % LINE_INDEX_STEP):
+            pos = self._map.find(b'\n', pos, self._indexed_bytes) + 1
+        return pos
+
+    def line_number(self, offset):
+        """
+        已索引部分中包含指定字节偏移的行号
+        Args:
+            offset: 字节偏移
+        Returns:
+            int: 行号（从0开始）
+        """
+        offset = min(offset, self._indexed_bytes)
+        index = bisect.bisect_right(self._checkpoints, offset) - 1
+        line_num = index * LINE_INDEX_STEP
+        pos = self._checkpoints[index]
+        while True:
+            end = self._map.find(b'\n', pos, offset)
+            if end < 0:
+                return line_num
+            line_num += 1
+            pos = end + 1
+
+    def lines(self, start, count):
+        """
+        读取连续的多行
+        Args:
+            start: 起始行号（从0开始）
+            count: 行数
+        Returns:
+            list: 解码后的行列表
+        """
+        total = self.line_count
+        if start >= total or count <= 0:
+            return []
+        count = min(count, total - start)
+        pos = self._line_start(start)
+        result = []
+        for _ in range(count):
+            end = self._map.find(b'\n', pos, self._indexed_bytes)
+            if end < 0:
+                end = self._indexed_bytes
+            result.append(self._map[pos:end].decode(self.encoding, errors='replace').rstrip('\r'))
+            pos = end + 1
+        return result
+
+    def line(self, line_num):
+        """读取单行"""
+        lines = self.lines(line_num, 1)
+        return lines[0] if lines else ''
+
+    def _time_from(self, line_num):
+        """从指定行开始向后查找第一个带时间戳的行，返回 (行号, 时间)，没有时返回 (None, None)"""
+        end = min(self.line_count, line_num + TIME_SCAN_LIMIT)
+        for offset, line in enumerate(self.lines(line_num, end - line_num)):
+            _, time_obj = match_log_time(line)
+            if time_obj is not None:
+                return line_num + offset, time_obj
+        return None, None
+
+    def find_time(self, time_obj):
+        """
+        查找第一条行首时间不早于指定时间的行（假定日志按时间顺序写入）
+        Args:
+            time_obj: 时间对象（parse_log_time 的返回值）
+        Returns:
+            int: 行号，所有行都更早时返回最后一行
+        """
+        total = self.line_count
+        if total == 0:
+            return 0
+        # 在检查点上二分查找
+        low = 0
+        high = (total - 1) // LINE_INDEX_STEP + 1
+        while low < high:
+            middle = (low + high) // 2
+            _, found = self._time_from(middle * LINE_INDEX_STEP)
+            if found is None or found < time_obj:
+                low = middle + 1
+            else:
+                high = middle
+        # 在前一个检查点之后逐行查找
+        line_num = max(0, (low - 1) * LINE_INDEX_STEP)
+        while line_num < total:
+            found_line, found = self._time_from(line_num)
+            if found_line is None:
+                break
+            if found >= time_obj:
+                return found_line
+            line_num = found_line + 1
+        return total - 1
+
+    def close(self):
+        """关闭文件映射，临时文件同时删除"""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+        if self.temporary:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+def extract_zip_member(zip_path, member_name):
+    """
+    将zip包中的一个日志文件以流的方式解压到临时文件，用于映射查看
+    Args:
+        zip_path: 本地zip文件路径
+        member_name: 成员名称
+    Returns:
+        str: 临时文件路径
+    """
+    os.makedirs(VIEW_TEMP_DIR, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix='.log', dir=VIEW_TEMP_DIR)
+    try:
+        with os.fdopen(fd, 'wb') as out, zipfile.ZipFile(zip_path, 'r') as zip_ref, \
+                zip_ref.open(member_name) as member:
+            shutil.copyfileobj(member, out, 1024 * 1024)
+    except Exception:
+        os.remove(temp_path)
+        raise
+    return temp_path
+
+
+def open_log_views(local_path, member_names=None, progress_callback=None, title=None, temporary=False):
+    """
+    打开本地日志文件（或zip包中的日志文件）用于查看，并建立行索引
+    Args:
+        local_path: 本地 .log 或 .zip 文件路径
+        member_names: zip包中要查看的成员，默认为全部日志成员
+        progress_callback: 索引进度回调函数，参数为 (标题, 已索引字节数, 文件大小)
+        title: 普通日志文件的显示名称，默认为文件名
+        temporary: 普通日志文件是否为临时文件（关闭时删除）
+    Returns:
+        list: MappedLog 对象列表
+    """
+    def make_callback(name):
+        if progress_callback is None:
+            return None
+        return lambda done, total: progress_callback(name, done, total)
+
+    views = []
+    try:
+        if local_path.lower().endswith('.zip'):
+            if member_names is None:
+                with zipfile.ZipFile(local_path, 'r') as zip_ref:
+                    member_names = zip_log_members(zip_ref)
+            for name in member_names:
+                view = MappedLog(extract_zip_member(local_path, name), title=name, temporary=True)
+                views.append(view)
+                view.update(make_callback(name))
+        else:
+            view = MappedLog(local_path, title=title, temporary=temporary)
+            views.append(view)
+            view.update(make_callback(view.title))
+    except Exception:
+        for view in views:
+            view.close()
+        raise
+    return views
+
+
+# 远程日志分页读取的页大小
+REMOTE_PAGE_SIZE = 256 * 1024
+# 远程日志在查看前完整下载的大小上限，更大的文件先显示首尾页再在后台下载
+PROGRESSIVE_MIN_SIZE = 4 * 1024 * 1024
+
+
+# 跳转到未下载的时间时，按估计位置读取页的最多次数
+JUMP_PAGE_TRIES = 8
+
+
+class _Gap:
+    """未下载的字节范围，显示为一行占位"""
+    __slots__ = ('start', 'end')
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+
+class ProgressiveLog:
+    """
+    边下载边查看的远程日志
+    先显示文件开头和结尾的页，中间部分在后台按顺序下载；
+    跳转到尚未下载的时间、或滚动到中间页两侧的占位行时，下载线程优先按范围读取这些页（中间页）；
+    已下载的开头部分按 MappedLog 的方式增量索引，下载完成后与完整文件相同
+    """
+    def __init__(self, partial_path, tail_data, total_size, title):
+        """
+        初始化
+        Args:
+            partial_path: 正在写入的本地临时文件（已包含开头的页）
+            tail_data: 文件结尾一页的字节内容
+            total_size: 远程文件大小
+            title: 显示名称
+        """
+        self.head = MappedLog(partial_path, title=title, temporary=True)
+        self.title = title
+        self.total_size = total_size
+        self.downloaded = False  # 后台下载已完成（由下载线程设置）
+        self.complete = False    # 已切换为显示完整文件（由界面线程设置）
+        self.error = None        # 后台下载失败的原因
+        self.closed = False
+        self.head.update()
+        self.encoding = self.head.encoding
+        # 结尾页的第一行可能不完整，丢弃
+        skip = tail_data.find(b'\n') + 1
+        self.tail_start = total_size - len(tail_data) + skip  # 结尾页第一个完整行的偏移
+        self.tail_lines = self._split_lines(self.tail_start, tail_data[skip:])
+        # 中间页：按需读取的一段连续内容，[(偏移, 行内容), ...]
+        self.middle_lines = []
+        self.jump_line = None     # 按需读取后确定的跳转行号（由界面线程取走，见 take_jump）
+        self._jump_time = None
+        self._jump_tries = 0
+        self._rows = None         # 开头部分之后的各行（缓存）
+        # 界面线程和下载线程之间的请求和结果队列（deque 的 append/popleft 是线程安全的）
+        self._requests = deque()  # 请求读取的范围 (偏移, 长度)
+        self._pages = deque()     # 读取到的页 (偏移, 字节内容)
+        self._requested = set()   # 已请求、还没有收到结果的范围
+
+    def _split_lines(self, start, data):
+        """把从行首开始的字节内容拆分为 [(偏移, 行内容), ...]，结尾没有换行符的空行丢弃"""
+        parts = data.split(b'\n')
+        if not parts[-1]:
+            parts.pop()
+        lines = []
+        for part in parts:
+            lines.append((start, part.decode(self.encoding, errors='replace').rstrip('\r')))
+            start += len(part) + 1
+        return lines
+
+    @property
+    def path(self):
+        return self.head.path
+
+    @property
+    def middle_start(self):
+        return self.middle_lines[0][0] if self.middle_lines else None
+
+    @property
+    def middle_end(self):
+        """中间页之后第一行的偏移"""
+        return self._middle_end if self.middle_lines else None
+
+    def _rest(self):
+        """
+        未下载完成时开头部分之后的各行：(偏移, 行内容) 或 _Gap（未下载的范围）
+        开头部分、中间页和结尾页之间有间隔的地方各显示一行占位
+        """
+        if self._rows is None:
+            rows = []
+            position = self.head.size
+            if self.middle_lines:
+                if position < self.middle_start:
+                    rows.append(_Gap(position, self.middle_start))
+                rows.extend(self.middle_lines)
+                position = max(position, self._middle_end)
+            if position < self.tail_start or not rows:
+                rows.append(_Gap(position, self.tail_start))
+            rows.extend(self.tail_lines)
+            self._rows = rows
+        return self._rows
+
+    @property
+    def line_count(self):
+        """可显示的行数：未下载完成时为 已下载的行 + 中间页的行 + 占位行 + 结尾页的行"""
+        if self.complete:
+            return self.head.line_count
+        return self.head.line_count + len(self._rest())
+
+    def progress(self):
+        """已下载的比例（0~1）"""
+        return min(1.0, self.head.size / self.total_size) if self.total_size else 1.0
+
+    def update(self, progress_callback=None):
+        """
+        索引新下载的部分，加入按需读取的页，下载完成后切换为显示完整文件
+        只应在显示它的线程中调用
+        Returns:
+            bool: 是否有新的行
+        """
+        if self.closed:
+            return False
+        changed = self.head.update(progress_callback)
+        while self._pages:
+            self._add_page(*self._pages.popleft())
+            self._requested.clear()
+            changed = True
+        if self.middle_lines and self.middle_start < self.head.size:
+            # 开头部分已下载到中间页，删除重复的行
+            self.middle_lines = [line for line in self.middle_lines if line[0] >= self.head.size]
+        if self.downloaded and not self.complete:
+            self.head.update(progress_callback)
+            self.complete = True
+            self.tail_lines = []
+            self.middle_lines = []
+            changed = True
+        if changed:
+            self._rows = None
+            if self._jump_time is not None:
+                # 等待中的跳转：在新内容中查找，仍在未下载的范围内时继续按需读取
+                time_obj, self._jump_time = self._jump_time, None
+                line_num = self._find_time(time_obj)
+                if self._jump_time is None:
+                    self.jump_line = line_num
+        return changed
+
+    def take_jump(self):
+        """取出按需读取后确定的跳转行号，没有时返回None"""
+        line_num, self.jump_line = self.jump_line, None
+        return line_num
+
+    def _add_page(self, start, data):
+        """把按需读取的页加入中间页，与已有的中间页相连时合并，否则替换"""
+        end = start + len(data)
+        line_starts = {0, self.tail_start}
+        if self.middle_lines:
+            line_starts.update((self.middle_start, self._middle_end))
+        if start not in line_starts:
+            skip = data.find(b'\n') + 1
+            start, data = start + skip, data[skip:] if skip else b''
+        if end not in line_starts:
+            data = data[:data.rfind(b'\n') + 1]
+        if not data:
+            return
+        end = start + len(data)
+        page = self._split_lines(start, data)
+        if self.middle_lines and start <= self._middle_end and end >= self.middle_start:
+            before = [line for line in page if line[0] < self.middle_start]
+            after = [line for line in page if line[0] >= self._middle_end]
+            self.middle_lines = before + self.middle_lines + after
+            self._middle_end = max(self._middle_end, end)
+        else:
+            self.middle_lines = page
+            self._middle_end = end
+
+    def _request(self, start, end):
+        """请求下载线程读取一个范围（界面线程调用）"""
+        if end > start and (start, end) not in self._requested:
+            self._requested.add((start, end))
+            self._requests.append((start, end - start))
+            return True
+        return False
+
+    def take_request(self):
+        """
+        取出最新的按需读取请求（下载线程调用），较早的请求已经不再显示，直接丢弃
+        Returns:
+            tuple: (偏移, 长度)，没有请求时返回None
+        """
+        request = None
+        while self._requests:
+            request = self._requests.popleft()
+        return request
+
+    def add_page(self, start, data):
+        """加入按需读取的页（下载线程调用），界面线程在 update 中处理"""
+        self._pages.append((start, data))
+
+    def finish_download(self):
+        """下载线程写完文件后调用"""
+        self.downloaded = True
+
+    def _placeholder(self, gap):
+        """显示占位行；占位行在中间页旁边时请求读取与中间页相连的一页"""
+        if self.middle_lines and gap.end == self.middle_start:
+            self._request(max(gap.start, gap.end - REMOTE_PAGE_SIZE), gap.end)
+        elif self.middle_lines and gap.start == self._middle_end:
+            self._request(gap.start, min(gap.end, gap.start + REMOTE_PAGE_SIZE))
+        return f"...... 正在下载 {self.progress() * 100:.0f}%，中间内容下载后显示 ......"
+
+    def lines(self, start, count):
+        """读取连续的多行（未下载的部分显示为一行占位）"""
+        head_count = self.head.line_count
+        result = self.head.lines(start, count)
+        if self.complete or start + count <= head_count:
+            return result
+        for row in self._rest()[max(start, head_count) - head_count:start + count - head_count]:
+            result.append(self._placeholder(row) if isinstance(row, _Gap) else row[1])
+        return result
+
+    def line(self, line_num):
+        lines = self.lines(line_num, 1)
+        return lines[0] if lines else ''
+
+    def row_key(self, row):
+        """
+        显示位置的标识，下载和按需读取改变行号后用 row_from_key 换算回行号
+        Args:
+            row: 行号
+        Returns:
+            tuple: 开头部分为 ('head', 行号)，已读取的行为 ('offset', 字节偏移)，占位行为 ('end', 距离最后一行的行数)
+        """
+        head_count = self.head.line_count
+        if self.complete or row < head_count:
+            return ('head', row)
+        rest = self._rest()
+        index = row - head_count
+        if index < len(rest) and not isinstance(rest[index], _Gap):
+            return ('offset', rest[index][0])
+        return ('end', self.line_count - row)
+
+    def row_from_key(self, key):
+        """把 row_key 的结果换算为当前的行号"""
+        kind, value = key
+        if kind == 'head':
+            return value
+        if kind == 'offset':
+            if self.complete or value < self.head.size:
+                return self.head.line_number(value)
+            for index, row in enumerate(self._rest()):
+                if not isinstance(row, _Gap) and row[0] == value:
+                    return self.head.line_count + index
+            return self.head.line_count
+        return max(0, self.line_count - value)
+
+    def find_time(self, time_obj):
+        """
+        查找第一条行首时间不早于指定时间的行
+        时间落在尚未下载的范围内时返回占位行，并按估计的位置请求读取一页，读取后通过 jump_line 给出结果
+        """
+        self._jump_tries = 0
+        self._jump_time = None
+        return self._find_time(time_obj)
+
+    def _find_time(self, time_obj):
+        head_count = self.head.line_count
+        if self.complete or head_count == 0:
+            return self.head.find_time(time_obj)
+        line_num = self.head.find_time(time_obj)
+        _, found = match_log_time(self.head.line(line_num))
+        if found is not None and found >= time_obj:
+            return line_num
+        # 依次在中间页和结尾页中查找，记录前一个带时间戳的行的时间用于估计位置
+        lower_time = None
+        for line in reversed(self.head.lines(max(0, head_count - LINE_INDEX_STEP), LINE_INDEX_STEP)):
+            _, lower_time = match_log_time(line)
+            if lower_time is not None:
+                break
+        gap_row = None
+        for index, row in enumerate(self._rest()):
+            if isinstance(row, _Gap):
+                gap_row = index
+                continue
+            _, found = match_log_time(row[1])
+            if found is None:
+                continue
+            if found >= time_obj:
+                if gap_row is not None and found > time_obj:
+                    # 时间落在未下载的范围内
+                    self._request_time(self._rest()[gap_row], lower_time, found, time_obj)
+                    return head_count + gap_row
+                return head_count + index
+            lower_time = found
+            gap_row = None
+        return self.line_count - 1
+
+    def _request_time(self, gap, lower_time, upper_time, time_obj):
+        """按时间在未下载范围两端之间线性估计位置，请求读取以该位置为中心的一页"""
+        if self._jump_tries >= JUMP_PAGE_TRIES:
+            return
+        fraction = 0.5
+        if lower_time is not None and upper_time > lower_time:
+            fraction = min(1.0, max(0.0, (time_obj - lower_time) / (upper_time - lower_time)))
+        offset = gap.start + int(fraction * (gap.end - gap.start)) - REMOTE_PAGE_SIZE // 2
+        offset = max(gap.start, min(offset, gap.end - REMOTE_PAGE_SIZE))
+        if self._request(offset, min(gap.end, offset + REMOTE_PAGE_SIZE)):
+            self._jump_tries += 1
+        self._jump_time = time_obj
+
+    def close(self):
+        """关闭查看，后台下载在下一块数据时停止"""
+        self.closed = True
+        self.head.close()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+关键字监视服务
+功能：持续监视所有车道主机的日志，新追加的行满足预设查询（例如 ERROR、超时）时写入本地告警文件
+支持：
+1. 每台主机、每个文件记录已读取的字节偏移，每次轮询只读取新追加的内容，偏移保存到状态文件，重启后继续
+2. 每台主机保持一个SSH连接，同时轮询的主机数量有上限；连接失败的主机隔一段时间再重试
+3. 按日期命名的日志过了零点自动切换到新文件（见 log_follow）
+4. 告警以 JSONL 格式追加到本地文件，每行一条
+5. 命令行运行：python log_watch.py [watch.yaml] [hosts.yaml]
+"""
+
+import os
+import sys
+import json
+import time
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+import yaml      # 配置文件解析
+from log_collector import LogCollector
+from log_cancel import CancelToken
+from log_cache import DEFAULT_CACHE_DIR
+from log_query import LogQuery
+from log_follow import FollowedFile
+from log_fleet_search import host_label, list_host_logs
+
+# 轮询间隔（秒）
+WATCH_INTERVAL = 30
+# 同时轮询的主机数量上限
+WATCH_MAX_WORKERS = 32
+# 重新列出日志目录的间隔（秒），用于发现新创建的日志文件
+RESCAN_INTERVAL = 600
+# 连接或读取失败的主机，等待多久后重试（秒）
+RETRY_INTERVAL = 300
+# 偏移状态文件
+WATCH_STATE_FILE = os.path.join(DEFAULT_CACHE_DIR, "watch_state.json")
+# 默认的告警文件
+DEFAULT_ALERTS_FILE = "alerts.jsonl"
+# 没有配置查询时使用的默认查询
+DEFAULT_QUERIES = [
+    {'name': '错误', 'query': 'ERROR'},
+    {'name': '超时', 'query': '超时'},
+]
+
+
+def load_queries(query_configs):
+    """
+    解析预设查询
+    Args:
+        query_configs: [{'name': 名称, 'query': 查询语句}, ...]
+    Returns:
+        list: [(名称, LogQuery), ...]
+    Raises:
+        QueryError: 查询语句有误
+    """
+    return [(item.get('name') or item['query'], LogQuery.parse(item['query']))
+            for item in query_configs]
+
+
+def host_key(host_data):
+    """主机在状态文件中的标识：地址和端口"""
+    ssh = host_data.get('ssh', {})
+    return f"{ssh.get('host', '')}:{ssh.get('port', 22)}"
+
+
+class HostWatcher:
+    """
+    一台主机的监视状态
+    保持SSH连接和每个日志文件的读取偏移，poll 返回新追加内容中的告警
+    """
+    def __init__(self, host_data, offsets=None, cancel_token=None, log_callback=None):
+        """
+        Args:
+            host_data: 主机配置（hosts.yaml 中的一项）
+            offsets: 上次保存的偏移 {远程路径: 偏移}
+            cancel_token: 取消标记
+            log_callback: 日志回调函数
+        """
+        self.host_data = host_data
+        self.name = host_label(host_data)
+        self.key = host_key(host_data)
+        self.offsets = dict(offsets or {})
+        self.cancel_token = cancel_token
+        self.log_callback = log_callback
+        self.collector = None
+        self.files = []          # FollowedFile 列表
+        self.scanned = False     # 是否已经列出过日志目录
+        self.next_scan = 0.0     # 下次重新列出日志目录的时间
+        self.retry_at = 0.0      # 连接失败后下次重试的时间
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(f"[{self.name}] {message}")
+
+    def close(self):
+        """关闭文件句柄和SSH连接"""
+        for followed in self.files:
+            followed.close()
+        if self.collector is not None:
+            self.collector.close()
+            self.collector = None
+
+    def _connect(self):
+        self.collector = LogCollector(config_file=None, cancel_token=self.cancel_token)
+        self.collector.config = {'ssh': self.host_data.get('ssh', {}),
+                                 'log_paths': self.host_data.get('log_paths', [])}
+        self.collector.connect()
+
+    def _rescan(self, today):
+        """
+        重新列出今天的日志文件，已跟踪的文件保留偏移
+        第一次列出时，没有保存偏移的文件从末尾开始（只监视之后追加的内容）；
+        之后新出现的文件从头读取
+        """
+        paths = [path for path, name in list_host_logs(
+            self.collector, self.collector.config['log_paths'], today, today)
+            if name.lower().endswith('.log')]
+        tracked = {followed.remote_path: followed for followed in self.files}
+        files = []
+        for path in paths:
+            followed = tracked.pop(path, None)
+            if followed is None:
+                offset = self.offsets.get(path)
+                if offset is None and self.scanned:
+                    offset = 0
+                followed = FollowedFile(path, offset=offset, initial_bytes=0)
+            files.append(followed)
+        # 不再列出的文件（例如前一天的日志）停止跟踪
+        for followed in tracked.values():
+            followed.close()
+        self.files = files
+        self.offsets = {path: offset for path, offset in self.offsets.items() if path in paths}
+        self.scanned = True
+
+    def poll(self, queries, now=None, today=None):
+        """
+        读取所有文件新追加的内容，检查预设查询
+        Args:
+            queries: [(名称, LogQuery), ...]
+            now: 当前时间戳
+            today: 当前日期
+        Returns:
+            list: 告警记录字典列表
+        """
+        now = time.time() if now is None else now
+        today = today or date.today()
+        alerts = []
+        if now < self.retry_at:
+            return alerts
+        try:
+            if self.collector is None:
+                self._connect()
+            if not self.scanned:
+                self._rescan(today)
+                self.next_scan = now + RESCAN_INTERVAL
+            for followed in self.files:
+                self.collector.check_cancelled()
+                path = followed.remote_path
+                more = True
+                while more:
+                    lines, more = followed.read_new(self.collector.sftp)
+                    alerts.extend(self._match(path, lines, queries))
+                next_path = followed.next_file(self.collector.sftp, today)
+                if next_path:
+                    self.log(f"日志已轮转，开始监视 {next_path}")
+                    alerts.extend(self._match(path, followed.switch_to(next_path), queries))
+            # 已跟踪的文件读完后再重新列出目录，不再列出的文件不会漏掉最后追加的内容
+            if now >= self.next_scan:
+                self._rescan(today)
+                self.next_scan = now + RESCAN_INTERVAL
+        except Exception as e:
+            if self.cancel_token is not None and self.cancel_token.cancelled:
+                return alerts
+            self.log(f"监视失败，{RETRY_INTERVAL} 秒后重试: {str(e)}")
+            self.close()
+            self.retry_at = now + RETRY_INTERVAL
+        finally:
+            # 不完整的最后一行没有检查过，保存的偏移不包括这部分，重启后重新读取
+            for followed in self.files:
+                if followed.offset is not None:
+                    self.offsets[followed.remote_path] = followed.offset - len(followed.partial)
+        return alerts
+
+    def _match(self, path, lines, queries):
+        """检查日志行，返回告警记录"""
+        alerts = []
+        for line in lines:
+            if not line:
+                continue
+            for name, query in queries:
+                terms = query.match_terms(line)
+                if terms is None:
+                    continue
+                alerts.append({
+                    'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                    'host': self.name,
+                    'address': self.host_data.get('ssh', {}).get('host', ''),
+                    'file': path,
+                    'query': name,
+                    'terms': list(terms),
+                    'line': line,
+                })
+        return alerts
+
+    def state(self):
+        """需要保存的偏移 {远程路径: 偏移}"""
+        return dict(self.offsets)
+
+
+class WatchService:
+    """
+    监视服务
+    每个轮询周期并发检查所有主机，告警追加到 JSONL 文件，偏移保存到状态文件
+    """
+    def __init__(self, hosts_data, queries, alerts_file=DEFAULT_ALERTS_FILE, interval=WATCH_INTERVAL,
+                 max_workers=WATCH_MAX_WORKERS, state_file=WATCH_STATE_FILE, log_callback=None):
+        """
+        Args:
+            hosts_data: 主机配置列表
+            queries: [(名称, LogQuery), ...]
+            alerts_file: 告警文件路径
+            interval: 轮询间隔（秒）
+            max_workers: 同时轮询的主机数量上限
+            state_file: 偏移状态文件
+            log_callback: 日志回调函数
+        """
+        self.queries = queries
+        self.alerts_file = alerts_file
+        self.interval = interval
+        self.max_workers = max_workers
+        self.state_file = state_file
+        self.log_callback = log_callback
+        self.cancel_token = CancelToken()
+        state = self.load_state()
+        self.watchers = [HostWatcher(host_data, state.get(host_key(host_data)), self.cancel_token,
+                                     log_callback)
+                         for host_data in hosts_data]
+
+    def load_state(self):
+        """读取偏移状态文件"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_state(self):
+        """保存偏移状态（先写临时文件再替换，中断时不会损坏状态文件）"""
+        state = {watcher.key: watcher.state() for watcher in self.watchers}
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+        tmp_path = self.state_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_file)
+
+    def write_alerts(self, alerts):
+        """追加告警记录"""
+        if not alerts:
+            return
+        with open(self.alerts_file, 'a', encoding='utf-8') as f:
+            for alert in alerts:
+                f.write(json.dumps(alert, ensure_ascii=False) + '\n')
+
+    def run_once(self, executor):
+        """
+        执行一个轮询周期
+        Args:
+            executor: 线程池
+        Returns:
+            int: 新的告警数量
+        """
+        count = 0
+        for alerts in executor.map(lambda watcher: watcher.poll(self.queries), self.watchers):
+            self.write_alerts(alerts)
+            count += len(alerts)
+        self.save_state()
+        return count
+
+    def run(self):
+        """持续轮询，直到调用 stop()"""
+        workers = max(1, min(self.max_workers, len(self.watchers)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                while not self.cancel_token.cancelled:
+                    started = time.time()
+                    count = self.run_once(executor)
+                    if count and self.log_callback:
+                        self.log_callback(f"新增 {count} 条告警，已写入 {self.alerts_file}")
+                    self.cancel_token.wait(max(0.0, self.interval - (time.time() - started)))
+            finally:
+                for watcher in self.watchers:
+                    watcher.close()
+
+    def stop(self):
+        """停止轮询（可在其他线程中调用），正在阻塞的读取随连接关闭立即返回"""
+        self.cancel_token.cancel()
+
+
+def main():
+    """
+    命令行运行：python log_watch.py [watch.yaml] [hosts.yaml]
+    watch.yaml 可设置 interval、max_workers、alerts_file 和 queries（[{name, query}, ...]），
+    不存在时使用默认设置
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    watch_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(base_dir, 'watch.yaml')
+    hosts_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(base_dir, 'hosts.yaml')
+    settings = {}
+    if os.path.exists(watch_file):
+        with open(watch_file, 'r', encoding='utf-8') as f:
+            settings = yaml.safe_load(f) or {}
+    with open(hosts_file, 'r', encoding='utf-8') as f:
+        hosts_data = yaml.safe_load(f) or []
+
+    service = WatchService(
+        hosts_data,
+        load_queries(settings.get('queries') or DEFAULT_QUERIES),
+        alerts_file=settings.get('alerts_file', DEFAULT_ALERTS_FILE),
+        interval=settings.get('interval', WATCH_INTERVAL),
+        max_workers=settings.get('max_workers', WATCH_MAX_WORKERS),
+        log_callback=print)
+    print(f"开始监视 {len(hosts_data)} 台主机，每 {service.interval} 秒检查一次，告警写入 {service.alerts_file}")
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        service.stop()
+    finally:
+        service.save_state()
+        print("监视已停止")
+
+
+if __name__ == "__main__":
+    main()
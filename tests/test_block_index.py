@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+"""
+日志块索引测试
+"""
+
+import os
+import zipfile
+
+from log_search import (file_block_index, iter_member_lines, iter_stream_time_window_blocks,
+                        parse_log_time)
+
+
+CONTENT = "\r\n".join([
+    "启动信息（没有时间戳）",
+    "10:00:01.100 OBU 读卡超时",
+    "    续行 1",
+    "  10:00:02 心跳正常",
+    "25:00:00.000 无效时间",
+    "    续行 2",
+    "10:00:01.500 时间倒退",
+    "10:00:03.300 connect timeout",
+    "    最后一行没有换行符",
+]).encode('gbk')
+
+
+def _expected(local_path, member, earliest_time, latest_time):
+    return list(iter_stream_time_window_blocks(
+        iter_member_lines(local_path, member), "Lane", earliest_time, latest_time))
+
+
+def test_file_block_index_matches_stream_extraction(tmp_path):
+    log_path = str(tmp_path / "Lane.log")
+    with open(log_path, 'wb') as f:
+        f.write(CONTENT)
+    zip_path = str(tmp_path / "Pack.zip")
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+        zip_ref.writestr("sub/Lane.log", CONTENT)
+
+    windows = [("10:00:00", "10:00:05"), ("10:00:01.200", "10:00:02"), ("11:00:00", "12:00:00")]
+    for local_path, member in ((log_path, None), (zip_path, "sub/Lane.log")):
+        index = file_block_index(local_path, member)
+        assert len(index) == 5
+        assert file_block_index(local_path, member) is index
+        for start, end in windows:
+            earliest_time, latest_time = parse_log_time(start), parse_log_time(end)
+            assert (list(index.iter_blocks("Lane", earliest_time, latest_time))
+                    == _expected(local_path, member, earliest_time, latest_time))
+
+    # 文件变化后重新建立索引
+    with open(log_path, 'ab') as f:
+        f.write("\r\n10:00:04.000 追加".encode('gbk'))
+    os.utime(log_path, (1, 1))
+    assert len(file_block_index(log_path)) == 6
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+"""
+全文索引测试
+"""
+
+import os
+
+from log_index import LogIndex
+from log_query import LogQuery
+
+
+def test_index_is_current_until_file_changes(tmp_path):
+    log_path = str(tmp_path / "Lane.log")
+    with open(log_path, 'wb') as f:
+        f.write("10:00:01.100 读卡超时\r\n10:00:02.200 心跳正常\r\n".encode('gbk'))
+    index = LogIndex(str(tmp_path / "index.db"))
+    try:
+        assert not index.is_current(log_path)
+        index.update_file(log_path)
+        assert index.is_current(log_path)
+        results = index.search(LogQuery.parse("读卡超时"), [log_path])
+        assert [(r['line_num'], r['content']) for r in results] == [(1, "10:00:01.100 读卡超时")]
+
+        with open(log_path, 'ab') as f:
+            f.write("10:00:03.300 读卡超时\r\n".encode('gbk'))
+        os.utime(log_path, (0, 0))
+        assert not index.is_current(log_path)
+    finally:
+        index.close()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+"""
+查询语句解析测试
+"""
+
+from log_query import LogQuery
+
+
+def test_keyword_with_space_is_single_literal():
+    query = LogQuery.parse("connect timeout")
+    assert query.literal() == ("connect timeout", False)
+    assert query.matches("10:00:01.100 Connect Timeout after 3s")
+    assert not query.matches("10:00:01.100 timeout before connect")
+
+
+def test_keyword_with_parentheses_is_single_literal():
+    query = LogQuery.parse("  func(a) ")
+    assert query.literal() == ("func(a)", False)
+    assert query.matches("call func(a) failed")
+    assert not query.matches("call func a failed")
+
+
+def test_prefixed_keyword_with_space():
+    assert LogQuery.parse("cs:Connect timeout").literal() == ("Connect timeout", True)
+    query = LogQuery.parse(r"re:超时 \d+ms")
+    assert query.literal() is None
+    assert query.matches("读卡超时 300ms")
+
+
+def test_operators_still_split_terms():
+    query = LogQuery.parse('"connect timeout" OR 超时')
+    assert [term.text for term in query.terms] == ["connect timeout", "超时"]
+    assert query.matches("connect timeout")
+    assert query.matches("读卡超时")
+    assert not query.matches("connect ok")
+
+    query = LogQuery.parse("connect AND timeout")
+    assert query.matches("timeout before connect")
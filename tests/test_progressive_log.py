@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+边下载边查看测试
+"""
+
+import os
+import tempfile
+
+from log_search import match_log_time, parse_log_time
+from log_view import ProgressiveLog, REMOTE_PAGE_SIZE, VIEW_TEMP_DIR
+
+
+def _make_log(count):
+    lines = []
+    for i in range(count):
+        seconds = 36000 + i
+        lines.append(f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}.000 "
+                     f"记录 {i:06d} " + "x" * 40)
+    return ("\r\n".join(lines) + "\r\n").encode('gbk')
+
+
+def _open(data):
+    os.makedirs(VIEW_TEMP_DIR, exist_ok=True)
+    fd, temp_file = tempfile.mkstemp(suffix='.log', dir=VIEW_TEMP_DIR)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data[:REMOTE_PAGE_SIZE])
+    view = ProgressiveLog(temp_file, data[-REMOTE_PAGE_SIZE:], len(data), "Lane.log")
+    return view, temp_file
+
+
+def _serve(view, data):
+    request = view.take_request()
+    assert request is not None
+    offset, length = request
+    view.add_page(offset, data[offset:offset + length])
+    view.update()
+
+
+def test_jump_reads_page_on_demand():
+    data = _make_log(40000)
+    view, temp_file = _open(data)
+    try:
+        target = parse_log_time("15:00:00")
+        gap_row = view.find_time(target)
+        assert view.line(gap_row).startswith("......")
+        for _ in range(8):
+            _serve(view, data)
+            if view.jump_line is not None:
+                break
+        line_num = view.take_jump()
+        assert match_log_time(view.line(line_num))[1] == target
+        assert match_log_time(view.line(line_num - 1))[1] < target
+
+        # 滚动到中间页之后的占位行时读取下一页，与中间页合并
+        key = view.row_key(line_num)
+        middle_count = len(view.middle_lines)
+        view.lines(view.head.line_count, view.line_count)
+        _serve(view, data)
+        assert len(view.middle_lines) > middle_count
+        assert view.line(view.row_from_key(key)) == view.line(line_num)
+
+        # 下载完成后与完整文件相同，位置换算到完整文件的行号
+        with open(temp_file, 'ab') as f:
+            f.write(data[REMOTE_PAGE_SIZE:])
+        view.finish_download()
+        view.update()
+        assert view.complete
+        assert view.line_count == 40000
+        assert match_log_time(view.line(view.row_from_key(key)))[1] == target
+    finally:
+        view.close()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+"""
+远程两阶段搜索测试：在本机用 sh 和 awk 执行发往车道主机的命令
+"""
+
+import shutil
+import subprocess
+import pytest
+
+pytest.importorskip("paramiko")
+from log_collector import LogCollector
+
+pytestmark = pytest.mark.skipif(shutil.which("awk") is None, reason="需要awk")
+
+
+class LocalShellCollector(LogCollector):
+    """在本机执行远程命令的收集器（不连接SSH）"""
+    def __init__(self):
+        pass
+
+    def execute_command_bytes(self, command):
+        result = subprocess.run(command, shell=True, capture_output=True)
+        return result.returncode, result.stdout, result.stderr
+
+
+def write_gbk_log(tmp_path, lines):
+    path = tmp_path / "lane.log"
+    path.write_bytes(("\r\n".join(lines) + "\r\n").encode("gbk"))
+    return str(path)
+
+
+def test_gbk_keyword_with_ascii_trail_byte_ignore_case(tmp_path):
+    # "門" 的GBK编码为 E9 54，第二个字节是ASCII字母 'T'，忽略大小写时awk会把它转为 't'
+    assert "門".encode("gbk")[1:] == b"T"
+    path = write_gbk_log(tmp_path, [
+        "10:00:01.100 開門 ok",
+        "10:00:02.200 other",
+        "10:00:03.300 車道門 ERROR",
+    ])
+    collector = LocalShellCollector()
+    assert collector.remote_keyword_times(path, "門", case_sensitive=False) == (2, "10:00:01.100", "10:00:03.300")
+    assert collector.remote_keyword_times(path, "門", case_sensitive=True) == (2, "10:00:01.100", "10:00:03.300")
+
+
+def test_mixed_keyword_ignore_case(tmp_path):
+    path = write_gbk_log(tmp_path, [
+        "10:00:01.100 車道門 Error",
+        "10:00:02.200 車道門 error",
+        "10:00:03.300 車道門 ok",
+    ])
+    collector = LocalShellCollector()
+    assert collector.remote_keyword_times(path, "門 ERROR", case_sensitive=False) == (2, "10:00:01.100", "10:00:02.200")
+    assert collector.remote_keyword_times(path, "門 error", case_sensitive=True) == (1, "10:00:02.200", "10:00:02.200")
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+"""
+搜索结果缓存测试
+"""
+
+import os
+
+from log_query import LogQuery
+from log_result_cache import SearchResultCache
+from log_search import hits_time_range, search_file_bytes
+
+
+LINES = [
+    "10:00:01.100 OBU 0123ABCD 读卡超时",
+    "    续行 detail",
+    "10:00:02.200 OBU 心跳正常",
+    "10:00:03.300 connect timeout",
+]
+
+
+def _write(path, lines, mode='wb'):
+    with open(path, mode) as f:
+        f.write(("\r\n".join(lines) + "\r\n").encode('gbk'))
+
+
+def test_cached_results_match_direct_search(tmp_path):
+    log_path = str(tmp_path / "Lane.log")
+    _write(log_path, LINES)
+    cache = SearchResultCache(str(tmp_path / "results.db"))
+    try:
+        for text in ("OBU", "OBU AND 超时", "OBU", "re:\\d{4}ABCD OR connect"):
+            query = LogQuery.parse(text)
+            expected = hits_time_range(search_file_bytes(log_path, query))
+            assert cache.search_file(log_path, query) == expected
+
+        # 只追加内容时只搜索新增的部分
+        _write(log_path, ["10:00:04.400 OBU 0456ABCD 读卡超时"], 'ab')
+        os.utime(log_path, (1, 1))
+        for text in ("OBU", "OBU AND 超时"):
+            query = LogQuery.parse(text)
+            expected = hits_time_range(search_file_bytes(log_path, query))
+            assert cache.search_file(log_path, query) == expected
+            assert expected[1].strftime('%H:%M:%S') == "10:00:04"
+    finally:
+        cache.close()